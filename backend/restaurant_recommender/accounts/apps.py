@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Nur prüfen, nicht umstellen: die Migration läuft mit python manage.py migrate_user_ids
+        from .user_ids import check_user_ids
+        checks.register(check_user_ids)
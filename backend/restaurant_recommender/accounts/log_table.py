@@ -0,0 +1,614 @@
+"""
+Log-strukturierte Speicherung der CSV-Tabellen (users, friends, groups, posts).
+
+Bisher hat jede Änderung einer einzelnen Zeile (update_favorites, add_friend, leave_group,
+delete_post, ...) die komplette CSV gelesen und neu geschrieben: Schreibkosten wuchsen mit der
+Tabellengröße, und gleichzeitige Schreiber überschrieben sich gegenseitig.
+
+Eine LogTable besteht aus
+  - der Basisdatei (die bisherige CSV, z. B. friends.csv) und
+  - einem Log daneben (friends.csv.log): eine JSON-Zeile pro Änderung, entweder
+    {"k": <Schlüssel>, "r": <vollständige Zeile>} (einfügen/ersetzen) oder {"k": <Schlüssel>, "d": 1} (löschen).
+Gelesen wird aus einem Index Schlüssel -> Zeile im Speicher (Basisdatei plus abgespieltes Log).
+Eine Änderung hängt genau eine Zeile an das Log an (ein einziges write mit O_APPEND) und ändert den
+Index; ihr Aufwand ist unabhängig von der Tabellengröße.
+
+Schreiber nehmen den Schreib-Lock der Tabelle (lock, TableLock): ein threading.RLock innerhalb des
+Prozesses plus fcntl.flock auf <Tabelle>.csv.log.lock zwischen Prozessen (z. B. mehrere gunicorn-Worker).
+Lesen-Ändern-Schreiben unter "with table.lock:" (ID-Vergabe, Freundeslisten, ...) ist damit auch
+zwischen Prozessen atomar. Ohne fcntl (Windows) gilt der Lock nur innerhalb des Prozesses.
+
+Jeder Log-Eintrag setzt den vollständigen Zustand eines Schlüssels. Ein Eintrag, der doppelt oder
+auf einen neueren Stand abgespielt wird, ändert daher nichts. Darauf beruht die Verdichtung
+(compact), die im Hintergrund läuft, sobald das Log lang genug ist:
+  1. Log in <Log>.compacting umbenennen; neue Einträge landen in einem neuen Log.
+  2. Zustand in eine temporäre Datei schreiben und per os.replace atomar zur Basisdatei machen.
+  3. <Log>.compacting löschen.
+Beim Laden wird immer Basisdatei + <Log>.compacting + Log abgespielt. Nach einem Absturz an
+beliebiger Stelle ergibt das denselben Zustand; übrig gebliebene temporäre Dateien werden nicht gelesen.
+Leser lesen nur Zeilen mit Zeilenende; eine unvollständige letzte Zeile (Eintrag wird gerade
+geschrieben) wird beim nächsten Zugriff gelesen. Die Reste eines abgestürzten Schreibers schneidet
+erst der nächste Schreiber unter dem exklusiven Lock ab, Leser verändern das Log nie. Vollständige
+Zeilen, die kein gültiges JSON sind, werden mit einer Warnung übersprungen, die folgenden Einträge
+bleiben erhalten. Verdichtungen laufen zwischen Prozessen nacheinander (flock auf
+<Tabelle>.csv.log.compact.lock).
+Ändern andere Prozesse Basisdatei oder Log (mtime/Größe), wird beim nächsten Zugriff neu geladen
+bzw. nur der neue Teil des Logs abgespielt.
+
+Leser sehen unveränderliche Stände (Snapshot) und nehmen keinen Lock: Ein Schreiber baut unter dem
+Schreib-Lock der Tabelle (lock) einen neuen Stand und veröffentlicht ihn mit einer einzigen Zuweisung;
+wer vorher snapshot() aufgerufen hat, liest weiter den alten Stand. Damit ein Schreibvorgang nicht die
+ganze Tabelle kopiert, besteht ein Stand aus einem Basis-Dict und einem kleinen Dict der Änderungen
+seither (copy-on-write); erst wenn dieses größer als ein Vielfaches der Wurzel der Tabellengröße wird, werden
+beide zu einem neuen Basis-Dict zusammengeführt. Hält gerade ein Schreiber den Lock, liefert snapshot() den
+zuletzt veröffentlichten Stand, statt zu warten.
+
+Das Modul ist unabhängig von Django.
+"""
+
+import csv
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: Lock nur innerhalb des Prozesses
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Erhöhe das Limit für CSV-Felder (Basisdateien im alten Format enthalten Base64-Bilder)
+try:
+    csv.field_size_limit(sys.maxsize)
+except OverflowError:
+    csv.field_size_limit(2147483647)
+
+LOG_SUFFIX = '.log'
+COMPACTING_SUFFIX = '.log.compacting'
+LOCK_SUFFIX = '.log.lock'
+COMPACT_LOCK_SUFFIX = '.log.compact.lock'
+
+# Verdichtung, sobald das Log mindestens COMPACT_MIN_RECORDS Einträge und mehr als
+# COMPACT_RATIO × Tabellenzeilen Einträge hat
+COMPACT_MIN_RECORDS = 1000
+COMPACT_RATIO = 0.5
+
+# Das Änderungs-Dict eines Stands wird ab max(MERGE_MIN_CHANGES, MERGE_FACTOR × Wurzel der Basisgröße) Einträgen
+# in die Basis übernommen. Jeder Schreibvorgang kopiert das Änderungs-Dict (O(k)), jede Übernahme die Basis (O(n));
+# pro Schreibvorgang ist k ≈ 4 × Wurzel(n) am günstigsten (gemessen mit benchmark_log_table).
+MERGE_MIN_CHANGES = 256
+MERGE_FACTOR = 4
+
+_MISSING = object()
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def table_version(csv_path):
+    """Stand von Basisdatei und Logs einer Tabelle; ändert sich bei jeder Änderung (auch durch andere Prozesse)."""
+    return (_stat(csv_path), _stat(csv_path + COMPACTING_SUFFIX), _stat(csv_path + LOG_SUFFIX))
+
+
+def read_log(path, offset=0):
+    """
+    Liest die Log-Einträge ab offset, ohne das Log zu verändern. Liefert (Einträge, Offset hinter der letzten
+    vollständigen Zeile). Eine letzte Zeile ohne Zeilenende wird nicht gelesen. Vollständige Zeilen, die kein
+    gültiges JSON sind, werden mit einer Warnung übersprungen.
+    """
+    try:
+        with open(path, 'rb') as log_file:
+            log_file.seek(offset)
+            data = log_file.read()
+    except FileNotFoundError:
+        return [], 0
+    end = data.rfind(b'\n') + 1
+    records = []
+    position = offset
+    for line in data[:end].split(b'\n')[:-1]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            logger.warning('%s: ungültiger Log-Eintrag bei Offset %d übersprungen', path, position)
+        position += len(line) + 1
+    return records, offset + end
+
+
+def _repair_tail(fd, path):
+    """
+    Schneidet eine letzte Zeile ohne Zeilenende ab (Rest eines abgestürzten Schreibers), damit der nächste Eintrag
+    auf einer eigenen Zeile beginnt. Nur unter dem exklusiven Lock der Tabelle aufrufen.
+    """
+    size = os.fstat(fd).st_size
+    if not size or os.pread(fd, 1, size - 1) == b'\n':
+        return
+    end = size
+    while end > 0:
+        start = max(0, end - 65536)
+        newline = os.pread(fd, end - start, start).rfind(b'\n')
+        if newline >= 0:
+            end = start + newline + 1
+            break
+        end = start
+    logger.warning('%s: unvollständige letzte Zeile (%d Bytes) abgeschnitten', path, size - end)
+    os.ftruncate(fd, end)
+
+
+class TableLock:
+    """
+    Reentranter Lock: threading.RLock innerhalb des Prozesses plus fcntl.flock auf der Datei path zwischen
+    Prozessen (nur während er gehalten wird; der erste acquire eines Threads nimmt beide).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mutex = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        if not self.mutex.acquire(blocking=blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BaseException as e:
+                os.close(fd)
+                self.mutex.release()
+                if isinstance(e, BlockingIOError):
+                    return False
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.mutex.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _apply(rows, record):
+    if record.get('d'):
+        rows.pop(record['k'], None)
+    else:
+        rows[record['k']] = record['r']
+
+
+def _changes(records):
+    """Fasst Log-Einträge zu {Schlüssel: Zeile oder None (gelöscht)} zusammen (letzter Eintrag gilt)."""
+    changes = {}
+    for record in records:
+        changes[record['k']] = None if record.get('d') else record['r']
+    return changes
+
+
+class Snapshot:
+    """
+    Unveränderlicher Stand einer LogTable: Basis-Dict plus Änderungen seither ({Schlüssel: Zeile oder None}).
+    Beide Dicts werden nach dem Veröffentlichen nicht mehr verändert; Zeilen werden als Kopien zurückgegeben.
+    """
+
+    __slots__ = ('_base', '_changes', '_len', 'version', 'files')
+
+    def __init__(self, base, changes, length, version, files):
+        self._base = base
+        self._changes = changes
+        self._len = length
+        self.version = version
+        # (Basisdatei, .compacting, (Inode, gelesene Größe) des Logs), aus denen der Stand gelesen wurde
+        self.files = files
+
+    def _row(self, key):
+        row = self._changes.get(key, _MISSING)
+        return self._base.get(key) if row is _MISSING else row
+
+    def _items(self):
+        changes = self._changes
+        for key, row in self._base.items():
+            if key in changes:
+                row = changes[key]
+                if row is None:
+                    continue
+            yield key, row
+        for key, row in changes.items():
+            if row is not None and key not in self._base:
+                yield key, row
+
+    def get(self, key):
+        """Zeile (Kopie) oder None."""
+        row = self._row(key)
+        return dict(row) if row is not None else None
+
+    def __contains__(self, key):
+        return self._row(key) is not None
+
+    def __len__(self):
+        return self._len
+
+    def rows(self):
+        """Alle Zeilen (Kopien) in Tabellenreihenfolge (neue Schlüssel am Ende, ersetzte Zeilen behalten ihre Position)."""
+        return [dict(row) for _, row in self._items()]
+
+    def keys(self):
+        return [key for key, _ in self._items()]
+
+    def changed(self, changes, version, files):
+        """Neuer Stand mit den Änderungen ({Schlüssel: Zeile oder None}); kopiert nur das Änderungs-Dict."""
+        base, merged, length = self._base, dict(self._changes), self._len
+        for key, row in changes.items():
+            length += (row is not None) - (key in self)
+            merged[key] = row
+        if len(merged) > max(MERGE_MIN_CHANGES, MERGE_FACTOR * math.isqrt(len(base))):
+            base = dict(base)
+            for key, row in merged.items():
+                if row is None:
+                    base.pop(key, None)
+                else:
+                    base[key] = row
+            merged = {}
+        return Snapshot(base, merged, length, version, files)
+
+
+class LogTable:
+    """
+    Tabelle aus Basis-CSV und Änderungs-Log mit Index Schlüssel -> Zeile im Speicher.
+
+    key ist der Name der Schlüsselspalte oder eine Funktion Zeile -> Schlüssel. fieldnames sind die Spalten
+    beim Schreiben der Basisdatei (None: Spalten der vorhandenen Basisdatei). convert wird beim Laden auf jede
+    Zeile der Basisdatei angewendet (z. B. Übernahme alter Spalten). Bei doppelten Schlüsseln in der Basisdatei
+    gilt die erste Zeile. Zeilen werden als Kopien zurückgegeben und übernommen.
+
+    Lesende Methoden (get, rows, ...) lesen jeweils den aktuellen Snapshot ohne Lock. Wer mehrere Abfragen auf
+    demselben Stand braucht, ruft snapshot() einmal auf. Schreibende Methoden nehmen lock (auch zwischen Prozessen).
+    """
+
+    def __init__(self, csv_path, fieldnames, key, convert=None, compact_min_records=COMPACT_MIN_RECORDS,
+                 compact_ratio=COMPACT_RATIO, durable=False):
+        self.csv_path = csv_path
+        self.log_path = csv_path + LOG_SUFFIX
+        self.compacting_path = csv_path + COMPACTING_SUFFIX
+        self.fieldnames = list(fieldnames) if fieldnames is not None else None
+        self._key = key if callable(key) else (lambda row: row.get(key) or '')
+        self._convert = convert
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        # fsync nach jedem Eintrag (übersteht auch Stromausfall, kostet aber einen Plattenzugriff pro Änderung)
+        self.durable = durable
+        # Schreib-Lock. Reentrant: Lesen-Ändern-Schreiben mehrerer Aufrufe unter "with table.lock:" ist atomar,
+        # auch zwischen Prozessen. Leser nehmen ihn nicht; das Nachladen schützt nur lock.mutex (prozessintern).
+        self.lock = TableLock(csv_path + LOCK_SUFFIX)
+        self._mutex = self.lock.mutex
+        # Verdichtungen (auch anderer Prozesse) laufen nacheinander
+        self._compact_lock = TableLock(csv_path + COMPACT_LOCK_SUFFIX)
+        # Zuletzt veröffentlichter Stand (None bis zum ersten Laden)
+        self._snapshot = None
+        self.base_header = None
+        # Stand beim letzten Laden: Basisdatei, .compacting, Log (Inode) und gelesener Offset im Log
+        self._base_stat = None
+        self._compacting_stat = None
+        self._log_inode = None
+        self._log_offset = 0
+        self._log_records = 0
+        self._compactor = None
+        # Wird bei jeder Änderung erhöht (eigene und neu eingelesene); erlaubt abgeleiteten Indizes, veraltete Stände zu erkennen.
+        self.version = 0
+        # Metriken
+        self.appends = 0
+        self.compactions = 0
+
+    # ------------------------------------------------------------------
+    # Laden
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        while True:
+            base_stat, compacting_stat = _stat(self.csv_path), _stat(self.compacting_path)
+            log_stat = _stat(self.log_path)
+            rows = {}
+            header = None
+            if base_stat is not None:
+                with open(self.csv_path, 'r', newline='', encoding='utf-8') as csvfile:
+                    reader = csv.DictReader(csvfile)
+                    header = reader.fieldnames
+                    for row in reader:
+                        row = self._convert(row) if self._convert is not None else row
+                        rows.setdefault(self._key(row), row)
+            compacting_records, _ = read_log(self.compacting_path)
+            log_records, offset = read_log(self.log_path)
+            # Hat eine Verdichtung (auch eines anderen Prozesses) währenddessen Dateien ersetzt, neu lesen
+            log_inode = log_stat[0] if log_stat is not None else None
+            current_log = _stat(self.log_path)
+            if (_stat(self.csv_path), _stat(self.compacting_path)) == (base_stat, compacting_stat) \
+                    and (current_log[0] if current_log is not None else None) == log_inode:
+                break
+        for record in compacting_records + log_records:
+            _apply(rows, record)
+        self.base_header = header
+        self._base_stat, self._compacting_stat = base_stat, compacting_stat
+        self._log_inode = log_inode
+        self._log_offset = offset
+        self._log_records = len(compacting_records) + len(log_records)
+        self.version += 1
+        self._snapshot = Snapshot(rows, {}, len(rows), self.version, self._files())
+
+    def _files(self):
+        return (self._base_stat, self._compacting_stat, (self._log_inode, self._log_offset))
+
+    def _publish(self, changes):
+        """Veröffentlicht den Stand mit den Änderungen. Muss mit gehaltenem lock.mutex aufgerufen werden."""
+        self._snapshot = self._snapshot.changed(changes, self.version, self._files())
+
+    def _is_current(self, snapshot):
+        """Entsprechen die Dateien noch dem Stand (nur stat, ohne Lock)?"""
+        base_stat, compacting_stat, log = snapshot.files
+        log_stat = _stat(self.log_path)
+        return ((log_stat[0], log_stat[2]) if log_stat is not None else (None, 0)) == log \
+            and _stat(self.csv_path) == base_stat and _stat(self.compacting_path) == compacting_stat
+
+    def refresh(self):
+        """Lädt neu bzw. spielt neue Log-Einträge ab, falls sich die Dateien geändert haben. True bei Änderungen."""
+        with self._mutex:
+            if self._snapshot is None or _stat(self.csv_path) != self._base_stat \
+                    or _stat(self.compacting_path) != self._compacting_stat:
+                self._load()
+                return True
+            log_stat = _stat(self.log_path)
+            log_inode = log_stat[0] if log_stat is not None else None
+            if log_inode != self._log_inode or (log_stat is not None and log_stat[2] < self._log_offset):
+                self._load()
+                return True
+            if log_stat is None or log_stat[2] == self._log_offset:
+                return False
+            records, self._log_offset = read_log(self.log_path, self._log_offset)
+            self._log_records += len(records)
+            if records:
+                self.version += 1
+            self._publish(_changes(records))
+            return bool(records)
+
+    def snapshot(self):
+        """
+        Aktueller unveränderlicher Stand, ohne auf Schreiber zu warten: Haben sich die Dateien seit dem letzten
+        Stand geändert, wird nachgeladen, sofern kein Schreiber dieses Prozesses gerade lock hält; sonst gilt der
+        zuletzt veröffentlichte Stand.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self._is_current(snapshot):
+            return snapshot
+        # Nur beim allerersten Laden wird gewartet
+        if not self._mutex.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            self.refresh()
+            return self._snapshot
+        finally:
+            self._mutex.release()
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def get(self, key):
+        """Zeile (Kopie) oder None."""
+        return self.snapshot().get(key)
+
+    def __contains__(self, key):
+        return key in self.snapshot()
+
+    def __len__(self):
+        return len(self.snapshot())
+
+    def rows(self):
+        """Alle Zeilen (Kopien) in Tabellenreihenfolge (neue Schlüssel am Ende, ersetzte Zeilen behalten ihre Position)."""
+        return self.snapshot().rows()
+
+    def keys(self):
+        return self.snapshot().keys()
+
+    # ------------------------------------------------------------------
+    # Schreiben
+    # ------------------------------------------------------------------
+
+    def _append(self, record):
+        """
+        Hängt einen Eintrag an das Log an (ein write mit O_APPEND) und veröffentlicht den neuen Stand.
+        Muss mit gehaltenem Lock aufgerufen werden.
+        """
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        # Unter lock kann keine Verdichtung das Log umbenennen und kein anderer Schreiber gerade schreiben
+        fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _repair_tail(fd, self.log_path)
+            os.write(fd, line)
+            if self.durable:
+                os.fsync(fd)
+            written = os.fstat(fd)
+        finally:
+            os.close(fd)
+        if written.st_ino == self._log_inode and written.st_size == self._log_offset + len(line):
+            # Nur eigene Einträge seit dem letzten Lesen: Offset mitführen, sonst liest refresh den Rest nach
+            self._log_offset = written.st_size
+        elif self._log_inode is None and written.st_size == len(line):
+            self._log_inode, self._log_offset = written.st_ino, written.st_size
+        self._log_records += 1
+        self.appends += 1
+        self.version += 1
+        self._publish({record['k']: None if record.get('d') else record['r']})
+        self._maybe_compact()
+
+    def put(self, row):
+        """Fügt eine Zeile ein oder ersetzt die Zeile mit demselben Schlüssel. Liefert den Schlüssel."""
+        with self.lock:
+            self.refresh()
+            row = {name: row.get(name, '') for name in self._write_fieldnames(row)}
+            key = self._key(row)
+            self._append({'k': key, 'r': row})
+        return key
+
+    def delete(self, key):
+        """Löscht die Zeile mit dem Schlüssel. False, wenn es sie nicht gibt."""
+        with self.lock:
+            self.refresh()
+            if key not in self._snapshot:
+                return False
+            self._append({'k': key, 'd': 1})
+            return True
+
+    def update(self, key, **changes):
+        """Setzt die übergebenen Spalten einer Zeile. Liefert die neue Zeile (Kopie) oder None, wenn es sie nicht gibt."""
+        with self.lock:
+            self.refresh()
+            row = self._snapshot.get(key)
+            if row is None:
+                return None
+            row.update(changes)
+            self._append({'k': key, 'r': row})
+            return dict(row)
+
+    def _write_fieldnames(self, row=None):
+        if self.fieldnames is not None:
+            return self.fieldnames
+        return self.base_header or list(row or [])
+
+    # ------------------------------------------------------------------
+    # Verdichtung
+    # ------------------------------------------------------------------
+
+    def _maybe_compact(self):
+        """Startet die Verdichtung im Hintergrund, wenn das Log lang genug ist. Muss mit gehaltenem Lock aufgerufen werden."""
+        if self._log_records < max(self.compact_min_records, self.compact_ratio * len(self._snapshot)):
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name='log-table-compactor', daemon=True)
+        self._compactor.start()
+
+    def _write_base(self, rows, fieldnames):
+        """Schreibt die Basisdatei atomar (temporäre Datei im selben Ordner + os.replace)."""
+        directory = os.path.dirname(os.path.abspath(self.csv_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.csv_path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            os.replace(tmp_path, self.csv_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def compact(self):
+        """
+        Schreibt den aktuellen Zustand in die Basisdatei und leert das Log. Schreiber werden nur für das
+        Umbenennen des Logs und das Übernehmen des Ergebnisses blockiert, nicht während des Schreibens;
+        geschrieben wird aus dem dabei festgehaltenen Snapshot. Leser werden nie blockiert. False, wenn nichts
+        zu tun ist oder gerade eine andere Verdichtung läuft.
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._compact()
+        finally:
+            self._compact_lock.release()
+
+    def _compact(self):
+        with self.lock:
+            self.refresh()
+            if not self._log_records and self.base_header == self._write_fieldnames():
+                return False
+            if not os.path.exists(self.compacting_path) and os.path.exists(self.log_path):
+                # Ab hier schreiben alle Prozesse in ein neues Log. Einträge anderer Prozesse seit dem letzten
+                # Lesen stehen noch im umbenannten Log und werden vor dem Schnappschuss übernommen.
+                os.replace(self.log_path, self.compacting_path)
+                records, _ = read_log(self.compacting_path, self._log_offset)
+                self._log_records += len(records)
+                self._log_inode, self._log_offset = None, 0
+                self._compacting_stat = _stat(self.compacting_path)
+                if records:
+                    self.version += 1
+                self._publish(_changes(records))
+            log_records = self._log_records
+            snapshot = self._snapshot
+        rows = snapshot.rows()
+        fieldnames = self._write_fieldnames(rows[0] if rows else None)
+        self._write_base(rows, fieldnames)
+        with self.lock:
+            try:
+                os.remove(self.compacting_path)
+            except FileNotFoundError:
+                pass
+            self._base_stat, self._compacting_stat = _stat(self.csv_path), None
+            self.base_header = fieldnames
+            self._publish({})
+            # Einträge, die während des Schreibens hinzukamen, stehen im neuen Log und bleiben zu verdichten
+            self._log_records -= log_records
+            self.compactions += 1
+        return True
+
+    def rewrite(self, rows=None, fieldnames=None, transform=None):
+        """
+        Ersetzt die Tabelle vollständig (z. B. für Migrationen, die Schlüssel oder Spalten ändern): schreibt die
+        Basisdatei atomar und löscht die Logs. Ohne rows wird der aktuelle Zustand geschrieben.
+        transform erhält unter den Locks die aktuellen Zeilen (base_header ist dann aktuell) und liefert
+        (rows, fieldnames) oder None, wenn nichts zu schreiben ist; so gehen keine gleichzeitigen Änderungen verloren.
+        Liefert True, wenn geschrieben wurde.
+        """
+        with self._compact_lock, self.lock:
+            self.refresh()
+            if transform is not None:
+                result = transform(self._snapshot.rows())
+                if result is None:
+                    return False
+                rows, fieldnames = result
+            elif rows is None:
+                rows = self._snapshot.rows()
+            if fieldnames is not None:
+                self.fieldnames = list(fieldnames)
+            fieldnames = self._write_fieldnames(rows[0] if rows else None)
+            self._write_base(rows, fieldnames)
+            for path in (self.compacting_path, self.log_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._load()
+            return True
+
+    def wait_for_compaction(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def stats(self):
+        with self._mutex:
+            return {
+                'rows': len(self._snapshot) if self._snapshot is not None else 0,
+                'log_records': self._log_records,
+                'appends': self.appends,
+                'compactions': self.compactions,
+            }
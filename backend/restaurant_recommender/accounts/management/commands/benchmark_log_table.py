@@ -0,0 +1,111 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from accounts.log_table import LogTable
+
+FIELDNAMES = ['user_id', 'friends']
+
+
+def rewrite_update(path, key, friends):
+    """Bisheriges Schreiben als Vergleich: komplette CSV lesen, eine Zeile ändern, komplette CSV schreiben."""
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        rows = list(csv.DictReader(csvfile))
+    for row in rows:
+        if row['user_id'] == key:
+            row['friends'] = friends
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_while(table, num_rows, done, seed):
+    """Lookups aus einem eigenen Thread, bis done gesetzt ist. Liefert die Dauer jedes Lookups."""
+    rng = np.random.default_rng(seed)
+    timings = []
+    while not done.is_set():
+        key = f'user{rng.integers(num_rows)}'
+        start = time.perf_counter()
+        table.get(key)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+
+class Command(BaseCommand):
+    help = ('Misst den Schreibdurchsatz der LogTable (Anhängen an das Log) gegenüber dem bisherigen '
+            'Neuschreiben der kompletten CSV, Laden und Verdichtung sowie Lese-Latenz während Schreibvorgängen und '
+            'Verdichtung (Standard: 10.000 und 1.000.000 Zeilen)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000], help='Tabellengrößen')
+        parser.add_argument('--updates', type=int, default=10000, help='Änderungen pro Tabellengröße')
+        parser.add_argument('--rewrites', type=int, default=5, help='Messungen des bisherigen Neuschreibens')
+        parser.add_argument('--durable', action='store_true', help='fsync nach jedem Log-Eintrag')
+        parser.add_argument('--seed', type=int, default=42, help='Seed für die geänderten Zeilen')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f'{options["updates"]} Änderungen pro Tabelle, durable={options["durable"]}')
+        self.stdout.write(f'{"Zeilen":>9} {"Laden [s]":>10} {"Log [Änd./s]":>13} {"Log p99 [µs]":>13} '
+                          f'{"Neuschreiben [Änd./s]":>22} {"Replay [s]":>11} {"Verdichtung [s]":>16} {"Lesen p99 [µs]":>15}')
+        for num_rows in options['rows']:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'friends.csv')
+                with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(FIELDNAMES)
+                    writer.writerows((f'user{i}', f'user{(i + 1) % num_rows}') for i in range(num_rows))
+
+                started = time.perf_counter()
+                # Ohne automatische Verdichtung, damit nur das Anhängen gemessen wird
+                table = LogTable(path, FIELDNAMES, key='user_id', compact_min_records=options['updates'] + 1,
+                                 durable=options['durable'])
+                table.refresh()
+                load_s = time.perf_counter() - started
+
+                keys = rng.integers(0, num_rows, size=options['updates'])
+                timings = np.empty(len(keys))
+                for i, key in enumerate(keys):
+                    start = time.perf_counter()
+                    table.update(f'user{key}', friends=f'user{i}')
+                    timings[i] = time.perf_counter() - start
+                append_rate = len(keys) / timings.sum()
+
+                # Ein frischer Prozess spielt Basisdatei und Log ab
+                started = time.perf_counter()
+                replayed = LogTable(path, FIELDNAMES, key='user_id')
+                replayed.refresh()
+                replay_s = time.perf_counter() - started
+                if replayed.rows() != table.rows():
+                    self.stdout.write(self.style.ERROR(f'{num_rows} Zeilen: abgespielter Zustand weicht ab'))
+
+                # Leser nehmen keinen Lock: ein Thread liest, während geschrieben und verdichtet wird
+                done = threading.Event()
+                reads = []
+                reader = threading.Thread(target=lambda: reads.append(read_while(table, num_rows, done, options['seed'])))
+                reader.start()
+                for i, key in enumerate(keys[:1000]):
+                    table.update(f'user{key}', friends=f'user{i}')
+                started = time.perf_counter()
+                table.compact()
+                compact_s = time.perf_counter() - started
+                done.set()
+                reader.join()
+
+                rewrite_path = os.path.join(tmp, 'rewrite.csv')
+                os.replace(path, rewrite_path)
+                started = time.perf_counter()
+                for i, key in enumerate(keys[:options['rewrites']]):
+                    rewrite_update(rewrite_path, f'user{key}', f'user{i}')
+                rewrite_rate = min(options['rewrites'], len(keys)) / (time.perf_counter() - started)
+
+            self.stdout.write(f'{num_rows:>9} {load_s:10.2f} {append_rate:13.0f} '
+                              f'{np.percentile(timings, 99) * 1e6:13.1f} {rewrite_rate:22.1f} '
+                              f'{replay_s:11.2f} {compact_s:16.2f} {np.percentile(reads[0], 99) * 1e6:15.1f}')
+        self.stdout.write(self.style.SUCCESS('Benchmark abgeschlossen.'))
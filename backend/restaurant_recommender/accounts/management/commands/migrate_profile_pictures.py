@@ -0,0 +1,39 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import picture_store
+from accounts.user_store import user_repository
+
+# Jüngere Bilder werden nicht gelöscht: update_profile speichert das Bild vor dem Nutzerdatensatz.
+PRUNE_MIN_AGE_S = 3600
+
+
+class Command(BaseCommand):
+    help = ('Verschiebt Base64-Profilbilder aus der users.csv in den inhaltsadressierten Bildspeicher; '
+            'die users.csv enthält danach nur noch profile_picture_hash')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Bilder im Speicher löschen, die von keinem Nutzer mehr referenziert werden (älter als 1 Stunde)')
+
+    def handle(self, *args, **options):
+        size_before = os.path.getsize(user_repository.csv_path) if os.path.exists(user_repository.csv_path) else 0
+        migrated = user_repository.migrate_pictures()
+        if migrated is None:
+            self.stdout.write('users.csv ist bereits im aktuellen Format (profile_picture_hash).')
+        else:
+            size_after = os.path.getsize(user_repository.csv_path)
+            self.stdout.write(f'{migrated} Profilbilder in {picture_store.PICTURES_DIR} übernommen; '
+                              f'users.csv: {size_before / 1024:.1f} KB -> {size_after / 1024:.1f} KB.')
+
+        if options['prune']:
+            cutoff = time.time() - PRUNE_MIN_AGE_S
+            unreferenced = [picture_hash for picture_hash in
+                            picture_store.stored_hashes() - user_repository.picture_hashes()
+                            if os.path.getmtime(picture_store.picture_path(picture_hash)) < cutoff]
+            for picture_hash in unreferenced:
+                picture_store.delete_picture(picture_hash)
+            self.stdout.write(f'{len(unreferenced)} nicht mehr referenzierte Bilder gelöscht.')
+        self.stdout.write(self.style.SUCCESS('Migration der Profilbilder abgeschlossen.'))
@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from accounts.user_ids import migrate_user_ids
+from accounts.user_store import user_repository
+
+
+class Command(BaseCommand):
+    help = ('Stellt posts.csv, friends.csv und groups.csv einmalig auf stabile user_ids um (vergibt fehlende '
+            'user_ids in der users.csv) und meldet Verweise, die keinem Nutzer zugeordnet werden können')
+    # Der System-Check accounts.W001 meldet gerade das, was dieser Befehl behebt
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        assigned, results = migrate_user_ids()
+        self.stdout.write(f'{assigned} user_ids in der users.csv neu vergeben.')
+        # Ähnliche Schreibweisen (Leerzeichen, Groß-/Kleinschreibung) als Hinweis für die manuelle Korrektur
+        similar = {}
+        for username in user_repository.usernames():
+            similar.setdefault(username.strip().casefold(), []).append(username)
+        unresolved_total = 0
+        for path, (converted, unresolved) in results.items():
+            name = os.path.relpath(path, os.path.dirname(os.path.dirname(user_repository.csv_path)))
+            self.stdout.write(f'{name}: {converted} Verweise auf user_ids umgestellt.')
+            for ref, count in sorted(unresolved.items()):
+                unresolved_total += count
+                hint = similar.get(ref.strip().casefold())
+                hint = f' (meinten Sie {", ".join(repr(username) for username in hint)}?)' if hint else ''
+                self.stdout.write(self.style.WARNING(f'  {ref!r}: {count}× kein Nutzer mit diesem Namen oder dieser user_id{hint}'))
+        if unresolved_total:
+            self.stdout.write(self.style.WARNING(f'{unresolved_total} Verweise konnten nicht aufgelöst werden und bleiben '
+                                                 'unverändert stehen.'))
+        self.stdout.write(self.style.SUCCESS('Migration der user_ids abgeschlossen.'))
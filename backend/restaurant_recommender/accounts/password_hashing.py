@@ -0,0 +1,134 @@
+"""
+Begrenzter Executor für Passwort-Hashing beim Login.
+
+check_password mit PBKDF2 kostet pro Aufruf einige zehn Millisekunden CPU. Lief das direkt im
+Login-View, belegte eine Welle von Logins alle Worker-Threads und blockierte die übrigen Endpoints.
+Der PasswordHashingPool führt das Hashing stattdessen in wenigen eigenen Threads aus:
+  - Höchstens max_workers Hashes laufen gleichzeitig, höchstens max_queue warten. Ist die Warteschlange
+    voll, wirft submit sofort HashingSaturated (der Login-View antwortet mit 503 und Retry-After),
+    statt Requests unbegrenzt aufzustauen.
+  - Muss ein korrektes Passwort neu gehasht werden (z. B. höhere PBKDF2-Iterationszahl nach einem
+    Django-Update), wird das im Pool nach der Antwort erledigt, nicht im Request. Ist der Pool voll,
+    wird das Upgrade beim nächsten Login nachgeholt.
+  - stats() liefert Durchsatz und Wartezeiten für den auth_metrics-Endpoint.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class HashingSaturated(Exception):
+    """Die Warteschlange des Hashing-Pools ist voll; retry_after ist die geschätzte Wartezeit in Sekunden."""
+
+    def __init__(self, retry_after):
+        super().__init__('Passwort-Hashing ausgelastet')
+        self.retry_after = retry_after
+
+
+class PasswordHashingPool:
+    """Führt Passwort-Hashes in einem eigenen, größenbegrenzten Thread-Pool mit begrenzter Warteschlange aus."""
+
+    def __init__(self, max_workers=2, max_queue=32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hashing')
+        self._lock = threading.Lock()
+        self._pending = 0  # eingereiht oder laufend
+        # Metriken
+        self._started_at = time.monotonic()
+        self._hashes = 0
+        self._total_hash_time = 0.0
+        self._max_hash_time = 0.0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._max_queue_depth = 0
+        self._rejected = 0
+        self._rehashes = 0
+        self._rehashes_skipped = 0
+
+    def _queue_depth(self):
+        return max(0, self._pending - self.max_workers)
+
+    def _retry_after(self):
+        """Geschätzte Sekunden, bis die Warteschlange abgearbeitet ist (mindestens 1). Lock muss gehalten werden."""
+        avg_hash_time = self._total_hash_time / self._hashes if self._hashes else 0.1
+        return max(1, math.ceil(self._queue_depth() * avg_hash_time / self.max_workers))
+
+    def submit(self, fn, *args):
+        """Reiht fn(*args) ein und liefert ein Future; wirft HashingSaturated, wenn die Warteschlange voll ist."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HashingSaturated(self._retry_after())
+            self._pending += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth())
+        return self._executor.submit(self._run, fn, args, time.perf_counter())
+
+    def _run(self, fn, args, enqueued_at):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._pending -= 1
+                self._hashes += 1
+                self._total_hash_time += finished - started
+                self._max_hash_time = max(self._max_hash_time, finished - started)
+                self._total_wait += started - enqueued_at
+                self._max_wait_seen = max(self._max_wait_seen, started - enqueued_at)
+
+    async def acheck_password(self, password, encoded):
+        """
+        Prüft das Passwort im Pool, ohne den Event-Loop zu blockieren. Liefert (korrekt, upgrade_nötig);
+        upgrade_nötig ist True, wenn das Passwort stimmt und der Hash nicht mehr dem bevorzugten Hasher entspricht.
+        """
+        def check():
+            must_update = []
+            is_correct = check_password(password, encoded, setter=lambda raw_password: must_update.append(True))
+            return is_correct, bool(must_update)
+        return await asyncio.wrap_future(self.submit(check))
+
+    def schedule_rehash(self, password, old_hash, save):
+        """
+        Hasht das Passwort im Hintergrund neu und ruft save(old_hash, new_hash) auf. Ist der Pool ausgelastet,
+        wird das Upgrade übersprungen (beim nächsten Login erneut versucht). Liefert True, wenn es eingereiht wurde.
+        """
+        def rehash():
+            save(old_hash, make_password(password))
+            with self._lock:
+                self._rehashes += 1
+        try:
+            self.submit(rehash)
+        except HashingSaturated:
+            with self._lock:
+                self._rehashes_skipped += 1
+            return False
+        return True
+
+    def stats(self):
+        """Metriken für den auth_metrics-Endpoint."""
+        with self._lock:
+            avg_hash_time = self._total_hash_time / self._hashes if self._hashes else 0.0
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._pending - self._queue_depth(),
+                'queue_depth': self._queue_depth(),
+                'max_queue_depth': self._max_queue_depth,
+                'hashes': self._hashes,
+                'hashes_per_s': self._hashes / (time.monotonic() - self._started_at),
+                'capacity_per_s': self.max_workers / avg_hash_time if avg_hash_time else None,
+                'avg_hash_ms': avg_hash_time * 1000,
+                'max_hash_ms': self._max_hash_time * 1000,
+                'avg_wait_ms': self._total_wait / self._hashes * 1000 if self._hashes else 0.0,
+                'max_wait_ms_seen': self._max_wait_seen * 1000,
+                'rejected': self._rejected,
+                'rehashes': self._rehashes,
+                'rehashes_skipped': self._rehashes_skipped,
+            }
@@ -0,0 +1,111 @@
+"""
+Inhaltsadressierter Speicher für Profilbilder.
+
+Profilbilder lagen bisher als Base64-String in der users.csv und wurden bei jedem Scan der
+Nutzertabelle mitgelesen und bei jedem Login mitgeschickt. Jetzt wird jedes Bild einmal als
+Datei abgelegt, benannt nach dem SHA-256 seines Inhalts (pictures/<ersten 2 Zeichen>/<hash>).
+Der Nutzerdatensatz enthält nur noch den Hash (Spalte profile_picture_hash); ausgeliefert wird
+das Bild über accounts/profile_picture/<hash>/. Da sich der Inhalt zu einem Hash nie ändert,
+ist der Hash ein starker ETag und die Antwort unbegrenzt cachebar. Gleiche Bilder werden nur
+einmal gespeichert.
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+# Ablageort der Bilddateien (liegt im accounts-Ordner)
+PICTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pictures')
+
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Erkennung des Bildformats anhand der ersten Bytes
+CONTENT_TYPES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+def is_picture_hash(value):
+    return bool(value) and HASH_PATTERN.match(value) is not None
+
+
+def picture_path(picture_hash):
+    """Dateipfad zu einem Hash (ValueError bei ungültigem Hash, damit keine Pfade außerhalb von PICTURES_DIR entstehen)."""
+    if not is_picture_hash(picture_hash):
+        raise ValueError('Ungültiger Bild-Hash')
+    return os.path.join(PICTURES_DIR, picture_hash[:2], picture_hash)
+
+
+def store_picture(base64_picture):
+    """
+    Speichert ein Base64-kodiertes Bild und liefert seinen Hash ('' für ein leeres Bild).
+    Existiert die Datei bereits, wird nichts geschrieben. Wirft ValueError bei ungültigem Base64.
+    """
+    if not base64_picture:
+        return ''
+    try:
+        data = base64.b64decode(base64_picture, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('profile_picture ist kein gültiges Base64')
+    picture_hash = hashlib.sha256(data).hexdigest()
+    path = picture_path(picture_hash)
+    if not os.path.exists(path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Atomar schreiben: gleichzeitige Schreiber desselben Bildes erzeugen dieselbe Datei
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as picture_file:
+                picture_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return picture_hash
+
+
+def read_picture(picture_hash):
+    """Bytes des Bildes oder None, wenn der Hash ungültig ist oder die Datei fehlt."""
+    try:
+        with open(picture_path(picture_hash), 'rb') as picture_file:
+            return picture_file.read()
+    except (ValueError, FileNotFoundError):
+        return None
+
+
+def picture_base64(picture_hash):
+    """Bild als Base64-String (für Clients, die das Bild noch inline erwarten); '' wenn nicht vorhanden."""
+    data = read_picture(picture_hash) if picture_hash else None
+    return base64.b64encode(data).decode('ascii') if data else ''
+
+
+def content_type(data):
+    for magic, mime_type in CONTENT_TYPES:
+        if data.startswith(magic):
+            return mime_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def stored_hashes():
+    """Hashes aller gespeicherten Bilder."""
+    hashes = set()
+    if os.path.isdir(PICTURES_DIR):
+        for directory, _, filenames in os.walk(PICTURES_DIR):
+            hashes.update(name for name in filenames if is_picture_hash(name))
+    return hashes
+
+
+def delete_picture(picture_hash):
+    try:
+        os.remove(picture_path(picture_hash))
+    except FileNotFoundError:
+        pass
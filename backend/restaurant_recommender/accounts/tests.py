@@ -1,3 +1,560 @@
-from django.test import TestCase
+import base64
+import csv
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from recommender.rank_matrix import CuisineRankMatrix
+
+from . import picture_store
+from .log_table import MERGE_MIN_CHANGES, LogTable, read_log
+from .password_hashing import PasswordHashingPool
+from .user_ids import LEGACY_COLUMNS, convert_references, renaming
+from .user_store import FIELDNAMES as USER_FIELDNAMES, UsernameTaken, UserRepository, user_key
+
+FIELDNAMES = ['user_id', 'friends']
+
+
+class LogTableRecoveryTests(SimpleTestCase):
+    """Absturz-Szenarien der LogTable: Jeder Zustand auf der Platte muss sich ohne Datenverlust laden lassen."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, 'friends.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FIELDNAMES)
+            writer.writerows([['a', 'b'], ['b', 'a'], ['c', '']])
+
+    def table(self, **kwargs):
+        return LogTable(self.path, FIELDNAMES, key='user_id', **kwargs)
+
+    def state(self, table=None):
+        """Zustand, wie ihn ein frisch gestarteter Prozess liest."""
+        return {row['user_id']: row['friends'] for row in (table or self.table()).rows()}
+
+    def test_replay_equals_in_memory_state(self):
+        table = self.table()
+        table.update('a', friends='b,c')
+        table.put({'user_id': 'd', 'friends': 'a'})
+        table.delete('c')
+        table.update('a', friends='d')
+        expected = {'a': 'd', 'b': 'a', 'd': 'a'}
+        self.assertEqual(self.state(table), expected)
+        self.assertEqual(self.state(), expected)
+        # Die Basisdatei bleibt bis zur Verdichtung unverändert
+        with open(self.path, encoding='utf-8') as csvfile:
+            self.assertEqual(len(list(csv.DictReader(csvfile))), 3)
+
+    def test_torn_last_line_is_ignored_and_repaired_by_next_writer(self):
+        table = self.table()
+        table.update('a', friends='c')
+        with open(table.log_path, 'ab') as log_file:
+            log_file.write(b'{"k":"b","r":{"user_id":"b","fri')  # Absturz mitten im Schreiben
+        size = os.path.getsize(table.log_path)
+        recovered = self.table()
+        self.assertEqual(self.state(recovered), {'a': 'c', 'b': 'a', 'c': ''})
+        # Leser verändern das Log nicht (die Zeile könnte gerade noch geschrieben werden)
+        self.assertEqual(os.path.getsize(table.log_path), size)
+        # Der nächste Schreiber schneidet den Rest ab, sein Eintrag beginnt auf einer eigenen Zeile
+        with self.assertLogs('accounts.log_table', 'WARNING'):
+            recovered.update('b', friends='c')
+        records, _ = read_log(table.log_path)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(self.state(), {'a': 'c', 'b': 'c', 'c': ''})
+
+    def test_invalid_complete_line_keeps_following_records(self):
+        table = self.table()
+        table.update('a', friends='c')
+        with open(table.log_path, 'ab') as log_file:
+            log_file.write(b'{"k":"b","r":kaputt}\n')
+        table.update('b', friends='c')
+        table.delete('c')
+        size = os.path.getsize(table.log_path)
+        with self.assertLogs('accounts.log_table', 'WARNING'):
+            self.assertEqual(self.state(), {'a': 'c', 'b': 'c'})
+        self.assertEqual(os.path.getsize(table.log_path), size)
+
+    def test_crash_after_log_rotation(self):
+        # Schritt 1 der Verdichtung ist erfolgt (Log umbenannt), danach kamen neue Einträge, dann der Absturz
+        table = self.table()
+        table.update('a', friends='c')
+        table.delete('c')
+        os.replace(table.log_path, table.compacting_path)
+        table.put({'user_id': 'e', 'friends': 'a'})
+        self.assertEqual(self.state(), {'a': 'c', 'b': 'a', 'e': 'a'})
+        # Die nächste Verdichtung schließt die unterbrochene ab; die Basisdatei enthält danach alles
+        recovered = self.table()
+        self.assertTrue(recovered.compact())
+        self.assertFalse(os.path.exists(recovered.compacting_path))
+        with open(self.path, newline='', encoding='utf-8') as csvfile:
+            base = {row['user_id']: row['friends'] for row in csv.DictReader(csvfile)}
+        self.assertEqual(base, {'a': 'c', 'b': 'a', 'e': 'a'})
+        self.assertEqual(self.state(), base)
+
+    def test_crash_after_base_replace(self):
+        # Basisdatei ist schon neu geschrieben, .compacting wurde aber nicht mehr gelöscht: doppeltes Abspielen
+        table = self.table()
+        table.update('a', friends='c')
+        table.delete('c')
+        table.put({'user_id': 'd', 'friends': ''})
+        os.replace(table.log_path, table.compacting_path)
+        table._write_base(table.rows(), FIELDNAMES)
+        table.update('d', friends='a')
+        self.assertEqual(self.state(), {'a': 'c', 'b': 'a', 'd': 'a'})
+
+    def test_leftover_temp_file_is_ignored(self):
+        # Absturz während die temporäre Basisdatei geschrieben wurde
+        table = self.table()
+        table.update('b', friends='')
+        leftover = os.path.join(self._tmp.name, '.friends.csv.abc.tmp')
+        with open(leftover, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write('user_id,friends\nx,')
+        self.assertEqual(self.state(), {'a': 'b', 'b': '', 'c': ''})
+
+    def test_compaction_preserves_state(self):
+        table = self.table(compact_min_records=1)
+        for i in range(50):
+            table.put({'user_id': f'u{i}', 'friends': 'a'})
+            table.update('a', friends=f'u{i}')
+        table.wait_for_compaction()
+        table.compact()
+        expected = {'a': 'u49', 'b': 'a', 'c': '', **{f'u{i}': 'a' for i in range(50)}}
+        self.assertGreater(table.compactions, 0)
+        self.assertEqual(self.state(table), expected)
+        self.assertEqual(self.state(), expected)
+        self.assertEqual(table.stats()['log_records'], 0)
+
+    def test_concurrent_writers_lose_no_updates(self):
+        # Zwei Instanzen auf denselben Dateien verhalten sich wie zwei Prozesse
+        tables = [self.table(compact_min_records=20), self.table(compact_min_records=20)]
+
+        def write(table, prefix):
+            for i in range(100):
+                table.put({'user_id': f'{prefix}{i}', 'friends': prefix})
+
+        threads = [threading.Thread(target=write, args=(table, prefix)) for table, prefix in zip(tables, 'xy')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for table in tables:
+            table.wait_for_compaction()
+        state = self.state()
+        self.assertEqual(len(state), 203)
+        self.assertEqual(self.state(tables[0]), state)
+        self.assertEqual(self.state(tables[1]), state)
+
+
+class SnapshotTests(SimpleTestCase):
+    """Leser sehen unveränderliche Stände und warten nicht auf Schreiber."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, 'friends.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FIELDNAMES)
+            writer.writerows([[f'u{i}', ''] for i in range(10)])
+
+    def table(self):
+        return LogTable(self.path, FIELDNAMES, key='user_id')
+
+    def test_snapshot_is_isolated_from_later_writes(self):
+        table = self.table()
+        snapshot = table.snapshot()
+        table.update('u1', friends='u2')
+        table.delete('u2')
+        table.put({'user_id': 'new', 'friends': ''})
+        self.assertEqual(snapshot.get('u1')['friends'], '')
+        self.assertIn('u2', snapshot)
+        self.assertNotIn('new', snapshot)
+        self.assertEqual(len(snapshot), 10)
+        self.assertEqual(table.get('u1')['friends'], 'u2')
+        self.assertEqual(len(table), 10)
+        # Zurückgegebene Zeilen sind Kopien
+        snapshot.get('u3')['friends'] = 'x'
+        self.assertEqual(snapshot.get('u3')['friends'], '')
+
+    def test_merged_changes_keep_order_and_content(self):
+        table = self.table()
+        for i in range(3 * MERGE_MIN_CHANGES):
+            table.put({'user_id': f'n{i}', 'friends': str(i)})
+            table.update(f'u{i % 10}', friends=str(i))
+            if i % 7 == 0:
+                table.delete(f'n{i}')
+        self.assertEqual(table.rows(), self.table().rows())
+        self.assertEqual(len(table), len(self.table().rows()))
+
+    def test_reader_does_not_wait_for_writer(self):
+        table = self.table()
+        table.snapshot()
+        # Ein anderer Prozess ändert die Tabelle, während ein Schreiber dieses Prozesses den Lock hält
+        self.table().update('u1', friends='u2')
+        holding, release = threading.Event(), threading.Event()
+
+        def writer():
+            with table.lock:
+                holding.set()
+                release.wait()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        holding.wait()
+        try:
+            started = time.perf_counter()
+            self.assertEqual(table.get('u1')['friends'], '')  # zuletzt veröffentlichter Stand
+            self.assertLess(time.perf_counter() - started, 1)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(table.get('u1')['friends'], 'u2')
+
+    def test_user_index_is_copy_on_write(self):
+        path = os.path.join(self._tmp.name, 'users.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=USER_FIELDNAMES)
+            writer.writeheader()
+            writer.writerow({'user_id': 'id1', 'username': 'anna', 'account_type': 'user', 'dietary_preferences': 'Vegan'})
+        repository = UserRepository(path)
+        index = repository._current()
+        repository.add_user('ben', 'hash', 'user')
+        repository.update_user('anna', dietary_preferences='Halal')
+        repository.update_user('ben', username='bert')
+        # Der alte Stand ist unverändert
+        self.assertEqual(list(index.users), ['anna'])
+        self.assertEqual(index.dietary_index, {'vegan': {'id1'}})
+        self.assertEqual(index.users['anna']['dietary_preferences'], 'Vegan')
+        # Der neue Stand entspricht einem frisch geladenen
+        fresh = UserRepository(path)
+        self.assertEqual(repository.records(), fresh.records())
+        self.assertEqual(repository.search_usernames(''), fresh.search_usernames(''))
+        self.assertEqual([r['username'] for r in repository.users_with_dietary_preferences(['halal'])], ['anna'])
+        self.assertEqual(repository.users_with_dietary_preferences(['vegan']), [])
+
+
+def _increment(path, rounds):
+    """Lesen-Ändern-Schreiben in einem eigenen Prozess: Zähler erhöhen und neue IDs vergeben (wie create_post)."""
+    table = LogTable(path, FIELDNAMES, key='user_id')
+    for _ in range(rounds):
+        with table.lock:
+            table.update('counter', friends=str(int(table.get('counter')['friends']) + 1))
+            new_id = max(int(key[1:]) for key in table.keys() if key.startswith('p')) + 1
+            table.put({'user_id': f'p{new_id}', 'friends': str(os.getpid())})
+
+
+class MultiProcessTests(SimpleTestCase):
+    """Mehrere Worker-Prozesse schreiben in dieselbe Tabelle."""
+
+    def test_read_modify_write_across_processes_loses_no_updates(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'friends.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FIELDNAMES)
+            writer.writerows([['counter', '0'], ['p0', '']])
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_increment, args=(path, 100)) for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        table = LogTable(path, FIELDNAMES, key='user_id')
+        self.assertEqual(table.get('counter')['friends'], '300')
+        # Keine doppelt vergebene ID: jede der 300 IDs wurde genau einmal angelegt
+        self.assertEqual(sorted(key for key in table.keys() if key.startswith('p')),
+                         sorted(f'p{i}' for i in range(301)))
+
+
+class UserSearchTests(SimpleTestCase):
+    """Cursor-Pagination von search_usernames: jede Seite setzt lückenlos und ohne Doppelte fort."""
+
+    USERNAMES = ['anna', 'Anna', 'ANNA', 'annabell', 'Anton', 'arnold', ' Arnold', 'ben', 'Bert', 'a', 'ab', 'Ab']
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        path = os.path.join(self._tmp.name, 'users.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=USER_FIELDNAMES)
+            writer.writeheader()
+            for i, username in enumerate(self.USERNAMES):
+                writer.writerow({'user_id': f'id{i}', 'username': username,
+                                 'account_type': 'restaurant' if i % 3 == 0 else 'user'})
+        self.repository = UserRepository(path)
+
+    def all_pages(self, prefix, limit, account_type=None):
+        names, after = [], None
+        while True:
+            page, after = self.repository.search_usernames(prefix, account_type=account_type, limit=limit, after=after)
+            self.assertLessEqual(len(page), limit)
+            names += page
+            if after is None:
+                return names
+
+    def expected(self, prefix, account_type=None):
+        return sorted((username for i, username in enumerate(self.USERNAMES)
+                       if username.casefold().startswith(prefix.casefold())
+                       and account_type in (None, 'restaurant' if i % 3 == 0 else 'user')),
+                      key=lambda username: (username.casefold(), username))
+
+    def test_pages_have_no_duplicates_or_gaps(self):
+        for prefix in ('', 'a', 'AN', 'anna', ' ', 'z'):
+            for account_type in (None, 'user', 'restaurant'):
+                for limit in (1, 2, 3, 5, 50):
+                    with self.subTest(prefix=prefix, account_type=account_type, limit=limit):
+                        self.assertEqual(self.all_pages(prefix, limit, account_type), self.expected(prefix, account_type))
+
+    def test_users_added_while_paging(self):
+        first, after = self.repository.search_usernames('a', limit=3)
+        self.assertEqual(first, ['a', 'Ab', 'ab'])
+        # Vor dem Cursor angelegte Namen erscheinen nicht erneut, dahinter angelegte schon
+        self.repository.add_user('aa', 'hash', 'user')
+        self.repository.add_user('anke', 'hash', 'user')
+        rest = []
+        while after is not None:
+            page, after = self.repository.search_usernames('a', limit=3, after=after)
+            rest += page
+        self.assertEqual(rest, ['anke', 'ANNA', 'Anna', 'anna', 'annabell', 'Anton', 'arnold'])
+
+
+class RenameTests(SimpleTestCase):
+    """Umbenennungen prüfen unter dem Lock, ob der neue Benutzername frei ist."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        path = os.path.join(self._tmp.name, 'users.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=USER_FIELDNAMES)
+            writer.writeheader()
+            for i, username in enumerate(['anna', 'ben', 'carl']):
+                writer.writerow({'user_id': f'id{i}', 'username': username, 'account_type': 'user'})
+        self.repository = UserRepository(path)
+
+    def test_rename_to_existing_username_is_rejected(self):
+        with self.assertRaises(UsernameTaken):
+            self.repository.update_user('anna', username='ben')
+        self.assertEqual(self.repository.user_id('anna'), 'id0')
+        self.assertEqual(self.repository.user_id('ben'), 'id1')
+        self.assertTrue(self.repository.update_user('anna', username='anna', favorite_cuisines='Thai'))
+
+    def test_concurrent_renames_to_the_same_username(self):
+        barrier = threading.Barrier(2)
+        results = {}
+
+        def rename(username):
+            barrier.wait(5)
+            try:
+                results[username] = self.repository.update_user(username, username='dora')
+            except UsernameTaken:
+                results[username] = 'taken'
+
+        threads = [threading.Thread(target=rename, args=(username,)) for username in ('anna', 'ben')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results.values(), key=str), [True, 'taken'])
+        # Genau ein Nutzer heißt jetzt dora; der andere behält seinen Namen (auch nach dem Neuladen der Datei)
+        kept = [username for username, result in results.items() if result == 'taken']
+        self.assertEqual(sorted(UserRepository(self.repository.csv_path).usernames()), sorted(['carl', 'dora'] + kept))
+
+    def test_update_profile_answers_400(self):
+        with mock.patch('accounts.views.user_repository', self.repository):
+            response = self.client.post(reverse('update_profile'), {'username': 'anna', 'new_username': 'carl'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Username existiert bereits')
+
+
+class PasswordHashingTests(SimpleTestCase):
+    """Login über den begrenzten Hashing-Pool: 503 bei voller Warteschlange, Hash-Upgrade nach der Antwort."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        path = os.path.join(self._tmp.name, 'users.csv')
+        # Hash mit weniger Iterationen als der aktuelle Standard: ein korrekter Login muss ihn erneuern
+        self.old_hash = PBKDF2PasswordHasher().encode('geheim', 'salzsalzsalz', iterations=1000)
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=USER_FIELDNAMES)
+            writer.writeheader()
+            writer.writerow({'user_id': 'id0', 'username': 'anna', 'password_hash': self.old_hash, 'account_type': 'user'})
+        self.repository = UserRepository(path)
+        patcher = mock.patch('accounts.views.user_repository', self.repository)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_pool(self, **kwargs):
+        pool = PasswordHashingPool(**kwargs)
+        self.addCleanup(pool._executor.shutdown)
+        patcher = mock.patch('accounts.views.password_hashing', pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return pool
+
+    def block(self, pool):
+        """Belegt den einzigen Worker, bis der Test endet."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        pool.submit(release.wait, 5)
+
+    def login(self):
+        return self.client.post(reverse('login'), {'username': 'anna', 'password': 'geheim', 'inline_picture': False},
+                                content_type='application/json')
+
+    def test_saturated_pool_answers_503_with_retry_after(self):
+        pool = self.use_pool(max_workers=1, max_queue=0)
+        self.block(pool)
+        response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(pool.stats()['rejected'], 1)
+
+    def test_rehash_replaces_hash_after_login(self):
+        pool = self.use_pool(max_workers=1, max_queue=4)
+        replace = mock.patch.object(self.repository, 'replace_password_hash', wraps=self.repository.replace_password_hash)
+        with replace as replace_password_hash:
+            response = self.login()
+            self.assertEqual(response.status_code, 200)
+            deadline = time.monotonic() + 30
+            while pool.stats()['rehashes'] < 1:
+                self.assertLess(time.monotonic(), deadline, 'Hash-Upgrade wurde nicht ausgeführt')
+                time.sleep(0.01)
+        new_hash = self.repository.get('anna')['password_hash']
+        replace_password_hash.assert_called_once_with('anna', self.old_hash, new_hash)
+        self.assertNotEqual(new_hash, self.old_hash)
+        self.assertTrue(check_password('geheim', new_hash))
+
+    def test_rehash_is_skipped_when_pool_is_full(self):
+        pool = self.use_pool(max_workers=1, max_queue=0)
+        self.block(pool)
+        save = mock.Mock()
+        self.assertFalse(pool.schedule_rehash('geheim', self.old_hash, save))
+        save.assert_not_called()
+        self.assertEqual(pool.stats()['rehashes_skipped'], 1)
+        self.assertEqual(pool.stats()['rehashes'], 0)
+
+
+class ProfilePictureTests(SimpleTestCase):
+    """Profilbilder sind über ihren Hash unbegrenzt cachebar; Revalidierung liefert 304 ohne Inhalt."""
+
+    PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(picture_store, 'PICTURES_DIR', tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.picture_hash = picture_store.store_picture(base64.b64encode(self.PNG).decode('ascii'))
+        self.url = reverse('profile_picture', args=[self.picture_hash])
+
+    def test_returns_picture_with_strong_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.PNG)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], f'"{self.picture_hash}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_matching_if_none_match_returns_304(self):
+        for if_none_match in (f'"{self.picture_hash}"', f'W/"{self.picture_hash}"', f'"other", "{self.picture_hash}"', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], f'"{self.picture_hash}"')
+
+    def test_other_etag_returns_picture(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"' + '0' * 64 + '"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.PNG)
+
+    def test_unknown_hash_returns_404(self):
+        response = self.client.get(reverse('profile_picture', args=['0' * 64]))
+        self.assertEqual(response.status_code, 404)
+
+
+class LegacyDataTests(SimpleTestCase):
+    """Vor migrate_user_ids (Dateien ohne user_id) verweisen alle Tabellen weiter über den Benutzernamen."""
+
+    def write(self, name, rows):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            csv.writer(csvfile).writerows(rows)
+        return path
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        users_path = self.write('users.csv', [
+            ['username', 'password_hash', 'account_type', 'profile_picture', 'favorite_cuisines', 'dietary_preferences'],
+            ['anna', 'hash', 'user', '', 'Italian,Thai', ''],
+            ['ben', 'hash', 'user', '', 'Thai', ''],
+        ])
+        posts_path = self.write('posts.csv', [
+            ['post_id', 'username', 'image_data', 'post_text', 'timestamp'],
+            ['1', 'anna', '', 'Pizza', '2024-01-01T12:00:00'],
+            ['2', 'ben', '', 'Curry', '2024-01-02T12:00:00'],
+        ])
+        friends_path = self.write('friends.csv', [['username', 'friends'], ['anna', 'ben']])
+        self.posts_path = posts_path
+        self.repository = UserRepository(users_path)
+        self.ranks = CuisineRankMatrix(users_path, key_field=user_key)
+        self.posts = LogTable(posts_path, ['post_id', 'user_id', 'image_data', 'post_text', 'timestamp'],
+                              key='post_id', convert=renaming(LEGACY_COLUMNS))
+        self.friends = LogTable(friends_path, ['user_id', 'friends'], key='user_id', convert=renaming(LEGACY_COLUMNS))
+        for target, value in [('posts.views.posts_table', self.posts), ('posts.views.user_repository', self.repository),
+                              ('friends.views.friends_table', self.friends),
+                              ('friends.views.user_repository', self.repository),
+                              ('accounts.views.user_repository', self.repository),
+                              ('accounts.views.user_ranks', self.ranks)]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, content_type='application/json')
+
+    def test_posts_resolve_their_authors(self):
+        response = self.client.get(reverse('list_posts'))
+        self.assertEqual([post['username'] for post in response.json()['posts']], ['ben', 'anna'])
+        self.assertEqual(self.post('delete_post', {'post_id': 1, 'username': 'ben'}).status_code, 400)
+        self.assertEqual(self.post('delete_post', {'post_id': 1, 'username': 'anna'}).status_code, 200)
+        self.assertEqual(self.posts.keys(), ['2'])
+
+    def test_friends_are_found(self):
+        self.assertEqual(self.post('get_friends', {'username': 'anna'}).json()['friends'], ['ben'])
+        self.assertEqual(self.post('get_friends', {'username': 'ben'}).json()['friends'], [])
+
+    def test_rank_matrix_uses_usernames(self):
+        self.assertEqual(self.ranks.keys(), ['anna', 'ben'])
+        self.assertEqual(self.ranks.rank_rows(['anna', 'ben'], ['italian', 'thai']).tolist(), [[1, 2], [0, 1]])
+        self.assertEqual(self.post('update_favorites', {'username': 'ben', 'favorite_cuisines': 'Italian'}).status_code, 200)
+        self.assertEqual(self.ranks.rank_rows(['ben'], ['italian', 'thai']).tolist(), [[1, 0]])
+        self.assertEqual(self.ranks.keys(), ['anna', 'ben'])
+
+    def test_conversion_keeps_logged_changes(self):
+        # Ein noch nicht verdichteter Post im Log wird mit umgestellt
+        self.posts.put({'post_id': '3', 'user_id': 'anna', 'image_data': '', 'post_text': 'Pho', 'timestamp': ''})
+        self.repository.assign_missing_ids()
+        user_ids = self.repository.id_map()
+        converted, unresolved = convert_references(self.posts_path, LEGACY_COLUMNS, 'post_id', ['user_id'], [], user_ids)
+        self.assertEqual((converted, unresolved), (3, {}))
+        self.assertEqual({row['post_id']: row['user_id'] for row in LogTable(self.posts_path, None, key='post_id').rows()},
+                         {'1': user_ids['anna'], '2': user_ids['ben'], '3': user_ids['anna']})
+        # Zweiter Lauf: nichts mehr zu tun
+        self.assertEqual(convert_references(self.posts_path, LEGACY_COLUMNS, 'post_id', ['user_id'], [], user_ids), (0, {}))
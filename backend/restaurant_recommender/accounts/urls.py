@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import register, login_view, update_profile, update_favorites, get_users, update_dietary_preferences, filter_by_dietary_preferences, get_group_dietary_preferences
+from .views import register, login_view, update_profile, update_favorites, get_users, search_users, update_dietary_preferences, filter_by_dietary_preferences, get_group_dietary_preferences, profile_picture, auth_metrics
 
 urlpatterns = [
     path('register/', register, name='register'),
@@ -7,7 +7,10 @@ urlpatterns = [
     path('update_profile/', update_profile, name='update_profile'),
     path('update_favorites/', update_favorites, name='update_favorites'),
     path('get_users/', get_users, name='get_users'),
+    path('search_users/', search_users, name='search_users'),
     path('update_dietary_preferences/', update_dietary_preferences, name='update_dietary_preferences'),
     path('filter_by_dietary_preferences/', filter_by_dietary_preferences, name='filter_by_dietary_preferences'),
     path('get_group_dietary_preferences/', get_group_dietary_preferences, name='get_group_dietary_preferences'),
+    path('profile_picture/<str:picture_hash>/', profile_picture, name='profile_picture'),
+    path('auth_metrics/', auth_metrics, name='auth_metrics'),
 ]
@@ -0,0 +1,157 @@
+"""
+Stabile user_ids für alle CSV-Tabellen.
+
+posts.csv, friends.csv und groups.csv verweisen über die unveränderliche user_id auf Nutzer
+statt über den Benutzernamen. Vorher hat eine Umbenennung in update_profile alle vier Dateien
+(inklusive der Base64-Bilder in posts.csv) gelesen und neu geschrieben; jetzt ändert sie nur
+die Zeile des Nutzers in der users.csv.
+
+migrate_user_ids wird einmalig mit python manage.py migrate_user_ids ausgeführt (nicht beim Start)
+und stellt bestehende Dateien in einem Durchlauf um:
+  1. Nutzer ohne user_id erhalten eine (users.csv).
+  2. In posts.csv (username -> user_id), friends.csv (username -> user_id, friends) und
+     groups.csv (created_by, members) wird jeder Name eines bekannten Nutzers durch seine
+     user_id ersetzt. Verweise, die weder user_id noch Name eines Nutzers sind, bleiben stehen
+     und werden gemeldet (das Kommando nennt ähnlich geschriebene Benutzernamen).
+Gelesen wird jeweils die Tabelle samt Änderungs-Log (log_table); geänderte Tabellen werden vollständig neu
+geschrieben. Bereits umgestellte Dateien werden nur gelesen, nicht neu geschrieben. Eine Sperrdatei verhindert,
+dass mehrere gleichzeitige Läufe verschiedene IDs vergeben.
+Bis dahin lesen alle Tabellen die alten Dateien weiter: posts_table und friends_table übernehmen die alte Spalte
+username als user_id (renaming), die Rangmatrix und user_repository schlüsseln Nutzer ohne user_id über den
+Benutzernamen (user_store.user_key), und Verweise sind dort der Name selbst (user_repository.ref).
+Solange eine Datei noch nicht umgestellt ist, meldet der System-Check check_user_ids eine Warnung
+(manage.py check, runserver, migrate); er liest nur die Kopfzeilen und schreibt nichts.
+"""
+
+import csv
+import os
+import time
+from contextlib import contextmanager
+
+from django.core import checks
+
+from .log_table import LogTable
+from .user_store import USERS_CSV_PATH, user_repository
+
+POSTS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'posts', 'posts.csv')
+FRIENDS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'friends', 'friends.csv')
+GROUPS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'recommender', 'groups.csv')
+LOCK_PATH = USERS_CSV_PATH + '.lock'
+
+# Alte Spaltennamen der Verweise in posts.csv und friends.csv (vor der Umstellung)
+LEGACY_COLUMNS = {'username': 'user_id'}
+
+# Umzustellende Tabellen: (Pfad, umbenannte Spalten, Schlüsselspalte, Spalten mit einem Verweis,
+# Spalten mit kommaseparierten Verweisen)
+REFERENCE_TABLES = [
+    (POSTS_CSV_PATH, LEGACY_COLUMNS, 'post_id', ['user_id'], []),
+    (FRIENDS_CSV_PATH, LEGACY_COLUMNS, 'user_id', ['user_id'], ['friends']),
+    (GROUPS_CSV_PATH, {}, 'group_id', ['created_by'], ['members']),
+]
+
+# Älter als das gilt eine Sperrdatei als Rest eines abgestürzten Prozesses
+STALE_LOCK_S = 60.0
+
+
+def renaming(renamed_columns):
+    """convert-Funktion für LogTable, die Spalten alter Dateien beim Laden umbenennt."""
+    return lambda row: {renamed_columns.get(name, name): value for name, value in row.items()}
+
+
+@contextmanager
+def migration_lock(path=LOCK_PATH, stale_after=STALE_LOCK_S):
+    """Prozessübergreifende Sperre über eine exklusiv angelegte Datei."""
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > stale_after:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+def convert_references(path, renamed_columns, key, single_columns, list_columns, user_ids):
+    """
+    Ersetzt in einer Tabelle die Namen bekannter Nutzer durch ihre user_id (und benennt Spalten um).
+    Liest und schreibt unter den Locks der Tabelle; schreibt nur, wenn sich etwas ändert (atomar).
+    Liefert (Anzahl ersetzter Verweise, {Verweis: Anzahl} der Verweise, die weder user_id noch Name eines Nutzers sind).
+    """
+    unresolved = {}
+    if not os.path.exists(path):
+        return 0, unresolved
+    known_ids = set(user_ids.values())
+    table = LogTable(path, None, key=key, convert=renaming(renamed_columns))
+    converted = 0
+
+    def transform(rows):
+        # Läuft unter den Locks der Tabelle: gleichzeitige Änderungen anderer Prozesse sind enthalten
+        nonlocal converted
+        source_header = table.base_header or []
+        header = [renamed_columns.get(name, name) for name in source_header]
+        for row in rows:
+            refs = [row[column] for column in single_columns if row.get(column)]
+            refs += [ref for column in list_columns if row.get(column) for ref in row[column].split(',')]
+            for ref in refs:
+                if ref in user_ids:
+                    converted += 1
+                elif ref not in known_ids:
+                    unresolved[ref] = unresolved.get(ref, 0) + 1
+            for column in single_columns:
+                if row.get(column) in user_ids:
+                    row[column] = user_ids[row[column]]
+            for column in list_columns:
+                if row.get(column):
+                    row[column] = ','.join(user_ids.get(ref, ref) for ref in row[column].split(','))
+        return (rows, header) if converted or header != source_header else None
+
+    table.rewrite(transform=transform)
+    return converted, unresolved
+
+
+def migrate_user_ids():
+    """
+    Vergibt fehlende user_ids und stellt die Verweise aller Tabellen um.
+    Liefert (Anzahl neu vergebener user_ids, {Pfad: (ersetzte Verweise, nicht auflösbare Verweise)}).
+    """
+    with migration_lock():
+        assigned = user_repository.assign_missing_ids()
+        user_ids = user_repository.id_map()
+        return assigned, {path: convert_references(path, renamed, key, single, lists, user_ids)
+                          for path, renamed, key, single, lists in REFERENCE_TABLES}
+
+
+def pending_tables():
+    """Pfade der CSVs, deren Kopfzeile noch den Stand vor der Umstellung auf user_ids zeigt."""
+    pending = []
+    for path, renamed, required in [(USERS_CSV_PATH, {}, 'user_id')] + \
+            [(path, renamed, None) for path, renamed, _, _, _ in REFERENCE_TABLES]:
+        try:
+            with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+                header = next(csv.reader(csvfile), [])
+        except FileNotFoundError:
+            continue
+        if (required and required not in header) or any(name in header for name in renamed):
+            pending.append(path)
+    return pending
+
+
+def check_user_ids(app_configs, **kwargs):
+    """System-Check: warnt, solange CSVs noch nicht auf user_ids umgestellt sind (schreibt nichts)."""
+    return [
+        checks.Warning(
+            f'{os.path.normpath(path)} ist noch nicht auf stabile user_ids umgestellt.',
+            hint='Einmalig python manage.py migrate_user_ids ausführen.',
+            id='accounts.W001',
+        )
+        for path in pending_tables()
+    ]
@@ -0,0 +1,434 @@
+"""
+Gemeinsames In-Memory-Verzeichnis der Nutzer aus der users.csv.
+
+Bisher hat jeder Account-Endpoint die komplette users.csv mit csv.DictReader gelesen.
+UserRepository hält stattdessen alle Zeilen im Speicher plus ein Dict username -> Datensatz:
+  - Lookups (Login, Registrierung, Gruppen-Präferenzen) sind O(1) im Speicher.
+  - Schreibzugriffe laufen über das Repository (add_user, update_user); es hängt die geänderte
+    Zeile an das Log der Tabelle an (log_table.LogTable), statt die Datei neu zu schreiben.
+    Die Verdichtung in die users.csv läuft im Hintergrund.
+  - Alle Indizes bilden zusammen einen unveränderlichen Stand (UserIndex). Leser nehmen keinen Lock und
+    arbeiten für die Dauer einer Abfrage auf dem Stand, den sie zu Beginn gelesen haben. Schreiber bauen
+    unter dem Lock einen neuen Stand, der nur die betroffenen Strukturen kopiert, und veröffentlichen ihn
+    nach dem Log-Eintrag mit einer Zuweisung.
+Profilbilder liegen nicht in der Tabelle, sondern im Bildspeicher (picture_store); die Zeile
+enthält nur profile_picture_hash. Dateien im alten Format (Base64-Bild in der Spalte
+profile_picture) werden beim Laden in den Bildspeicher übernommen und bei der nächsten
+Verdichtung bzw. mit python manage.py migrate_profile_pictures ohne die Bilder neu geschrieben.
+Jeder Nutzer hat eine unveränderliche user_id; posts.csv, friends.csv und groups.csv verweisen
+über sie auf Nutzer (siehe user_ids). Eine Umbenennung ändert daher nur die eigene Zeile.
+Verweise auf Namen ohne Eintrag in der users.csv bleiben als Name stehen und werden von
+username_for unverändert zurückgegeben.
+Für dietary_preferences führt das Repository einen invertierten Index (Präferenz in Kleinschreibung
+-> Menge von Nutzern) und die bereits zerlegten Präferenzen je Nutzer. Filter nach "einer dieser
+Präferenzen" sind damit Vereinigungen von Mengen, die Aggregation für eine Gruppe ist O(Mitglieder).
+Der Index wird beim Laden aufgebaut und bei update_user für den geänderten Nutzer nachgeführt.
+Für die Nutzersuche (search_usernames) liegen die Benutzernamen zusätzlich als sortierte Arrays
+(casefold, Name) vor, eines für alle Nutzer und eines je account_type. Eine Präfixsuche ist eine
+Binärsuche plus höchstens limit + 1 Einträge, unabhängig von der Gesamtzahl der Nutzer.
+Ändert sich die Tabelle auf anderem Weg (z. B. durch einen anderen Worker-Prozess), werden die
+Indizes beim nächsten Zugriff neu aufgebaut. Bei doppelten Benutzernamen gilt wie bisher beim
+Login die erste Zeile.
+"""
+
+import bisect
+import os
+import uuid
+
+from .log_table import LogTable
+from .picture_store import store_picture
+
+FIELDNAMES = ['user_id', 'username', 'password_hash', 'account_type', 'profile_picture_hash', 'favorite_cuisines', 'dietary_preferences']
+# Frühere Spalte mit dem Base64-Bild
+LEGACY_PICTURE_FIELD = 'profile_picture'
+
+
+class UsernameTaken(Exception):
+    """Eine Umbenennung (update_user) zielt auf einen Benutzernamen, den bereits ein anderer Nutzer trägt."""
+
+    def __init__(self, username):
+        super().__init__('Username existiert bereits')
+        self.username = username
+
+
+def new_user_id():
+    return uuid.uuid4().hex
+
+
+def user_key(record):
+    """Schlüssel einer Zeile in der Tabelle: user_id, vor der Migration (user_ids) der Benutzername."""
+    return record.get('user_id') or record.get('username') or ''
+
+
+def split_preferences(value):
+    """Zerlegt eine kommaseparierte dietary_preferences-Spalte in die einzelnen (getrimmten) Präferenzen."""
+    return tuple(dict.fromkeys(p.strip() for p in (value or '').split(',') if p.strip()))
+
+
+class UserIndex:
+    """
+    Unveränderlicher Stand aller Indizes über den Zeilen der users.csv. Wird nach dem Veröffentlichen nicht mehr
+    verändert; Schreiber bauen mit added/replaced einen neuen Stand und kopieren dabei nur die betroffenen Strukturen.
+    """
+
+    def __init__(self, rows, table_version):
+        # Stand der Tabelle, aus dem die Indizes aufgebaut sind
+        self.table_version = table_version
+        # Erste Zeile je Benutzername bzw. user_id (alle Zeilen liefert der Snapshot der Tabelle)
+        self.users, self.ids = {}, {}
+        for record in rows:
+            self.users.setdefault(record['username'], record)
+            if record['user_id']:
+                self.ids.setdefault(record['user_id'], record)
+        # Dietary-Index über dem ersten Datensatz je Nutzer (Schlüssel: user_id, ohne user_id der Name):
+        # Präferenz (klein) -> Schlüssel, Schlüssel -> zerlegte Präferenzen, Schlüssel -> Zeilenposition
+        self.dietary_index, self.dietary = {}, {}
+        self.positions = {user_key(record): position for position, record in enumerate(self.users.values())}
+        for record in self.users.values():
+            preferences = split_preferences(record['dietary_preferences'])
+            if preferences:
+                self.dietary[user_key(record)] = preferences
+            for preference in preferences:
+                self.dietary_index.setdefault(preference.lower(), set()).add(user_key(record))
+        # Suchindex: account_type (None = alle) -> sortierte Liste von (casefold(username), username)
+        self.search_index = {None: []}
+        for username, record in self.users.items():
+            self.search_index[None].append((username.casefold(), username))
+            self.search_index.setdefault(record['account_type'], []).append((username.casefold(), username))
+        for entries in self.search_index.values():
+            entries.sort()
+
+    def _copy(self):
+        index = object.__new__(UserIndex)
+        index.__dict__.update(self.__dict__)
+        return index
+
+    def _index_dietary(self, record):
+        """
+        Trägt die dietary_preferences eines Datensatzes neu ein. Nur auf einem noch nicht veröffentlichten Stand
+        mit kopierten dietary/dietary_index; die betroffenen Mengen werden ersetzt, nicht verändert.
+        """
+        key = user_key(record)
+        for preference in self.dietary.pop(key, ()):
+            holders = self.dietary_index.get(preference.lower())
+            if holders is not None:
+                holders = holders - {key}
+                if holders:
+                    self.dietary_index[preference.lower()] = holders
+                else:
+                    del self.dietary_index[preference.lower()]
+        preferences = split_preferences(record['dietary_preferences'])
+        if preferences:
+            self.dietary[key] = preferences
+        for preference in preferences:
+            self.dietary_index[preference.lower()] = self.dietary_index.get(preference.lower(), set()) | {key}
+
+    def lookup(self, ref):
+        """Datensatz zu einer user_id oder einem Benutzernamen (oder None)."""
+        record = self.ids.get(ref)
+        return record if record is not None else self.users.get(ref)
+
+    def ref(self, username):
+        record = self.users.get(username)
+        return record['user_id'] if record is not None and record['user_id'] else username
+
+    def added(self, record):
+        """Neuer Stand mit einem zusätzlichen Nutzer (noch ohne dietary_preferences)."""
+        index = self._copy()
+        index.users = {**self.users, record['username']: record}
+        index.ids = {**self.ids, record['user_id']: record}
+        index.positions = {**self.positions, record['user_id']: len(self.positions)}
+        index.search_index = dict(self.search_index)
+        for account_type in (None, record['account_type']):
+            entries = list(index.search_index.get(account_type, []))
+            bisect.insort(entries, (record['username'].casefold(), record['username']))
+            index.search_index[account_type] = entries
+        return index
+
+    def replaced(self, old, new):
+        """
+        Neuer Stand, in dem der Datensatz old durch new ersetzt ist. None, wenn sich username oder account_type
+        ändern (Suchindex und Positionen werden dann aus der Tabelle neu aufgebaut).
+        """
+        if new['username'] != old['username'] or new['account_type'] != old['account_type']:
+            return None
+        index = self._copy()
+        if self.users.get(old['username']) is old:
+            index.users = {**self.users, new['username']: new}
+        if new['user_id'] and self.ids.get(new['user_id']) is old:
+            index.ids = {**self.ids, new['user_id']: new}
+        if new['dietary_preferences'] != old['dietary_preferences'] and index.users.get(new['username']) is new:
+            index.dietary_index, index.dietary = dict(self.dietary_index), dict(self.dietary)
+            index._index_dietary(new)
+        return index
+
+
+class UserRepository:
+    """
+    Verzeichnis username -> Nutzerdatensatz über einer users.csv. Leser arbeiten ohne Lock auf dem zuletzt
+    veröffentlichten UserIndex; Schreiber nehmen einen Lock, bauen einen neuen Stand und veröffentlichen ihn.
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self._table = LogTable(csv_path, FIELDNAMES, key=user_key, convert=self._record)
+        # Schreib-Lock der Tabelle (auch zwischen Prozessen: z. B. prüfen zwei Worker nicht gleichzeitig, ob ein
+        # Benutzername frei ist); das Neuaufbauen der Indizes durch Leser schützt nur dessen prozessinterner Teil
+        self._lock = self._table.lock
+        # Zuletzt veröffentlichter Stand der Indizes (None bis zum ersten Laden)
+        self._index = None
+        # Wird bei jeder Änderung erhöht; erlaubt abgeleiteten Indizes, veraltete Stände zu erkennen.
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Laden und Schreiben der Tabelle
+    # ------------------------------------------------------------------
+
+    @property
+    def lock(self):
+        """Schreib-Lock der users.csv (reentrant, auch zwischen Prozessen), z. B. um den Stand um ein Schreiben zu lesen."""
+        return self._lock
+
+    def _record(self, row):
+        """Datensatz mit den Spalten FIELDNAMES; ein Bild aus der Spalte profile_picture wird in den Bildspeicher übernommen."""
+        record = {name: row.get(name) or '' for name in FIELDNAMES}
+        legacy_picture = row.get(LEGACY_PICTURE_FIELD)
+        if legacy_picture and not record['profile_picture_hash']:
+            try:
+                record['profile_picture_hash'] = store_picture(legacy_picture)
+            except ValueError:
+                pass
+        return record
+
+    _key = staticmethod(user_key)
+
+    def _ensure_current(self):
+        """Baut die Indizes neu auf, wenn sich die Tabelle geändert hat. Muss mit gehaltenem lock.mutex aufgerufen werden."""
+        snapshot = self._table.snapshot()
+        if self._index is None or self._index.table_version != snapshot.version:
+            self._index = UserIndex(snapshot.rows(), snapshot.version)
+            self.version += 1
+        return self._index
+
+    def _current(self):
+        """
+        Aktueller Stand der Indizes für Leser, ohne auf Schreiber zu warten: Muss neu aufgebaut werden und hält
+        gerade ein Schreiber den Lock, gilt der zuletzt veröffentlichte Stand.
+        """
+        index = self._index
+        if index is not None and index.table_version == self._table.snapshot().version:
+            return index
+        # Nur beim allerersten Laden wird gewartet
+        if not self._lock.mutex.acquire(blocking=index is None):
+            return index
+        try:
+            return self._ensure_current()
+        finally:
+            self._lock.mutex.release()
+
+    def _put(self, record, index, old_key=None):
+        """
+        Schreibt einen Datensatz in die Tabelle (ein Log-Eintrag) und veröffentlicht index, den bereits angepassten
+        neuen Stand (None: aus der Tabelle neu aufbauen). Muss mit gehaltenem Lock nach _ensure_current aufgerufen werden.
+        """
+        expected = self._table.version + 1
+        if old_key is not None and old_key != self._key(record):
+            self._table.delete(old_key)
+            expected += 1
+        self._table.put(record)
+        if index is None:
+            self._ensure_current()
+            return
+        # Hat der Tabellen-Zugriff zugleich Änderungen anderer Prozesse eingelesen, beim nächsten Zugriff neu aufbauen
+        index.table_version = expected if self._table.version == expected else None
+        self._index = index
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def get(self, username):
+        """Datensatz (Kopie) oder None."""
+        record = self._current().users.get(username)
+        return dict(record) if record is not None else None
+
+    def __contains__(self, username):
+        return username in self._current().users
+
+    def usernames(self, account_type=None):
+        """Alle Benutzernamen in Dateireihenfolge, optional nur mit dem angegebenen account_type."""
+        return [username for username, record in self._current().users.items()
+                if account_type is None or record.get('account_type') == account_type]
+
+    def records(self):
+        """Alle Datensätze (Kopien) in Dateireihenfolge."""
+        return [dict(record) for record in self._current().users.values()]
+
+    def user_id(self, username):
+        """user_id eines Nutzers oder None."""
+        record = self._current().users.get(username)
+        return record['user_id'] or None if record is not None else None
+
+    def refs(self, usernames):
+        """
+        Verweise (wie in posts.csv, friends.csv, groups.csv gespeichert) für Benutzernamen:
+        die user_id bekannter Nutzer, sonst der Name selbst.
+        """
+        index = self._current()
+        return [index.ref(username) for username in usernames]
+
+    def ref(self, username):
+        return self.refs([username])[0]
+
+    def usernames_for(self, refs):
+        """Aktuelle Benutzernamen zu Verweisen (user_id oder Name); unbekannte Verweise unverändert."""
+        ids = self._current().ids
+        return [ids[ref]['username'] if ref in ids else ref for ref in refs]
+
+    def username_for(self, ref):
+        return self.usernames_for([ref])[0]
+
+    def id_map(self):
+        """{username: user_id} aller Nutzer mit user_id."""
+        return {username: record['user_id'] for username, record in self._current().users.items() if record['user_id']}
+
+    def users_with_dietary_preferences(self, preferences):
+        """
+        Datensätze (Kopien, in Dateireihenfolge) aller Nutzer mit mindestens einer der Präferenzen
+        (Groß-/Kleinschreibung egal): Vereinigung der Mengen aus dem Index.
+        """
+        index = self._current()
+        keys = set().union(*(index.dietary_index.get(p.strip().lower(), ()) for p in preferences))
+        return [dict(index.lookup(key)) for key in sorted(keys, key=index.positions.__getitem__)]
+
+    def dietary_preferences_for(self, refs):
+        """
+        Vereinigung der dietary_preferences der angegebenen Nutzer (user_ids oder Benutzernamen), in der
+        Schreibweise der Datei und in der Reihenfolge des ersten Auftretens. Unbekannte Nutzer werden ignoriert.
+        """
+        index = self._current()
+        aggregated = {}
+        for ref in dict.fromkeys(refs):
+            record = index.lookup(ref)
+            if record is not None:
+                aggregated.update(dict.fromkeys(index.dietary.get(self._key(record), ())))
+        return list(aggregated)
+
+    def search_usernames(self, prefix='', account_type=None, limit=20, after=None):
+        """
+        Benutzernamen, die (ohne Beachtung der Groß-/Kleinschreibung) mit prefix beginnen, sortiert, optional nur
+        mit dem angegebenen account_type. Mit after (letzter Name der vorherigen Seite) wird hinter diesem Namen
+        fortgesetzt. Liefert (Namen, after für die nächste Seite oder None).
+        """
+        prefix = prefix.casefold()
+        entries = self._current().search_index.get(account_type, [])
+        start = bisect.bisect_left(entries, (prefix, ''))
+        if after is not None:
+            start = max(start, bisect.bisect_right(entries, (after.casefold(), after)))
+        page = []
+        for key, username in entries[start:start + limit + 1]:
+            if not key.startswith(prefix):
+                break
+            page.append(username)
+        if len(page) > limit:
+            return page[:limit], page[limit - 1]
+        return page, None
+
+    def compact(self):
+        """Verdichtet das Log in die users.csv (läuft sonst automatisch im Hintergrund)."""
+        return self._table.compact()
+
+    def picture_hashes(self):
+        """Alle referenzierten Bild-Hashes."""
+        return {record['profile_picture_hash'] for record in self._table.rows() if record['profile_picture_hash']}
+
+    # ------------------------------------------------------------------
+    # Schreiben
+    # ------------------------------------------------------------------
+
+    def add_user(self, username, password_hash, account_type):
+        """Hängt einen neuen Nutzer an die users.csv an. False, wenn der Benutzername bereits existiert."""
+        with self._lock:
+            index = self._ensure_current()
+            if username in index.users:
+                return False
+            record = {name: '' for name in FIELDNAMES}
+            record.update(user_id=new_user_id(), username=username, password_hash=password_hash,
+                          account_type=account_type)
+            self._put(record, index.added(record))
+            return True
+
+    def update_user(self, username, /, **changes):
+        """
+        Setzt die übergebenen Spalten (auch username oder profile_picture_hash, nicht user_id) eines Nutzers
+        (ein Log-Eintrag). Liefert False, wenn der Nutzer nicht existiert. Wirft UsernameTaken, wenn der neue
+        Benutzername bereits vergeben ist (geprüft unter dem Lock wie in add_user).
+        """
+        if 'user_id' in changes:
+            raise ValueError('user_id ist unveränderlich')
+        with self._lock:
+            index = self._ensure_current()
+            old = index.users.get(username)
+            if old is None:
+                return False
+            new_username = changes.get('username', username)
+            if new_username != username and new_username in index.users:
+                raise UsernameTaken(new_username)
+            record = dict(old, **changes)
+            self._put(record, index.replaced(old, record), self._key(old))
+            return True
+
+    def replace_password_hash(self, username, old_hash, new_hash):
+        """
+        Ersetzt den Passwort-Hash nur, wenn er noch old_hash ist (Hash-Upgrade beim Login darf keine zwischenzeitliche
+        Passwortänderung überschreiben). Liefert True, wenn geschrieben wurde.
+        """
+        with self._lock:
+            index = self._ensure_current()
+            old = index.users.get(username)
+            if old is None or old['password_hash'] != old_hash:
+                return False
+            record = dict(old, password_hash=new_hash)
+            self._put(record, index.replaced(old, record))
+            return True
+
+    def assign_missing_ids(self):
+        """
+        Vergibt fehlende user_ids und schreibt die users.csv vollständig neu (die Schlüssel der Tabelle ändern sich).
+        Liefert die Anzahl neu vergebener IDs.
+        """
+        missing = 0
+
+        def transform(rows):
+            nonlocal missing
+            missing = sum(1 for record in rows if not record['user_id'])
+            if not missing and self._table.base_header == FIELDNAMES:
+                return None
+            return [dict(record, user_id=record['user_id'] or new_user_id()) for record in rows], None
+
+        # Lesen und Schreiben unter den Locks der Tabelle (in der Reihenfolge von rewrite)
+        if self._table.rewrite(transform=transform):
+            with self._lock.mutex:
+                self._ensure_current()
+        return missing
+
+    def migrate_pictures(self):
+        """
+        Schreibt eine users.csv im alten Format (Base64-Bilder in profile_picture) im aktuellen Format neu;
+        die Bilder wurden beim Laden bereits in den Bildspeicher übernommen.
+        Liefert die Anzahl der Zeilen mit Bild oder None, wenn die Datei schon im aktuellen Format ist.
+        """
+        with self._lock:
+            self._ensure_current()
+            if self._table.base_header == FIELDNAMES:
+                return None
+            self._table.rewrite()
+            self._ensure_current()
+            return sum(1 for record in self._table.rows() if record['profile_picture_hash'])
+
+
+# Pfad zur users.csv (liegt im accounts-Ordner)
+USERS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.csv')
+
+user_repository = UserRepository(USERS_CSV_PATH)
@@ -2,9 +2,17 @@ import csv
 import json
 import os
 import sys
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import make_password
+from recommender.features import user_ranks
+from recommender.recommender import group_members, load_groups_by_id
+from .password_hashing import HashingSaturated, PasswordHashingPool
+from .picture_store import content_type, is_picture_hash, picture_base64, read_picture, store_picture
+from .user_store import FIELDNAMES, USERS_CSV_PATH, UsernameTaken, user_repository
 
 # Erhöhe das Limit für CSV-Felder
 try:
@@ -15,22 +23,34 @@ except OverflowError:
     csv.field_size_limit(max_int)
 
 # Pfade definieren
-CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.csv')
-POSTS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'posts', 'posts.csv')
-# Verwende für Friends den gleichen Pfad, wie in friends/views.py (z. B. "friends.csv")
-FRIENDS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'friends', 'friends.csv')
-# groups.csv liegt im recommender-Ordner
-GROUPS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'recommender', 'groups.csv')
+CSV_PATH = USERS_CSV_PATH
+
+# Seitengröße der Nutzersuche
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Passwort-Hashing beim Login (Threads und Warteschlange über settings.ACCOUNTS_PASSWORD_HASHING)
+_hashing_settings = getattr(settings, 'ACCOUNTS_PASSWORD_HASHING', {})
+password_hashing = PasswordHashingPool(
+    max_workers=_hashing_settings.get('MAX_WORKERS', 2),
+    max_queue=_hashing_settings.get('MAX_QUEUE', 32),
+)
 
 def initialize_csv():
     """Erstellt die users.csv inklusive Header, falls sie noch nicht existiert."""
     if not os.path.exists(CSV_PATH):
         with open(CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(['username', 'password_hash', 'account_type', 'profile_picture', 'favorite_cuisines', 'dietary_preferences'])
+            writer.writerow(FIELDNAMES)
 
 initialize_csv()
 
+
+def profile_picture_url(picture_hash):
+    """URL des Profilbilds ('' ohne Bild); der Hash in der URL macht sie unbegrenzt cachebar."""
+    return reverse('profile_picture', args=[picture_hash]) if picture_hash else ''
+
+
 @csrf_exempt
 def register(request):
     """
@@ -53,75 +73,108 @@ def register(request):
         if not username or not password or not account_type:
             return JsonResponse({'success': False, 'message': 'Es fehlen erforderliche Felder'}, status=400)
 
-        # Prüfe, ob der Username bereits existiert
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    return JsonResponse({'success': False, 'message': 'Username existiert bereits'}, status=400)
+        # Prüfe, ob der Username bereits existiert (vor dem teuren Hashen; add_user prüft erneut unter Lock)
+        if username in user_repository:
+            return JsonResponse({'success': False, 'message': 'Username existiert bereits'}, status=400)
 
         password_hash = make_password(password)
-        with open(CSV_PATH, 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([username, password_hash, account_type, "", "", ""]) # Hier wurde "" hinzugefügt
+        if not user_repository.add_user(username, password_hash, account_type):
+            return JsonResponse({'success': False, 'message': 'Username existiert bereits'}, status=400)
         return JsonResponse({'success': True, 'message': 'Registrierung erfolgreich'})
     return JsonResponse({'success': False, 'message': 'Nur POST-Requests erlaubt'}, status=405)
 
 
 @csrf_exempt
-def login_view(request):
+async def login_view(request):
     """
     Login: Erwartet einen POST-Request mit JSON-Daten:
     {
       "username": "<dein username>",
-      "password": "<dein password>"
+      "password": "<dein password>",
+      "inline_picture": false    // optional: Profilbild nicht als Base64 mitschicken
     }
+    Das Profilbild wird über profile_picture_url geladen (cachebar). Das Base64-Feld profile_picture
+    wird nur noch für bestehende Clients mitgeschickt, die inline_picture nicht auf false setzen.
+    Die Passwortprüfung läuft im begrenzten password_hashing-Pool; ist dessen Warteschlange voll,
+    antwortet der View mit 503 und Retry-After. Ein nötiges Hash-Upgrade erfolgt nach der Antwort im Pool.
     """
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             username = data.get('username')
             password = data.get('password')
-        except (json.JSONDecodeError, KeyError):
+            inline_picture = data.get('inline_picture', True) is not False
+        except (json.JSONDecodeError, KeyError, AttributeError):
             return JsonResponse({'success': False, 'message': 'Ungültige Daten'}, status=400)
 
         if not username or not password:
             return JsonResponse({'success': False, 'message': 'Username und Passwort sind erforderlich'}, status=400)
 
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    if check_password(password, row['password_hash']):
-                        response = JsonResponse({
-                            'success': True,
-                            'message': 'Login erfolgreich',
-                            'account_type': row['account_type'],
-                            'profile_picture': row.get('profile_picture', ""),
-                            'favorite_cuisines': row.get('favorite_cuisines', ""),
-                            'dietary_preferences': row.get('dietary_preferences', "")
-                        })
-                        response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-                        return response
-                    else:
-                        return JsonResponse({'success': False, 'message': 'Username oder Passwort falsch'}, status=400)
+        row = await sync_to_async(user_repository.get, thread_sensitive=False)(username)
+        if row is not None:
+            try:
+                is_correct, must_update = await password_hashing.acheck_password(password, row['password_hash'])
+            except HashingSaturated as e:
+                response = JsonResponse({'success': False, 'message': 'Zu viele Anmeldungen, bitte später erneut versuchen'},
+                                        status=503)
+                response['Retry-After'] = str(e.retry_after)
+                return response
+            if is_correct:
+                if must_update:
+                    password_hashing.schedule_rehash(
+                        password, row['password_hash'],
+                        lambda old_hash, new_hash: user_repository.replace_password_hash(username, old_hash, new_hash))
+                body = await sync_to_async(login_response_body, thread_sensitive=False)(row, inline_picture)
+                response = JsonResponse(body)
+                response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+                return response
         return JsonResponse({'success': False, 'message': 'Username oder Passwort falsch'}, status=400)
     return JsonResponse({'success': False, 'message': 'Nur POST-Requests erlaubt'}, status=405)
 
 
+def login_response_body(row, inline_picture):
+    """Antwort eines erfolgreichen Logins (liest ggf. das Profilbild für das Base64-Feld)."""
+    body = {
+        'success': True,
+        'message': 'Login erfolgreich',
+        'account_type': row['account_type'],
+        'user_id': row['user_id'],
+        'profile_picture_hash': row['profile_picture_hash'],
+        'profile_picture_url': profile_picture_url(row['profile_picture_hash']),
+        'favorite_cuisines': row.get('favorite_cuisines', ""),
+        'dietary_preferences': row.get('dietary_preferences', "")
+    }
+    if inline_picture:
+        body['profile_picture'] = picture_base64(row['profile_picture_hash'])
+    return body
+
+
+@csrf_exempt
+def auth_metrics(request):
+    """
+    Laufzeit-Metriken des Passwort-Hashings beim Login (Durchsatz, Hash-Dauer, Warteschlange, Wartezeit,
+    abgewiesene Logins, Hash-Upgrades). Erwartet einen GET-Request.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
+    return JsonResponse({'success': True, 'password_hashing': password_hashing.stats()})
+
+
 @csrf_exempt
 def update_profile(request):
     """
-    Aktualisiert das Benutzerprofil und passt den Benutzernamen in users.csv, posts.csv,
-    friends.csv und groups.csv an, falls er geändert wird.
+    Aktualisiert das Benutzerprofil in der users.csv. Eine Umbenennung ändert nur diese Zeile, da
+    posts.csv, friends.csv und groups.csv über die user_id auf Nutzer verweisen.
     Erwartet einen POST-Request mit JSON-Daten:
     {
         "username": "<alter Benutzername>",
         "new_username": "<neuer Benutzername>" oder null,
         "new_password": "<neues Passwort>" oder null,
         "profile_picture": "<Base64 Bildstring>" oder leer,
+        "profile_picture_hash": "<Hash eines gespeicherten Bildes>",  // optional statt profile_picture
         "favorite_cuisines": "<Kommaseparierte Liste der Lieblingsküchen>"
     }
+    Das Bild wird im Bildspeicher abgelegt; users.csv enthält nur seinen Hash.
     """
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Nur POST-Requests erlaubt'}, status=405)
@@ -139,109 +192,83 @@ def update_profile(request):
     if not old_username:
         return JsonResponse({'success': False, 'message': 'Alter Benutzername erforderlich'}, status=400)
     
+    # Profilbild: unveränderte Bilder ergeben denselben Hash und werden nicht erneut geschrieben
+    if 'profile_picture_hash' in data:
+        picture_hash = data.get('profile_picture_hash') or ''
+        if picture_hash and read_picture(picture_hash) is None:
+            return JsonResponse({'success': False, 'message': 'Unbekanntes Profilbild'}, status=400)
+    else:
+        try:
+            picture_hash = store_picture(profile_picture)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'message': 'Ungültige Daten: ' + str(e)}, status=400)
+        except OSError as e:
+            return JsonResponse({'success': False, 'message': 'Fehler beim Speichern des Profilbilds: ' + str(e)}, status=500)
+    
     # Aktualisiere users.csv
-    user_updated = False
-    updated_users = []
+    if old_username not in user_repository:
+        return JsonResponse({'success': False, 'message': 'User not found in users.csv'}, status=404)
+    changes = {
+        'profile_picture_hash': picture_hash,
+        'favorite_cuisines': favorite_cuisines,
+        'dietary_preferences': dietary_preferences,
+    }
+    if new_username and new_username != old_username:
+        changes['username'] = new_username
+    if new_password:
+        changes['password_hash'] = make_password(new_password)
     try:
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == old_username:
-                    if new_username and new_username != old_username:
-                        row['username'] = new_username
-                    if new_password:
-                        row['password_hash'] = make_password(new_password)
-                    row['profile_picture'] = profile_picture
-                    row['favorite_cuisines'] = favorite_cuisines
-                    row['dietary_preferences'] = dietary_preferences # dietary_preferences hinzugefügt
-                    user_updated = True
-                updated_users.append(row)
-        if not user_updated:
+        # Stand der users.csv direkt vor und nach dem Schreiben (unter dem Lock schreibt kein anderer Prozess dazwischen)
+        with user_repository.lock:
+            stat_before = user_ranks.table_stat()
+            updated = user_repository.update_user(old_username, **changes)
+            stat_after = user_ranks.table_stat()
+        if not updated:
             return JsonResponse({'success': False, 'message': 'User not found in users.csv'}, status=404)
-        with open(CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['username', 'password_hash', 'account_type', 'profile_picture', 'favorite_cuisines', 'dietary_preferences'] # dietary_preferences hinzugefügt
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in updated_users:
-                writer.writerow(row)
+    except UsernameTaken:
+        return JsonResponse({'success': False, 'message': 'Username existiert bereits'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'message': 'Fehler beim Aktualisieren der users.csv: ' + str(e)}, status=500)
     
-    # Falls der Benutzername geändert wurde, aktualisiere auch posts.csv, friends.csv und groups.csv
-    if new_username and new_username != old_username:
-        # Update posts.csv
-        try:
-            posts = []
-            with open(POSTS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    if row.get("username") == old_username:
-                        row["username"] = new_username
-                    posts.append(row)
-            with open(POSTS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['post_id', 'username', 'image_data', 'post_text', 'timestamp']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in posts:
-                    writer.writerow(row)
-        except Exception as e:
-            return JsonResponse({'success': False, 'message': 'Fehler beim Aktualisieren der posts.csv: ' + str(e)}, status=500)
-        
-        # Update friends.csv
-        try:
-            friends = []
-            with open(FRIENDS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    # Aktualisiere falls der alte Username als "username" oder in "friends" vorkommt
-                    if row.get("username") == old_username:
-                        row["username"] = new_username
-                    if row.get("friends"):
-                        friend_list = [f.strip() for f in row["friends"].split(",")]
-                        friend_list = [new_username if f == old_username else f for f in friend_list]
-                        row["friends"] = ",".join(friend_list)
-                    friends.append(row)
-            with open(FRIENDS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-                if friends:
-                    fieldnames = friends[0].keys()
-                else:
-                    fieldnames = ['username', 'friends']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in friends:
-                    writer.writerow(row)
-        except Exception as e:
-            return JsonResponse({'success': False, 'message': 'Fehler beim Aktualisieren der friends.csv: ' + str(e)}, status=500)
-        
-        # Update groups.csv – hier müssen wir "created_by" und "members" anpassen
-        try:
-            groups = []
-            with open(GROUPS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    # Ersetze im Feld "created_by" den alten Username
-                    if row.get("created_by") == old_username:
-                        row["created_by"] = new_username
-                    # Ersetze in "members" (kommagetrennte Liste) alle Vorkommen des alten Benutzernamens
-                    if "members" in row and row["members"]:
-                        members_list = [m.strip() for m in row["members"].split(",")]
-                        updated_members = [new_username if m == old_username else m for m in members_list]
-                        row["members"] = ",".join(updated_members)
-                    groups.append(row)
-            with open(GROUPS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['group_id', 'group_name', 'created_by', 'members']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in groups:
-                    writer.writerow(row)
-        except Exception as e:
-            return JsonResponse({'success': False, 'message': 'Fehler beim Aktualisieren der groups.csv: ' + str(e)}, status=500)
+    # Rangmatrix des Recommenders (über den Verweis, d. h. die unveränderliche user_id) nachziehen; der Empfehlungs-Cache ist nach
+    # dem Fingerabdruck der Favoriten geschlüsselt und muss nicht geleert werden.
+    # posts.csv, friends.csv und groups.csv verweisen über die user_id auf den Nutzer und bleiben bei einer
+    # Umbenennung unverändert.
+    user_ranks.update_user(user_repository.ref(new_username or old_username), favorite_cuisines, stat_before, stat_after)
     
-    response = JsonResponse({'success': True})
+    response = JsonResponse({
+        'success': True,
+        'profile_picture_hash': picture_hash,
+        'profile_picture_url': profile_picture_url(picture_hash),
+    })
     response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     return response
 
 
+def profile_picture(request, picture_hash):
+    """
+    Liefert ein Profilbild aus dem Bildspeicher: GET /api/auth/profile_picture/<hash>/
+    Der Inhalt zu einem Hash ändert sich nie, daher starker ETag (der Hash) und unbegrenzt cachebar;
+    bei passendem If-None-Match antwortet der Endpoint mit 304 ohne Inhalt.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
+    if not is_picture_hash(picture_hash):
+        return JsonResponse({'success': False, 'message': 'Bild nicht gefunden'}, status=404)
+    etag = f'"{picture_hash}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    if if_none_match.strip() == '*' or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        data = read_picture(picture_hash)
+        if data is None:
+            return JsonResponse({'success': False, 'message': 'Bild nicht gefunden'}, status=404)
+        response = HttpResponse(data, content_type=content_type(data))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 @csrf_exempt
 def update_favorites(request):
     """
@@ -263,29 +290,17 @@ def update_favorites(request):
     if not username:
         return JsonResponse({'success': False, 'message': 'Username erforderlich'}, status=400)
     
-    updated = False
-    rows = []
     try:
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    row['favorite_cuisines'] = favorite_cuisines
-                    updated = True
-                rows.append(row)
+        with user_repository.lock:
+            stat_before = user_ranks.table_stat()
+            updated = user_repository.update_user(username, favorite_cuisines=favorite_cuisines)
+            stat_after = user_ranks.table_stat()
     except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der CSV: {str(e)}'}, status=500)
+        return JsonResponse({'success': False, 'message': f'Fehler beim Schreiben der CSV: {str(e)}'}, status=500)
     if not updated:
         return JsonResponse({'success': False, 'message': 'User not found'}, status=404)
-    headers = ['username', 'password_hash', 'account_type', 'profile_picture', 'favorite_cuisines']
-    try:
-        with open(CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            for row in rows:
-                writer.writerow(row)
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Fehler beim Schreiben der CSV: {str(e)}'}, status=500)
+    # Rangmatrix des Recommenders inkrementell nachziehen (neue Favoriten ergeben einen neuen Cache-Key)
+    user_ranks.update_user(user_repository.ref(username), favorite_cuisines, stat_before, stat_after)
     response = JsonResponse({'success': True, 'message': 'Favorite cuisines updated'})
     response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     return response
@@ -314,32 +329,14 @@ def update_dietary_preferences(request):
     if not username:
         return JsonResponse({'success': False, 'message': 'Username erforderlich'}, status=400)
     
-    updated = False
-    rows = []
     try:
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    row['dietary_preferences'] = dietary_preferences
-                    updated = True
-                rows.append(row)
+        updated = user_repository.update_user(username, dietary_preferences=dietary_preferences)
     except Exception as e:
-        return JsonResponse({'success': False, 'message': 'Fehler beim Lesen der CSV: ' + str(e)}, status=500)
+        return JsonResponse({'success': False, 'message': 'Fehler beim Schreiben der CSV: ' + str(e)}, status=500)
     
     if not updated:
         return JsonResponse({'success': False, 'message': 'User not found'}, status=404)
     
-    headers = ['username', 'password_hash', 'account_type', 'profile_picture', 'favorite_cuisines', 'dietary_preferences']
-    try:
-        with open(CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            for row in rows:
-                writer.writerow(row)
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': 'Fehler beim Schreiben der CSV: ' + str(e)}, status=500)
-    
     response = JsonResponse({
         'success': True,
         'message': 'Dietary preferences updated',
@@ -350,6 +347,41 @@ def update_dietary_preferences(request):
 
 
 
+@csrf_exempt
+def search_users(request):
+    """
+    Präfixsuche im Nutzerverzeichnis mit Cursor-Pagination (statt aller Benutzernamen wie get_users).
+    Erwartet einen GET-Request mit Query-Parametern:
+    /search_users?q=ti&account_type=user&limit=20&cursor=<next_cursor der vorherigen Seite>
+    q wird ohne Beachtung der Groß-/Kleinschreibung als Präfix gesucht (leer = alle Nutzer).
+    Liefert:
+    {
+        "success": true,
+        "users": ["Tim", "Tina", ...],
+        "next_cursor": "Tina" oder null
+    }
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
+    prefix = request.GET.get('q', '')
+    account_type = request.GET.get('account_type') or None
+    cursor = request.GET.get('cursor') or None
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return JsonResponse({'success': False,
+                             'message': f'limit muss eine Ganzzahl zwischen 1 und {MAX_SEARCH_LIMIT} sein'}, status=400)
+    try:
+        users, next_cursor = user_repository.search_usernames(prefix, account_type=account_type, limit=limit, after=cursor)
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der CSV: {str(e)}'}, status=500)
+    response = JsonResponse({'success': True, 'users': users, 'next_cursor': next_cursor})
+    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+
 @csrf_exempt
 def get_users(request):
     """
@@ -357,13 +389,8 @@ def get_users(request):
     """
     if request.method != 'GET':
         return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
-    users = []
     try:
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row.get('account_type') == 'user':
-                    users.append(row.get('username'))
+        users = user_repository.usernames(account_type='user')
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der CSV: {str(e)}'}, status=500)
     response = JsonResponse({'success': True, 'users': users})
@@ -380,11 +407,13 @@ def filter_by_dietary_preferences(request):
     Filtert Benutzer nach diätetischen Präferenzen.
     Erwartet einen GET-Request mit Query-Parameter:
     /filter_by_dietary_preferences?preferences=vegetarian,vegan
+    Mit inline_picture=false enthalten die Treffer nur profile_picture_url statt des Base64-Bildes.
     """
     if request.method != 'GET':
         return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
     
     preferences = request.GET.get('preferences', '').split(',')
+    inline_picture = request.GET.get('inline_picture', '').lower() != 'false'
     preferences = [p.strip().lower() for p in preferences if p.strip()]
     
     if not preferences:
@@ -393,20 +422,17 @@ def filter_by_dietary_preferences(request):
     matching_users = []
     
     try:
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                user_preferences = row.get('dietary_preferences', '').lower().split(',')
-                user_preferences = [p.strip() for p in user_preferences if p.strip()]
-                
-                # Überprüfen, ob eine der angegebenen Präferenzen übereinstimmt
-                if any(pref in user_preferences for pref in preferences):
-                    matching_users.append({
-                        'username': row['username'],
-                        'profile_picture': row.get('profile_picture', ""),
-                        'favorite_cuisines': row.get('favorite_cuisines', ""),
-                        'dietary_preferences': row.get('dietary_preferences', "")
-                    })
+        # Nutzer mit mindestens einer der angegebenen Präferenzen (Vereinigung über den Dietary-Index)
+        for row in user_repository.users_with_dietary_preferences(preferences):
+            user = {
+                'username': row['username'],
+                'profile_picture_url': profile_picture_url(row['profile_picture_hash']),
+                'favorite_cuisines': row.get('favorite_cuisines', ""),
+                'dietary_preferences': row.get('dietary_preferences', "")
+            }
+            if inline_picture:
+                user['profile_picture'] = picture_base64(row['profile_picture_hash'])
+            matching_users.append(user)
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der CSV: {str(e)}'}, status=500)
     
@@ -414,14 +440,23 @@ def filter_by_dietary_preferences(request):
 
 
 
+def aggregate_dietary_preferences(members):
+    """Liefert die Vereinigung der dietary_preferences der Mitglieder (Benutzernamen oder user_ids) als Liste, O(Mitglieder)."""
+    return user_repository.dietary_preferences_for(members)
+
+
 @csrf_exempt
 def get_group_dietary_preferences(request):
     """
-    Aggregiert die diätetischen Präferenzen aller übergebenen Mitglieder.
+    Aggregiert die diätetischen Präferenzen aller übergebenen Mitglieder oder aller Mitglieder einer Gruppe.
     Erwartet einen POST-Request mit JSON:
     {
         "members": ["user1", "user2", ...]
     }
+    oder
+    {
+        "group_id": 11
+    }
     Liefert:
     {
         "success": true,
@@ -433,24 +468,25 @@ def get_group_dietary_preferences(request):
     try:
         data = json.loads(request.body)
         members = data.get('members', [])
+        group_id = data.get('group_id')
     except Exception as e:
         return JsonResponse({'success': False, 'message': 'Ungültige Daten: ' + str(e)}, status=400)
     
+    if group_id is not None:
+        # Mitglieder (user_ids) aus der Gruppen-CSV statt aus dem Request
+        try:
+            group = load_groups_by_id([group_id]).get(str(group_id))
+        except Exception as e:
+            return JsonResponse({'success': False, 'message': 'Fehler beim Lesen der Gruppen: ' + str(e)}, status=500)
+        if group is None:
+            return JsonResponse({'success': False, 'message': 'Gruppe nicht gefunden'}, status=404)
+        members = group_members(group)
+    
     if not members:
         return JsonResponse({'success': True, 'dietary_preferences': []})
     
-    aggregated = set()
     try:
-        with open(CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                username = row.get('username', '')
-                if username in members:
-                    prefs = row.get('dietary_preferences', '')
-                    if prefs:
-                        for p in prefs.split(','):
-                            aggregated.add(p.strip())
-        aggregated_list = list(aggregated)
+        aggregated_list = aggregate_dietary_preferences(members)
     except Exception as e:
         return JsonResponse({'success': False, 'message': 'Fehler beim Aggregieren: ' + str(e)}, status=500)
     
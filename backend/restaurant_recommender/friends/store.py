@@ -0,0 +1,35 @@
+"""
+Speicher der Freundeslisten (friends.csv).
+
+Gemeinsam genutzt von den Freundes-Endpoints und den Einladungsvorschlägen des Recommenders.
+Spalten: user_id, friends (kommaseparierte user_ids); Benutzernamen werden über user_repository aufgelöst.
+"""
+
+import csv
+import os
+
+from accounts.log_table import LogTable
+from accounts.user_ids import LEGACY_COLUMNS, renaming
+
+# Pfade – hier liegt die friends.csv im gleichen Ordner wie diese Datei.
+FRIENDS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'friends.csv')
+FRIENDS_FIELDNAMES = ['user_id', 'friends']
+
+
+def initialize_friends_csv():
+    """Erstellt die friends.csv inklusive Header, falls sie noch nicht existiert."""
+    if not os.path.exists(FRIENDS_CSV_PATH):
+        with open(FRIENDS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FRIENDS_FIELDNAMES)
+
+initialize_friends_csv()
+
+# Freundeslisten je user_id (vor migrate_user_ids: Spalte username, Verweise sind Namen); Änderungen werden an friends.csv.log angehängt (siehe accounts/log_table.py)
+friends_table = LogTable(FRIENDS_CSV_PATH, FRIENDS_FIELDNAMES, key='user_id',
+                         convert=renaming(LEGACY_COLUMNS))
+
+
+def split_friends(row):
+    """Freundesliste (Verweise) einer Zeile der friends.csv."""
+    return [f.strip() for f in row['friends'].split(',') if f.strip()] if row is not None else []
@@ -8,20 +8,28 @@ import datetime
 import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from accounts.log_table import LogTable
+from accounts.user_ids import LEGACY_COLUMNS, renaming
+from accounts.user_store import user_repository
 
 # Definiere den Pfad zur posts.csv – diese Datei wird im gleichen Ordner wie diese views.py abgelegt.
 POSTS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'posts.csv')
+POSTS_FIELDNAMES = ['post_id', 'user_id', 'image_data', 'post_text', 'timestamp']
 
 def initialize_posts_csv():
     """Erstellt die posts.csv inklusive Header, falls sie noch nicht existiert."""
     if not os.path.exists(POSTS_CSV_PATH):
         with open(POSTS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
-            # Felder: post_id, username, image_data, post_text, timestamp
-            writer.writerow(['post_id', 'username', 'image_data', 'post_text', 'timestamp'])
+            # Felder: post_id, user_id, image_data, post_text, timestamp
+            # (user_id statt Benutzername, damit eine Umbenennung die posts.csv nicht ändert)
+            writer.writerow(POSTS_FIELDNAMES)
 
 initialize_posts_csv()
 
+# Posts je post_id (vor migrate_user_ids steht der Name des Erstellers in der Spalte username); neue und gelöschte Posts werden an posts.csv.log angehängt (siehe accounts/log_table.py)
+posts_table = LogTable(POSTS_CSV_PATH, POSTS_FIELDNAMES, key='post_id', convert=renaming(LEGACY_COLUMNS))
+
 @csrf_exempt
 def create_post(request):
     """
@@ -43,20 +51,13 @@ def create_post(request):
         image_data = data.get('image_data', '')  # Base64-kodierter String (falls vorhanden)
         timestamp = datetime.datetime.now().isoformat()
         
-        # Erzeuge eine post_id: Lese die letzte post_id aus der CSV und erhöhe sie um 1
-        post_id = 1
-        try:
-            with open(POSTS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                post_ids = [int(row['post_id']) for row in reader if row['post_id'].isdigit()]
-                if post_ids:
-                    post_id = max(post_ids) + 1
-        except Exception:
-            post_id = 1
-        
-        with open(POSTS_CSV_PATH, 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([post_id, username, image_data, post_text, timestamp])
+        user_id = user_repository.ref(username)
+        # Erzeuge eine post_id: höchste vorhandene post_id + 1 (unter dem Lock der Tabelle, damit sie eindeutig bleibt)
+        with posts_table.lock:
+            post_ids = [int(key) for key in posts_table.keys() if key.isdigit()]
+            post_id = max(post_ids) + 1 if post_ids else 1
+            posts_table.put({'post_id': str(post_id), 'user_id': user_id, 'image_data': image_data,
+                             'post_text': post_text, 'timestamp': timestamp})
         
         return JsonResponse({'success': True, 'message': 'Post erstellt', 'post_id': post_id})
     except Exception as e:
@@ -65,16 +66,15 @@ def create_post(request):
 def list_posts(request):
     """
     Gibt alle Posts zurück, sortiert nach Timestamp (neueste zuerst).
-    Diese Funktion wird per GET-Request aufgerufen.
+    Diese Funktion wird per GET-Request aufgerufen. Jeder Post enthält den aktuellen Benutzernamen
+    des Erstellers (username) und seine user_id.
     """
     if request.method != 'GET':
         return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
-    posts = []
     try:
-        with open(POSTS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                posts.append(row)
+        posts = posts_table.rows()
+        for post, username in zip(posts, user_repository.usernames_for([post['user_id'] for post in posts])):
+            post['username'] = username
         # Sortiere Posts nach Timestamp absteigend
         posts.sort(key=lambda x: x['timestamp'], reverse=True)
         return JsonResponse({'success': True, 'posts': posts})
@@ -106,33 +106,16 @@ def delete_post(request):
     if not post_id or not username:
         return JsonResponse({'success': False, 'message': 'post_id und username sind erforderlich'}, status=400)
     
-    posts = []
-    post_found = False
     try:
-        with open(POSTS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                posts.append(row)
-        new_posts = []
-        for row in posts:
-            if row['post_id'] == str(post_id):
-                post_found = True
-                # Überprüfe, ob der Post von diesem Benutzer erstellt wurde.
-                if row.get('username') != username:
-                    return JsonResponse({'success': False, 'message': 'Nur der Ersteller kann den Post löschen.'}, status=400)
-                # Post wird hier nicht hinzugefügt (gelöscht)
-                continue
-            else:
-                new_posts.append(row)
-        if not post_found:
-            return JsonResponse({'success': False, 'message': 'Post nicht gefunden.'}, status=404)
-        # Schreibe die aktualisierte Posts-Liste in die CSV
-        with open(POSTS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['post_id', 'username', 'image_data', 'post_text', 'timestamp']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in new_posts:
-                writer.writerow(row)
+        user_id = user_repository.ref(username)
+        with posts_table.lock:
+            row = posts_table.get(str(post_id))
+            if row is None:
+                return JsonResponse({'success': False, 'message': 'Post nicht gefunden.'}, status=404)
+            # Überprüfe, ob der Post von diesem Benutzer erstellt wurde.
+            if row.get('user_id') != user_id:
+                return JsonResponse({'success': False, 'message': 'Nur der Ersteller kann den Post löschen.'}, status=400)
+            posts_table.delete(str(post_id))
         return JsonResponse({'success': True, 'message': 'Post erfolgreich gelöscht'})
     except Exception as e:
         return JsonResponse({'success': False, 'message': 'Fehler beim Löschen des Posts: ' + str(e)}, status=500)
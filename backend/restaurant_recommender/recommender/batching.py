@@ -0,0 +1,154 @@
+"""
+Micro-Batching für gleichzeitige Inferenz-Anfragen.
+
+Viele gleichzeitige recommend-Requests berechnen jeweils nur eine Feature-Zeile (1 × Küchen). Der
+MicroBatcher sammelt die Zeilen aller wartenden Requests, bewertet sie mit einem einzigen Modellaufruf
+und gibt jedem Request seine Zeilen des Ergebnisses zurück.
+
+Gewartet wird nur, wenn Requests tatsächlich gleichzeitig eintreffen: Ist nach einem kurzen Yield
+kein weiterer Request eingereiht, wird der einzelne Request sofort bewertet (eine Inferenz dauert nur
+etwa 0,1 ms, das Zeitfenster von 2 ms wäre für ihn reine Wartezeit). Sonst wird bis max_wait oder
+max_batch_rows gesammelt. Unter Last bündeln sich Requests zusätzlich von selbst, während der
+vorherige Batch bewertet wird.
+
+Die Übergabe läuft über concurrent.futures.Future: Synchrone Views (WSGI mit Threads) warten
+mit predict(), asynchrone Views (ASGI) mit await apredict().
+
+Zu jeder Anfrage kann ein Kontext (z. B. das ServingModel, mit dessen Vokabular die Zeilen gebaut
+wurden) übergeben werden; ein Batch enthält nur Anfragen mit demselben Kontext.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Sammelt Feature-Zeilen aus gleichzeitigen Requests und führt predict_fn einmal pro Batch aus.
+
+    predict_fn erhält eine (N × Features)-Matrix und den Kontext des Batches und liefert ein Tupel
+    von Arrays, deren erste Dimension N ist (z. B. Labels und Wahrscheinlichkeiten). Jeder Request
+    erhält dasselbe Tupel, eingeschränkt auf seine Zeilen.
+    """
+
+    def __init__(self, predict_fn, max_wait=0.002, max_batch_rows=64):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait
+        self.max_batch_rows = max_batch_rows
+        self._pending = deque()  # (rows, future, enqueued_at, context)
+        self._pending_rows = 0
+        self._condition = threading.Condition()
+        self._worker = None
+        # Metriken
+        self._batches = 0
+        self._rows = 0
+        self._requests = 0
+        self._max_batch_rows_seen = 0
+        self._immediate_batches = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def _ensure_worker(self):
+        """Startet den Worker-Thread beim ersten Request (nicht schon beim Import). Lock muss gehalten werden."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='recommender-micro-batcher', daemon=True)
+            self._worker.start()
+
+    def submit(self, rows, context=None):
+        """Reiht eine (n × Features)-Matrix ein und liefert ein Future mit dem Ergebnis-Tupel für diese n Zeilen."""
+        rows = np.atleast_2d(rows)
+        future = Future()
+        with self._condition:
+            self._ensure_worker()
+            self._pending.append((rows, future, time.perf_counter(), context))
+            self._pending_rows += len(rows)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+            self._condition.notify()
+        return future
+
+    def predict(self, rows, context=None):
+        """Blockierende Variante für synchrone Views."""
+        return self.submit(rows, context).result()
+
+    async def apredict(self, rows, context=None):
+        """Variante für asynchrone Views; blockiert den Event-Loop nicht."""
+        return await asyncio.wrap_future(self.submit(rows, context))
+
+    def _next_batch(self):
+        """
+        Wartet auf den ersten Request und entnimmt den Batch (aufeinanderfolgende Requests mit demselben
+        Kontext wie der erste). Ist nach einem Yield nur dieser eine Request eingereiht, sofort; sonst wird
+        bis max_wait oder max_batch_rows gesammelt.
+        """
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            # Yield: gibt den Lock frei, damit gerade eintreffende Requests sich noch einreihen können
+            self._condition.wait(0)
+            if len(self._pending) == 1:
+                self._immediate_batches += 1
+            else:
+                deadline = self._pending[0][2] + self.max_wait
+                while self._pending_rows < self.max_batch_rows:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            batch = []
+            batch_rows = 0
+            context = self._pending[0][3]
+            while self._pending and self._pending[0][3] is context and \
+                    (not batch or batch_rows + len(self._pending[0][0]) <= self.max_batch_rows):
+                item = self._pending.popleft()
+                batch.append(item)
+                batch_rows += len(item[0])
+            self._pending_rows -= batch_rows
+            return batch, context
+
+    def _run(self):
+        while True:
+            batch, context = self._next_batch()
+            started = time.perf_counter()
+            try:
+                results = self.predict_fn(np.vstack([rows for rows, _, _, _ in batch]), context)
+            except Exception as e:  # Fehler an alle wartenden Requests weiterreichen
+                for _, future, _, _ in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for rows, future, _, _ in batch:
+                future.set_result(tuple(result[offset:offset + len(rows)] for result in results))
+                offset += len(rows)
+            with self._condition:
+                self._batches += 1
+                self._requests += len(batch)
+                self._rows += offset
+                self._max_batch_rows_seen = max(self._max_batch_rows_seen, offset)
+                for _, _, enqueued_at, _ in batch:
+                    waited = started - enqueued_at
+                    self._total_wait += waited
+                    self._max_wait_seen = max(self._max_wait_seen, waited)
+
+    def stats(self):
+        """Metriken für den serving_metrics-Endpoint."""
+        with self._condition:
+            return {
+                'max_wait_ms': self.max_wait * 1000,
+                'max_batch_rows': self.max_batch_rows,
+                'queue_depth': len(self._pending),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': self._batches,
+                'requests': self._requests,
+                'rows': self._rows,
+                'avg_batch_rows': self._rows / self._batches if self._batches else 0.0,
+                'max_batch_rows_seen': self._max_batch_rows_seen,
+                'immediate_batches': self._immediate_batches,
+                'avg_wait_ms': self._total_wait / self._requests * 1000 if self._requests else 0.0,
+                'max_wait_ms_seen': self._max_wait_seen * 1000,
+            }
@@ -0,0 +1,94 @@
+"""
+Verkleinerung des Random Forests (python manage.py compact_recommender).
+
+Zwei Strategien erzeugen Kandidaten, die auf dem gespeicherten Testset des Artefakts gegen eine
+Ziel-Accuracy geprüft werden:
+  - subset: nur die ersten k Bäume des trainierten Forests behalten (kein Neutraining)
+  - distilled: einen kleineren Forest (weniger, flachere Bäume) auf den Vorhersagen des
+    großen Forests für frische synthetische Gruppen trainieren
+Gewählt wird der Kandidat mit dem kleinsten Pickle, der das Ziel erreicht.
+"""
+
+import copy
+import multiprocessing
+import os
+import pickle
+import time
+from queue import Empty
+
+from sklearn.ensemble import RandomForestClassifier
+
+from .forest_engine import FlatForest
+from .ml import generate_synthetic_group_data_weighted, load_model_artifact
+
+# Höchstens so lange auf die RSS-Messung im Kindprozess warten
+RSS_TIMEOUT_S = 300.0
+
+
+def model_bytes(model):
+    """Größe des gepickelten Modells in Bytes."""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def subset_forest(model, n_estimators):
+    """Kopie des Forests mit nur den ersten n_estimators Bäumen."""
+    subset = copy.copy(model)
+    subset.estimators_ = model.estimators_[:n_estimators]
+    subset.n_estimators = len(subset.estimators_)
+    return subset
+
+
+def distillation_data(num_groups, random_state, num_cuisines):
+    """Frische synthetische Features (anderer Seed als das Training, gleiches Vokabular) für die Destillation."""
+    X, _ = generate_synthetic_group_data_weighted(num_groups=num_groups, random_state=random_state,
+                                                  num_cuisines=num_cuisines)
+    return X
+
+
+def distill_forest(teacher, X, n_estimators, max_depth, random_state=42):
+    """Trainiert einen kleineren Forest auf den Labels, die der große Forest für X vorhersagt."""
+    student = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=random_state)
+    student.fit(X, teacher.predict(X))
+    return student
+
+
+def _rss_bytes():
+    """Aktueller Resident Set Size des Prozesses (Linux: /proc/self/statm)."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _measure_rss_delta(path, queue):
+    before = _rss_bytes()
+    artifact = load_model_artifact(path)
+    engine = FlatForest.from_sklearn(artifact['model'])
+    queue.put(_rss_bytes() - before)
+    del engine, artifact
+
+
+def rss_delta_bytes(path, timeout=RSS_TIMEOUT_S):
+    """
+    Zusätzlicher RSS, den das Laden des Artefakts samt FlatForest in einem frischen Prozess verursacht
+    (wie beim Start eines Worker-Prozesses). Liefert None, wenn /proc nicht verfügbar ist oder der Kindprozess
+    kein Ergebnis liefert (Fehler beim Laden, steht auf stderr; oder länger als timeout Sekunden).
+    """
+    if not os.path.exists('/proc/self/statm'):
+        return None
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure_rss_delta, args=(path, queue))
+    process.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            # Erst prüfen, dann lesen: ein Ergebnis, das kurz vor dem Ende geschrieben wurde, geht nicht verloren
+            alive = process.is_alive()
+            try:
+                return queue.get(timeout=0.5)
+            except Empty:
+                if not alive or time.monotonic() > deadline:
+                    return None
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
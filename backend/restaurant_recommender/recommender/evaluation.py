@@ -0,0 +1,114 @@
+"""
+Offline-Evaluation der Gruppenempfehlungen (python manage.py evaluate_recommender).
+
+Alle Gruppen werden als Matrix bewertet: Die Rangmatrix der Nutzer wird einmal geladen,
+rank_stats liefert Rangsumme und Häufigkeit aller Gruppen in einem Schritt, und sowohl die
+Vorhersagen als auch NDCG werden vektorisiert über alle Zeilen berechnet.
+
+Ground Truth ist (wie in der früheren evaluate_recommendations.py) die Küche mit dem
+niedrigsten durchschnittlichen Rang ohne Frequency-Gewichtung. Bewertet werden zwei Strategien:
+  - model: der ausgelieferte Random Forest auf den Endpoint-Features (features.feature_matrix_from_stats)
+  - heuristic: die Küche mit minimalem Score avg_rank * ((Gruppengröße / frequency) ** p)
+"""
+
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from .features import feature_matrix_from_stats
+from .ml import DEFAULT_RANK, load_model_artifact, p
+
+STRATEGIES = ('model', 'heuristic')
+
+
+def ground_truth_labels(rank_sum, frequency):
+    """Küche mit minimalem Durchschnittsrang pro Gruppe (DEFAULT_RANK für nicht genannte Küchen)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_rank = np.where(frequency > 0, rank_sum / frequency, float(DEFAULT_RANK))
+    return np.argmin(avg_rank, axis=1)
+
+
+def heuristic_scores(rank_sum, frequency, group_sizes, p=p):
+    """Score avg_rank * ((Gruppengröße / frequency) ** p) pro Küche; niedriger ist besser."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = (rank_sum / frequency) * ((group_sizes[:, np.newaxis] / frequency) ** p)
+    return np.where(frequency > 0, score, float(DEFAULT_RANK))
+
+
+def one_hot_ndcg(scores, true_labels):
+    """
+    NDCG pro Zeile für genau eine relevante Küche, identisch zu sklearn.metrics.ndcg_score
+    (inklusive Mittelung über Gleichstände), aber ohne Python-Schleife über die Zeilen.
+
+    Steht die relevante Küche in einer Gruppe von t gleich bewerteten Küchen, vor der s Küchen
+    mit höherem Score liegen, ist DCG = mean(1 / log2(i + 2) für i in s .. s + t - 1); IDCG = 1.
+    """
+    true_scores = scores[np.arange(len(scores)), true_labels][:, np.newaxis]
+    higher = np.count_nonzero(scores > true_scores, axis=1)
+    tied = np.count_nonzero(scores == true_scores, axis=1)
+    # cumulative[i] = Summe der Discounts der Positionen 0 .. i-1
+    cumulative = np.concatenate([[0.0], np.cumsum(1.0 / np.log2(np.arange(scores.shape[1]) + 2))])
+    return (cumulative[higher + tied] - cumulative[higher]) / tied
+
+
+# Modell pro Worker-Prozess (siehe init_worker). Für große Batches ist sklearns predict_proba schneller als
+# die auf Einzel-Latenz optimierte FlatForest-Engine; die Ergebnisse sind identisch.
+_model = None
+
+
+def init_worker(model_path):
+    """Initializer für den Process-Pool: lädt das Modell-Artefakt einmal pro Worker (memory-mapped)."""
+    global _model
+    _model = load_model_artifact(model_path)['model']
+
+
+def evaluate_shard(rank_sum, frequency, group_sizes):
+    """
+    Bewertet einen Teil der Gruppen mit allen Strategien.
+    Liefert {'y_true': Array, '<strategie>': {'y_pred': Array, 'ndcg': Array}}; Metriken werden erst
+    über alle Shards berechnet, da Precision/Recall/F1 (macro) nicht additiv sind.
+    """
+    y_true = ground_truth_labels(rank_sum, frequency)
+    results = {'y_true': y_true}
+
+    class_probabilities = _model.predict_proba(feature_matrix_from_stats(rank_sum, frequency))
+    probabilities = np.zeros(rank_sum.shape)
+    probabilities[:, _model.classes_.astype(int)] = class_probabilities
+    results['model'] = {
+        'y_pred': _model.classes_[np.argmax(class_probabilities, axis=1)].astype(int),
+        'ndcg': one_hot_ndcg(probabilities, y_true),
+    }
+
+    # Niedriger Score ist besser: für das Ranking negieren
+    scores = -heuristic_scores(rank_sum, frequency, group_sizes)
+    results['heuristic'] = {
+        'y_pred': np.argmax(scores, axis=1),
+        'ndcg': one_hot_ndcg(scores, y_true),
+    }
+    return results
+
+
+def merge_shards(shards):
+    """Fasst die Ergebnisse mehrerer evaluate_shard-Aufrufe (in Reihenfolge) zusammen."""
+    merged = {'y_true': np.concatenate([shard['y_true'] for shard in shards])}
+    for strategy in STRATEGIES:
+        merged[strategy] = {
+            key: np.concatenate([shard[strategy][key] for shard in shards]) for key in ('y_pred', 'ndcg')
+        }
+    return merged
+
+
+def summarize(results):
+    """Accuracy, Precision, Recall, F1 (jeweils macro) und mittlerer NDCG pro Strategie als JSON-serialisierbares Dict."""
+    y_true = results['y_true']
+    summary = {}
+    for strategy in STRATEGIES:
+        y_pred = results[strategy]['y_pred']
+        ndcg = results[strategy]['ndcg']
+        summary[strategy] = {
+            'accuracy': float(accuracy_score(y_true, y_pred)),
+            'precision': float(precision_score(y_true, y_pred, average='macro', zero_division=0)),
+            'recall': float(recall_score(y_true, y_pred, average='macro', zero_division=0)),
+            'f1': float(f1_score(y_true, y_pred, average='macro', zero_division=0)),
+            'ndcg': float(ndcg.mean()) if len(ndcg) else 0.0,
+        }
+    return summary
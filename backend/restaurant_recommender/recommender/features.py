@@ -0,0 +1,54 @@
+"""
+Feature-Konstruktion für Gruppenempfehlungen auf Basis der CuisineRankMatrix.
+
+user_ranks ist die prozessweite Rangmatrix aller Nutzer, indiziert über die user_id (so wie
+groups.csv und friends.csv auf Mitglieder verweisen), für Nutzer ohne user_id (vor migrate_user_ids)
+über den Benutzernamen; accounts.views meldet Änderungen an favorite_cuisines direkt an sie weiter. Die Spalten der Features bestimmt das
+Küchen-Vokabular des Modells (ServingModel.cuisines); berechnet werden nur die genannten Küchen,
+alle übrigen Spalten erhalten DEFAULT_RANK.
+"""
+
+import os
+
+import numpy as np
+
+from accounts.user_store import user_key
+
+from .ml import DEFAULT_RANK, p
+from .rank_matrix import CuisineRankMatrix
+
+# Pfad zur User-CSV (angenommen, sie liegt in ../accounts/users.csv)
+ACCOUNTS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'accounts', 'users.csv')
+
+user_ranks = CuisineRankMatrix(ACCOUNTS_CSV_PATH, key_field=user_key)
+
+
+def group_feature_matrix(member_lists, cuisines, rank_matrix=user_ranks):
+    """
+    Berechnet die Feature-Matrix (N × Küchen des Vokabulars) für mehrere Gruppen auf einmal:
+    Für jede Küche den durchschnittlichen Rang (1-basierend) aus den Favoritenlisten der Mitglieder,
+    gewichtet mit der Frequency: score = avg_rank / (frequency ** p); DEFAULT_RANK, falls niemand die Küche nennt.
+    Nur die genannten Küchen werden berechnet; der Aufwand wächst nicht mit der Größe des Vokabulars.
+    """
+    rows, columns, rank_sum, frequency = rank_matrix.sparse_rank_stats(member_lists, cuisines)
+    X = np.full((len(member_lists), len(cuisines)), float(DEFAULT_RANK))
+    X[rows, columns] = (rank_sum / frequency) / (frequency ** p)
+    return X
+
+
+def feature_matrix_from_stats(rank_sum, frequency):
+    """Feature-Matrix aus dichter Rangsumme und Häufigkeit pro Küche (Ausgabe von CuisineRankMatrix.rank_stats)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Je höher die Frequency, desto niedriger der Score.
+        score = (rank_sum / frequency) / (frequency ** p)
+    return np.where(frequency > 0, score, float(DEFAULT_RANK))
+
+
+def group_feature_vector(members, cuisines):
+    """Feature-Vektor (1 × Küchen des Vokabulars) für eine einzelne Gruppe."""
+    return group_feature_matrix([members], cuisines)
+
+
+def group_fingerprints(member_lists):
+    """Fingerabdruck der Mitglieder-Favoriten pro Gruppe (Cache-Key für Empfehlungen, siehe result_cache)."""
+    return user_ranks.fingerprints(member_lists)
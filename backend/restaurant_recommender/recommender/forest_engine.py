@@ -0,0 +1,104 @@
+"""
+Vektorisierte NumPy-Inferenz für einen trainierten RandomForestClassifier.
+
+sklearn validiert bei jedem predict-Aufruf die Eingabe, verteilt die Bäume über joblib und
+ruft jeden Baum einzeln auf. Für eine einzelne 8-dimensionale Zeile dominiert dieser feste
+Overhead die Latenz von recommend_for_group. FlatForest legt stattdessen die Knoten aller
+Bäume in zusammenhängende Arrays (feature, threshold, left, right, value) und traversiert alle
+Bäume für alle Zeilen gleichzeitig.
+
+Die Ergebnisse sind bitidentisch zu sklearn:
+  - Eingaben werden wie in sklearn nach float32 konvertiert und mit den float64-Schwellwerten verglichen.
+  - Die Blattwerte werden wie in DecisionTreeClassifier.predict_proba normiert.
+  - Die Baumwahrscheinlichkeiten werden in derselben Reihenfolge aufsummiert und durch die Anzahl Bäume geteilt.
+"""
+
+import numpy as np
+
+
+class FlatForest:
+    """Random Forest als flache Knoten-Arrays; Blätter verweisen auf sich selbst."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.is_leaf = left == np.arange(len(left))
+        # Kinder verschränkt: children[2 * node + 1] = left, children[2 * node] = right,
+        # sodass das Vergleichsergebnis direkt als Index dient.
+        self.children = np.stack([right, left], axis=1).ravel()
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Exportiert einen trainierten RandomForestClassifier (eine Ausgabe) in flache Arrays."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            # Blätter zeigen auf sich selbst (left == right == eigener Index).
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            # Normierung wie in DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :estimator.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_),
+            max_depth=max_depth,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Liefert die Blattknoten (global indiziert) aller Bäume für alle Zeilen: Array (Zeilen × Bäume)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        num_rows, num_features = X.shape
+        num_trees = len(self.roots)
+        flat_X = X.ravel()
+        nodes = np.tile(self.roots, num_rows)
+        # Startoffset der Zeile jedes (Zeile, Baum)-Paares in flat_X
+        row_offsets = np.repeat(np.arange(num_rows, dtype=np.intp) * num_features, num_trees)
+        # Nur Paare, die noch nicht in einem Blatt angekommen sind, werden weiter traversiert.
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            current = self.children[2 * current + go_left]
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(num_rows, num_trees)
+
+    def predict_proba(self, X):
+        leaf_values = self.value[self.apply(X)]  # (Zeilen, Bäume, Klassen)
+        # Reduktion über die mittlere Achse summiert Baum für Baum in Reihenfolge, wie sklearn.
+        proba = np.add.reduce(leaf_values, axis=1)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
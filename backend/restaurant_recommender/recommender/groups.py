@@ -0,0 +1,30 @@
+"""
+Speicher der Gruppen (groups.csv).
+
+Gemeinsam genutzt von den Gruppen-Endpoints, der Evaluation, precompute und den Management-Commands.
+created_by und members verweisen über user_ids auf Nutzer (siehe accounts.user_ids); die Endpoints
+nehmen Benutzernamen entgegen und liefern Benutzernamen zurück.
+"""
+
+import csv
+import os
+
+from accounts.log_table import LogTable
+
+# Pfad zur Gruppen-CSV (innerhalb des recommender-Ordners)
+GROUPS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'groups.csv')
+GROUPS_FIELDNAMES = ['group_id', 'group_name', 'created_by', 'members']
+
+
+def initialize_groups_csv():
+    """Erstellt die Gruppen-CSV inklusive Header, falls sie noch nicht existiert."""
+    if not os.path.exists(GROUPS_CSV_PATH):
+        with open(GROUPS_CSV_PATH, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(GROUPS_FIELDNAMES)
+
+initialize_groups_csv()
+
+# Gruppen je group_id; Änderungen werden an groups.csv.log angehängt, nicht in die CSV geschrieben
+# (siehe accounts/log_table.py).
+groups_table = LogTable(GROUPS_CSV_PATH, GROUPS_FIELDNAMES, key='group_id')
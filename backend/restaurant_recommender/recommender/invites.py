@@ -0,0 +1,145 @@
+"""
+Einladungsvorschläge: Welche Teilmenge meiner Freunde ergibt den stärksten Küchen-Konsens?
+
+Kandidaten sind Gruppen aus dem Nutzer und 1 bis max_group_size - 1 seiner Freunde (friends.csv).
+Sind es höchstens max_candidates, werden alle Teilmengen aufgezählt, sonst zufällige gezogen.
+Bewertet wird blockweise: Die Rangzeilen des Nutzers und seiner Freunde werden einmal geholt
+(nur Küchen, die einer von ihnen nennt); pro Block ergeben ein Gather und zwei Summen Rangsumme
+und Häufigkeit aller Kandidaten, daraus dieselben Features wie in recommend/ und ein einziger
+Modellaufruf. Der Konsens einer Gruppe ist die Wahrscheinlichkeit der empfohlenen Küche.
+Nach jedem Block wird das Zeitbudget geprüft; bei Überschreitung endet die Suche vorzeitig mit
+den bis dahin bewerteten Kandidaten. Nutzer und Freunde werden wie in friends.csv über ihre
+user_id angegeben.
+"""
+
+import itertools
+import math
+import time
+
+import numpy as np
+
+from friends.store import friends_table, split_friends
+
+from .features import feature_matrix_from_stats, user_ranks
+from .ml import DEFAULT_RANK
+
+# Kandidaten pro Modellaufruf
+CANDIDATE_BLOCK_SIZE = 4096
+
+
+def load_friends(user_id):
+    """Freundesliste (user_ids) eines Nutzers aus der friends.csv (leer, falls der Nutzer fehlt)."""
+    return split_friends(friends_table.get(user_id))
+
+
+def count_subsets(num_friends, max_friends):
+    """Anzahl der Teilmengen mit 1 bis max_friends Freunden."""
+    return sum(math.comb(num_friends, size) for size in range(1, max_friends + 1))
+
+
+def enumerate_blocks(num_friends, max_friends, block_size=CANDIDATE_BLOCK_SIZE):
+    """
+    Alle Teilmengen mit 1 bis max_friends Freunden als Blöcke (m × max_friends) von Freundes-Indizes
+    (0 .. num_friends - 1); kleinere Teilmengen sind mit num_friends aufgefüllt (leere Zeile).
+    """
+    for size in range(1, max_friends + 1):
+        combinations = itertools.combinations(range(num_friends), size)
+        while True:
+            flat = np.fromiter(itertools.chain.from_iterable(itertools.islice(combinations, block_size)),
+                               dtype=np.intp)
+            if not len(flat):
+                break
+            block = np.full((len(flat) // size, max_friends), num_friends, dtype=np.intp)
+            block[:, :size] = flat.reshape(-1, size)
+            yield block
+
+
+def sample_blocks(num_friends, max_friends, num_samples, random_state, block_size=CANDIDATE_BLOCK_SIZE):
+    """
+    num_samples zufällige Teilmengen (Größe gleichverteilt in 1 .. max_friends, ohne doppelte Freunde) in Blöcken
+    wie enumerate_blocks. Doppelte Teilmengen innerhalb eines Blocks werden entfernt.
+    """
+    rng = np.random.default_rng(random_state)
+    for start in range(0, num_samples, block_size):
+        m = min(block_size, num_samples - start)
+        picks = np.argpartition(rng.random((m, num_friends)), max_friends - 1, axis=1)[:, :max_friends]
+        sizes = rng.integers(1, max_friends + 1, size=m)
+        block = np.where(np.arange(max_friends) < sizes[:, None], picks, num_friends)
+        yield np.unique(np.sort(block, axis=1), axis=0)
+
+
+def score_block(block, friend_ranks, own_ranks, active, num_cuisines, serving_model):
+    """
+    Features (wie group_feature_matrix) und Vorhersage für einen Block von Kandidaten.
+    friend_ranks: (Freunde + 1 leere Zeile) × aktive Küchen, own_ranks: Rangzeile des Nutzers (aktive Küchen).
+    Liefert (labels, consensus): empfohlene Küche und deren Wahrscheinlichkeit pro Kandidat.
+    """
+    gathered = friend_ranks[block]  # (m × max_friends × aktive Küchen)
+    rank_sum = gathered.sum(axis=1, dtype=np.float64) + own_ranks
+    frequency = np.count_nonzero(gathered, axis=1) + (own_ranks > 0)
+    feature_matrix = np.full((len(block), num_cuisines), float(DEFAULT_RANK))
+    feature_matrix[:, active] = feature_matrix_from_stats(rank_sum, frequency)
+    labels, probabilities = serving_model.predict(feature_matrix)
+    return labels, probabilities[np.arange(len(labels)), labels]
+
+
+def search_invite_groups(user_id, friends, serving_model, top_k=5, max_group_size=5, time_budget=0.2,
+                         max_candidates=20000, random_state=None):
+    """
+    Sucht die top_k Gruppen aus user_id und 1 bis max_group_size - 1 Freunden mit dem höchsten Konsens.
+    Freunde ohne Eintrag in der users.csv werden ignoriert; 'invite' enthält user_ids. Liefert ein JSON-serialisierbares Dict mit
+    den Vorschlägen und Angaben zur Suche (Anzahl Kandidaten, bewertet, vollständig, Laufzeit).
+    """
+    started = time.perf_counter()
+    friends = [friend for friend in dict.fromkeys(friends) if friend != user_id and friend in user_ranks]
+    max_friends = min(max_group_size - 1, len(friends))
+    total = count_subsets(len(friends), max_friends)
+    search = {'friends': len(friends), 'candidates': total, 'evaluated': 0, 'complete': False,
+              'sampled': total > max_candidates}
+    if max_friends < 1:
+        search['complete'] = True
+        search['elapsed_ms'] = (time.perf_counter() - started) * 1000
+        return {'suggestions': [], 'search': search}
+
+    cuisines = serving_model.cuisines
+    ranks = user_ranks.rank_rows([user_id] + friends, cuisines)
+    # Nur Küchen, die der Nutzer oder ein Freund nennt; alle anderen Spalten bleiben DEFAULT_RANK.
+    active = np.flatnonzero(ranks.any(axis=0))
+    own_ranks = ranks[0, active].astype(np.float64)
+    friend_ranks = np.vstack([ranks[1:, active], np.zeros((1, len(active)), dtype=ranks.dtype)])
+
+    if search['sampled']:
+        blocks = sample_blocks(len(friends), max_friends, max_candidates, random_state)
+    else:
+        blocks = enumerate_blocks(len(friends), max_friends)
+    candidates, labels, consensus = [], [], []
+    for block in blocks:
+        block_labels, block_consensus = score_block(block, friend_ranks, own_ranks, active, len(cuisines), serving_model)
+        candidates.append(block)
+        labels.append(block_labels)
+        consensus.append(block_consensus)
+        search['evaluated'] += len(block)
+        if time.perf_counter() - started > time_budget:
+            break
+    search['complete'] = not search['sampled'] and search['evaluated'] >= total
+
+    candidates, labels, consensus = np.concatenate(candidates), np.concatenate(labels), np.concatenate(consensus)
+    if search['sampled']:
+        # Dieselbe Teilmenge kann in mehreren Blöcken gezogen worden sein
+        _, first = np.unique(candidates, axis=0, return_index=True)
+        candidates, labels, consensus = candidates[first], labels[first], consensus[first]
+    sizes = np.count_nonzero(candidates < len(friends), axis=1)
+    # Höchster Konsens zuerst, bei Gleichstand die größere Gruppe
+    order = np.lexsort((-sizes, -consensus))[:top_k]
+    search['elapsed_ms'] = (time.perf_counter() - started) * 1000
+    return {
+        'suggestions': [
+            {
+                'invite': [friends[i] for i in candidates[row] if i < len(friends)],
+                'recommended_cuisine': cuisines[labels[row]],
+                'consensus': float(consensus[row]),
+            }
+            for row in order
+        ],
+        'search': search,
+    }
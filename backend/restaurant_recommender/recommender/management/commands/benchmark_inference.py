@@ -0,0 +1,48 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.forest_engine import FlatForest
+from recommender.ml import MODEL_PATH, generate_synthetic_group_data_weighted, load_model_artifact
+
+
+class Command(BaseCommand):
+    help = 'Vergleicht Latenz und Ergebnisse der FlatForest-Inferenz mit sklearn (p50/p99 für 1 und 1000 Zeilen)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=MODEL_PATH, help='Pfad zum Modell-Artefakt')
+        parser.add_argument('--rows', type=int, nargs='+', default=[1, 1000], help='Zeilen pro Aufruf')
+        parser.add_argument('--repeats', type=int, default=500, help='Messungen pro Konfiguration')
+        parser.add_argument('--check-rows', type=int, default=100000,
+                            help='Anzahl synthetischer Zeilen für den Vergleich der Vorhersagen')
+
+    def _latencies(self, func, X, repeats):
+        func(X)  # Warm-up
+        timings = np.empty(repeats)
+        for i in range(repeats):
+            start = time.perf_counter()
+            func(X)
+            timings[i] = time.perf_counter() - start
+        return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+    def handle(self, *args, **options):
+        artifact = load_model_artifact(options['model'])
+        model = artifact['model']
+        engine = FlatForest.from_sklearn(model)
+
+        X_check, _ = generate_synthetic_group_data_weighted(num_groups=options['check_rows'], random_state=1234,
+                                                            num_cuisines=model.n_features_in_)
+        if not np.array_equal(model.predict_proba(X_check), engine.predict_proba(X_check)):
+            raise CommandError('FlatForest.predict_proba weicht von sklearn ab')
+        if not np.array_equal(model.predict(X_check), engine.predict(X_check)):
+            raise CommandError('FlatForest.predict weicht von sklearn ab')
+        self.stdout.write(f'Vorhersagen auf {len(X_check)} Zeilen bitidentisch zu sklearn.')
+
+        self.stdout.write(f'{"Backend":>10} {"Zeilen":>7} {"p50 [ms]":>10} {"p99 [ms]":>10}')
+        for rows in options['rows']:
+            X = X_check[:rows]
+            for name, func in (('sklearn', model.predict), ('flat', engine.predict)):
+                p50, p99 = self._latencies(func, X, options['repeats'])
+                self.stdout.write(f'{name:>10} {rows:>7} {p50:10.3f} {p99:10.3f}')
+        self.stdout.write(self.style.SUCCESS('Benchmark abgeschlossen.'))
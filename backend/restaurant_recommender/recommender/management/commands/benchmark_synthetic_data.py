@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from recommender.ml import CUISINES, DEFAULT_RANK, MAX_SEQ_LENGTH, generate_synthetic_group_data_weighted
+
+
+def legacy_generate_synthetic_group_data_weighted(num_groups=1000, random_state=42, p=2):
+    """
+    Ursprüngliche Implementierung des Generators (eine Gruppe nach der anderen, np.random.choice pro Nutzer).
+    Dient nur noch als Vergleichsbasis für den Benchmark.
+    """
+    np.random.seed(random_state)
+    X = []
+    y = []
+    for _ in range(num_groups):
+        num_users = np.random.randint(2, 6)
+        group_favorites = []
+        for _ in range(num_users):
+            seq_len = np.random.randint(1, MAX_SEQ_LENGTH + 1)
+            favorites = np.random.choice(CUISINES, size=seq_len, replace=False).tolist()
+            group_favorites.append(favorites)
+        cuisine_ranks = {cuisine: [] for cuisine in CUISINES}
+        for fav_list in group_favorites:
+            for pos, cuisine in enumerate(fav_list, start=1):
+                cuisine_ranks[cuisine].append(pos)
+        feature_vector = []
+        for cuisine in CUISINES:
+            if cuisine_ranks[cuisine]:
+                avg_rank = np.mean(cuisine_ranks[cuisine])
+                freq = len(cuisine_ranks[cuisine])
+                score = avg_rank * ((num_users / freq) ** p)
+            else:
+                score = DEFAULT_RANK
+            feature_vector.append(score)
+        X.append(feature_vector)
+        y.append(CUISINES.index(CUISINES[np.argmin(feature_vector)]))
+    return np.array(X), np.array(y)
+
+
+class Command(BaseCommand):
+    help = 'Vergleicht den vektorisierten Generator für synthetische Gruppendaten mit der alten Implementierung'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000],
+                            help='Anzahl Gruppen pro Messung')
+        parser.add_argument('--max-legacy-groups', type=int, default=None,
+                            help='Alte Implementierung nur bis zu dieser Gruppenanzahl messen')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _time(self, func, num_groups, seed):
+        start = time.perf_counter()
+        X, y = func(num_groups=num_groups, random_state=seed, p=2)
+        return time.perf_counter() - start, X, y
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        max_legacy = options['max_legacy_groups']
+        self.stdout.write(f'{"Gruppen":>10} {"alt [s]":>10} {"neu [s]":>10} {"Speedup":>9} {"Gruppen/s (neu)":>16}')
+        for num_groups in options['sizes']:
+            new_time, X_new, y_new = self._time(generate_synthetic_group_data_weighted, num_groups, seed)
+            # Reproduzierbarkeit: gleicher Seed muss identische Daten liefern
+            _, X_again, y_again = self._time(generate_synthetic_group_data_weighted, num_groups, seed)
+            if not (np.array_equal(X_new, X_again) and np.array_equal(y_new, y_again)):
+                self.stdout.write(self.style.ERROR(f'Nicht reproduzierbar bei {num_groups} Gruppen'))
+
+            if max_legacy is None or num_groups <= max_legacy:
+                legacy_time, _, _ = self._time(legacy_generate_synthetic_group_data_weighted, num_groups, seed)
+                legacy_col = f'{legacy_time:10.3f}'
+                speedup_col = f'{legacy_time / new_time:8.1f}x'
+            else:
+                legacy_col = f'{"-":>10}'
+                speedup_col = f'{"-":>9}'
+            self.stdout.write(
+                f'{num_groups:>10} {legacy_col} {new_time:10.3f} {speedup_col} {num_groups / new_time:16.0f}'
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark abgeschlossen.'))
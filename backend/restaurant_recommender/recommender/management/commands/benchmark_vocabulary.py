@@ -0,0 +1,116 @@
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from recommender.features import feature_matrix_from_stats, group_feature_matrix
+from recommender.forest_engine import FlatForest
+from recommender.ml import CUISINES, MAX_GROUP_SIZE, MAX_SEQ_LENGTH, MIN_GROUP_SIZE, train_model
+from recommender.rank_matrix import CuisineRankMatrix
+from recommender.sweep import single_row_latency_ms
+
+
+def dense_feature_matrix(ranks, index, member_lists):
+    """
+    Bisherige dichte Feature-Konstruktion als Vergleich: Gather der (Nutzer × Küchen)-Rangzeilen aller
+    Mitglieder und bincount über alle (Gruppe × Küchen)-Zellen.
+    """
+    num_cuisines = ranks.shape[1]
+    rows, segments = [], []
+    for group_index, members in enumerate(member_lists):
+        for username in dict.fromkeys(members):
+            rows.append(index[username])
+            segments.append(group_index)
+    gathered = ranks[np.asarray(rows, dtype=np.intp)]
+    member_rows, columns = np.nonzero(gathered)
+    flat_index = np.asarray(segments, dtype=np.intp)[member_rows] * num_cuisines + columns
+    size = len(member_lists) * num_cuisines
+    rank_sum = np.bincount(flat_index, weights=gathered[member_rows, columns], minlength=size)
+    frequency = np.bincount(flat_index, minlength=size)
+    return feature_matrix_from_stats(rank_sum.reshape(-1, num_cuisines), frequency.reshape(-1, num_cuisines))
+
+
+class Command(BaseCommand):
+    help = ('Misst Feature-Konstruktion (dünn besetzt vs. dicht), Training und Einzel-Inferenz für '
+            'Küchen-Vokabulare verschiedener Größe (Standard: 8, 100 und 500 Küchen)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cuisines', type=int, nargs='+', default=[8, 100, 500], help='Größen des Vokabulars')
+        parser.add_argument('--users', type=int, default=10000, help='Anzahl synthetischer Nutzer')
+        parser.add_argument('--groups', type=int, default=500, help='Gruppen pro Batch (wie recommend_batch)')
+        parser.add_argument('--num-groups', type=int, default=5000, help='Synthetische Trainingsgruppen')
+        parser.add_argument('--n-estimators', type=int, default=50, help='Anzahl Bäume')
+        parser.add_argument('--repeats', type=int, default=200, help='Messungen pro Konfiguration')
+        parser.add_argument('--seed', type=int, default=42, help='Seed für Nutzer, Gruppen und Training')
+
+    def _p50_ms(self, func, repeats):
+        func()  # Warm-up
+        timings = np.empty(repeats)
+        for i in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings[i] = time.perf_counter() - start
+        return float(np.percentile(timings, 50) * 1000)
+
+    def _synthetic_users(self, rng, cuisines, num_users):
+        """Favoriten (1 bis MAX_SEQ_LENGTH verschiedene Küchen) für num_users Nutzer."""
+        favorites = []
+        for _ in range(num_users):
+            length = rng.integers(1, min(MAX_SEQ_LENGTH, len(cuisines)) + 1)
+            favorites.append([cuisines[i] for i in rng.choice(len(cuisines), size=length, replace=False)])
+        return favorites
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f'{options["users"]} Nutzer, Batch mit {options["groups"]} Gruppen, '
+                          f'Training mit {options["num_groups"]} Gruppen und {options["n_estimators"]} Bäumen')
+        self.stdout.write(f'{"Küchen":>7} {"Features 1 [ms]":>16} {"dicht 1 [ms]":>13} {"Features N [ms]":>16} '
+                          f'{"dicht N [ms]":>13} {"Speicher [KB]":>14} {"dicht [KB]":>11} {"Training [s]":>13} '
+                          f'{"predict p50 [ms]":>17}')
+        for num_cuisines in options['cuisines']:
+            cuisines = list(CUISINES) if num_cuisines == len(CUISINES) else [f'cuisine_{i:03d}' for i in range(num_cuisines)]
+            favorites = self._synthetic_users(rng, cuisines, options['users'])
+            usernames = [f'user{i}' for i in range(options['users'])]
+            sizes = rng.integers(MIN_GROUP_SIZE, MAX_GROUP_SIZE + 1, size=options['groups'])
+            member_lists = [[usernames[i] for i in rng.choice(len(usernames), size=size, replace=False)] for size in sizes]
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'users.csv')
+                with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(['username', 'favorite_cuisines'])
+                    writer.writerows(zip(usernames, (','.join(user_favorites) for user_favorites in favorites)))
+                matrix = CuisineRankMatrix(path)
+                sparse_one = self._p50_ms(lambda: group_feature_matrix(member_lists[:1], cuisines, matrix),
+                                          options['repeats'])
+                sparse_batch = self._p50_ms(lambda: group_feature_matrix(member_lists, cuisines, matrix),
+                                            max(options['repeats'] // 10, 1))
+                sparse_X = group_feature_matrix(member_lists, cuisines, matrix)
+                sparse_bytes = matrix.nbytes()
+
+            # Bisherige dichte int8-Rangmatrix (Nutzer × Küchen) als Vergleich
+            column = {cuisine: i for i, cuisine in enumerate(cuisines)}
+            ranks = np.zeros((len(usernames), num_cuisines), dtype=np.int8)
+            for row, user_favorites in enumerate(favorites):
+                for pos, cuisine in enumerate(user_favorites, start=1):
+                    ranks[row, column[cuisine]] = pos
+            index = {username: row for row, username in enumerate(usernames)}
+            dense_one = self._p50_ms(lambda: dense_feature_matrix(ranks, index, member_lists[:1]), options['repeats'])
+            dense_batch = self._p50_ms(lambda: dense_feature_matrix(ranks, index, member_lists),
+                                       max(options['repeats'] // 10, 1))
+            if not np.array_equal(sparse_X, dense_feature_matrix(ranks, index, member_lists)):
+                self.stdout.write(self.style.ERROR(f'{num_cuisines} Küchen: Features weichen von der dichten Variante ab'))
+
+            started = time.perf_counter()
+            model, _, X_test, _ = train_model(num_groups=options['num_groups'], n_estimators=options['n_estimators'],
+                                              random_state=options['seed'], cuisines=cuisines)
+            train_s = time.perf_counter() - started
+            latency = single_row_latency_ms(FlatForest.from_sklearn(model), X_test, repeats=options['repeats'])
+
+            self.stdout.write(f'{num_cuisines:>7} {sparse_one:16.3f} {dense_one:13.3f} {sparse_batch:16.3f} '
+                              f'{dense_batch:13.3f} {sparse_bytes / 1024:14.1f} {ranks.nbytes / 1024:11.1f} '
+                              f'{train_s:13.2f} {latency:17.3f}')
+        self.stdout.write(self.style.SUCCESS('Benchmark abgeschlossen.'))
@@ -0,0 +1,101 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender import compaction
+from recommender.forest_engine import FlatForest
+from recommender.ml import MODEL_DIR, MODEL_PATH, compute_model_metrics, load_model_artifact, save_model_artifact
+from recommender.sweep import parse_max_depth, single_row_latency_ms
+
+
+class Command(BaseCommand):
+    help = ('Verkleinert den Random Forest (weniger Bäume, geringere Tiefe oder Destillation) unter Einhaltung einer '
+            'Ziel-Accuracy und vergleicht Größe, RSS und Latenz vorher/nachher')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=MODEL_PATH, help='Pfad des zu verkleinernden Modell-Artefakts')
+        parser.add_argument('--output', default=os.path.join(MODEL_DIR, 'rf_model_compact.joblib'),
+                            help='Zielpfad des verkleinerten Artefakts (MODEL_PATH, um es direkt auszuliefern)')
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument('--target-accuracy', type=float, help='Mindest-Accuracy auf dem Testset des Artefakts')
+        target.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                            help='Erlaubter Accuracy-Verlust gegenüber dem Ausgangsmodell (Standard: 0.01)')
+        parser.add_argument('--n-estimators', type=int, nargs='+', default=[5, 10, 20, 30, 50],
+                            help='Baumanzahlen der Kandidaten')
+        parser.add_argument('--max-depth', type=parse_max_depth, nargs='+', default=[6, 8, 10, 12, None],
+                            help="Baumtiefen der destillierten Kandidaten ('none' = unbegrenzt)")
+        parser.add_argument('--distill-groups', type=int, default=20000,
+                            help='Anzahl frischer synthetischer Gruppen für die Destillation (0 = keine Destillation)')
+        parser.add_argument('--seed', type=int, default=4242, help='Seed für Destillationsdaten und Training')
+
+    def handle(self, *args, **options):
+        # Ohne mmap laden, damit --output auch das Ausgangsartefakt ersetzen darf
+        artifact = load_model_artifact(options['model'], mmap=False)
+        teacher = artifact['model']
+        X_test, y_test = artifact['X_test'], artifact['y_test']
+        baseline = compute_model_metrics(teacher, X_test, y_test)
+        target = options['target_accuracy']
+        if target is None:
+            target = baseline['accuracy'] - options['max_accuracy_drop']
+        self.stdout.write(f'Ausgangsmodell {artifact["version"]}: {teacher.n_estimators} Bäume, '
+                          f'Accuracy {baseline["accuracy"]:.4f}; Ziel-Accuracy {target:.4f}')
+
+        candidates = []  # (model_bytes, strategy, params, model, metrics)
+
+        def consider(strategy, params, model):
+            metrics = compute_model_metrics(model, X_test, y_test)
+            size = compaction.model_bytes(model)
+            ok = metrics['accuracy'] >= target
+            self.stdout.write(f'  {strategy:>9} {params}: Accuracy {metrics["accuracy"]:.4f}, '
+                              f'{size / 1e6:.2f} MB{"" if ok else " (verfehlt Ziel)"}')
+            if ok:
+                candidates.append((size, strategy, params, model, metrics))
+
+        for n_estimators in sorted(set(options['n_estimators'])):
+            if n_estimators < teacher.n_estimators:
+                consider('subset', {'n_estimators': n_estimators}, compaction.subset_forest(teacher, n_estimators))
+
+        if options['distill_groups']:
+            X_distill = compaction.distillation_data(options['distill_groups'], options['seed'], teacher.n_features_in_)
+            for n_estimators in sorted(set(options['n_estimators'])):
+                for max_depth in options['max_depth']:
+                    params = {'n_estimators': n_estimators, 'max_depth': max_depth}
+                    consider('distilled', params, compaction.distill_forest(
+                        teacher, X_distill, n_estimators, max_depth, random_state=options['seed']))
+
+        if not candidates:
+            raise CommandError(f'Kein Kandidat erreicht die Ziel-Accuracy {target:.4f}; Artefakt wird nicht geschrieben.')
+        size, strategy, params, model, metrics = min(candidates, key=lambda candidate: candidate[0])
+
+        # Vorher-Werte messen, bevor --output das Ausgangsartefakt ggf. ersetzt
+        before = {
+            'accuracy': baseline['accuracy'],
+            'bytes': compaction.model_bytes(teacher),
+            'rss': compaction.rss_delta_bytes(options['model']),
+            'latency': single_row_latency_ms(FlatForest.from_sklearn(teacher), X_test),
+        }
+
+        training_params = {
+            **artifact.get('training_params', {}),
+            'compacted_from': artifact['version'],
+            'compaction': strategy,
+            **params,
+        }
+        if strategy == 'distilled':
+            training_params.update(distill_groups=options['distill_groups'], distill_seed=options['seed'])
+        version = save_model_artifact(model, metrics, X_test, y_test, path=options['output'],
+                                      training_params=training_params, cuisines=artifact['schema']['cuisines'])
+
+        after = {
+            'accuracy': metrics['accuracy'],
+            'bytes': size,
+            'rss': compaction.rss_delta_bytes(options['output']),
+            'latency': single_row_latency_ms(FlatForest.from_sklearn(model), X_test),
+        }
+        self.stdout.write(f'Gewählt: {strategy} {params}')
+        self.stdout.write(f'{"":>8} {"Accuracy":>9} {"Pickle [MB]":>12} {"RSS-Zuwachs [MB]":>17} {"predict p50 [ms]":>17}')
+        for label, values in (('vorher', before), ('nachher', after)):
+            rss = 'n/a' if values['rss'] is None else f'{values["rss"] / 1e6:.2f}'
+            self.stdout.write(f'{label:>8} {values["accuracy"]:9.4f} {values["bytes"] / 1e6:12.2f} {rss:>17} '
+                              f'{values["latency"]:17.3f}')
+        self.stdout.write(self.style.SUCCESS(f'Verkleinertes Modell-Artefakt {version} gespeichert unter {options["output"]}'))
@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender import evaluation
+from recommender.features import user_ranks
+from recommender.groups import groups_table
+from recommender.ml import MAX_GROUP_SIZE, MIN_GROUP_SIZE, MODEL_PATH, load_model_artifact
+
+
+class Command(BaseCommand):
+    help = ('Bewertet Modell und Heuristik auf allen Gruppen (vektorisiert, optional parallel) '
+            'und schreibt einen JSON-Report mit Metriken und Laufzeiten')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=MODEL_PATH, help='Pfad zum Modell-Artefakt')
+        parser.add_argument('--synthetic-groups', type=int, default=0,
+                            help='Statt groups.csv so viele zufällige Gruppen aus den bekannten Nutzern bewerten')
+        parser.add_argument('--seed', type=int, default=42, help='Seed für --synthetic-groups')
+        parser.add_argument('--workers', type=int, default=1, help='Anzahl Prozesse (1 = im aktuellen Prozess)')
+        parser.add_argument('--shard-size', type=int, default=50000, help='Gruppen pro Shard')
+        parser.add_argument('--report', help='Pfad für den JSON-Report (ohne Angabe: nur Ausgabe auf stdout)')
+
+    def _load_member_lists(self, options):
+        if options['synthetic_groups']:
+            usernames = np.array(user_ranks.keys())
+            if len(usernames) < MIN_GROUP_SIZE:
+                raise CommandError('Zu wenige Nutzer für synthetische Gruppen')
+            rng = np.random.default_rng(options['seed'])
+            num_groups = options['synthetic_groups']
+            max_size = min(MAX_GROUP_SIZE, len(usernames))
+            sizes = rng.integers(MIN_GROUP_SIZE, max_size + 1, size=num_groups)
+            if len(usernames) <= 64:
+                # Ziehen ohne Zurücklegen: die ersten max_size Spalten einer zufälligen Permutation pro Zeile
+                picks = np.argsort(rng.random((num_groups, len(usernames))), axis=1)[:, :max_size]
+            else:
+                # Bei vielen Nutzern sind Doppelte selten; rank_stats zählt sie ohnehin nur einmal.
+                picks = rng.integers(0, len(usernames), size=(num_groups, max_size))
+            members = usernames[picks].tolist()
+            return [row[:size] for row, size in zip(members, sizes)], 'synthetic'
+        groups = [row for row in groups_table.rows() if row['members']]  # Überspringe Gruppen ohne Mitglieder
+        return [group['members'].split(",") for group in groups], 'groups.csv'
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['shard_size'] < 1:
+            raise CommandError('--workers und --shard-size müssen positiv sein')
+        timing = {}
+        started = time.perf_counter()
+
+        member_lists, source = self._load_member_lists(options)
+        if not member_lists:
+            raise CommandError('Keine Gruppen mit Mitgliedern gefunden')
+        group_sizes = np.array([len(members) for members in member_lists], dtype=np.float64)
+        timing['load_groups_s'] = time.perf_counter() - started
+
+        # Nutzer einmal laden, Rang-Statistiken aller Gruppen in einem Schritt (Spalten: Vokabular des Modells)
+        artifact = load_model_artifact(options['model'])
+        step = time.perf_counter()
+        rank_sum, frequency = user_ranks.rank_stats(member_lists, artifact['schema']['cuisines'])
+        timing['rank_stats_s'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        bounds = range(0, len(member_lists), options['shard_size'])
+        shards = [(rank_sum[i:i + options['shard_size']], frequency[i:i + options['shard_size']],
+                   group_sizes[i:i + options['shard_size']]) for i in bounds]
+        if options['workers'] == 1:
+            evaluation.init_worker(options['model'])
+            results = [evaluation.evaluate_shard(*shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=evaluation.init_worker,
+                                     initargs=(options['model'],)) as executor:
+                results = list(executor.map(evaluation.evaluate_shard, *zip(*shards)))
+        timing['evaluate_s'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        metrics = evaluation.summarize(evaluation.merge_shards(results))
+        timing['metrics_s'] = time.perf_counter() - step
+        timing['total_s'] = time.perf_counter() - started
+
+        report = {
+            'source': source,
+            'num_groups': len(member_lists),
+            'model_path': options['model'],
+            'model_version': artifact['version'],
+            'num_cuisines': len(artifact['schema']['cuisines']),
+            'workers': options['workers'],
+            'shards': len(shards),
+            'metrics': metrics,
+            'timing': timing,
+        }
+
+        self.stdout.write(f'Evaluation auf {len(member_lists)} Gruppen ({source}), Modell {report["model_version"]}:')
+        self.stdout.write(f'{"Strategie":>10} {"Accuracy":>9} {"Precision":>9} {"Recall":>9} {"F1":>9} {"NDCG":>9}')
+        for strategy, values in metrics.items():
+            self.stdout.write(f'{strategy:>10} {values["accuracy"]:9.4f} {values["precision"]:9.4f} '
+                              f'{values["recall"]:9.4f} {values["f1"]:9.4f} {values["ndcg"]:9.4f}')
+        self.stdout.write(f'Laufzeit: {timing["total_s"]:.3f} s (Evaluation {timing["evaluate_s"]:.3f} s)')
+
+        if options['report']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['report'])), exist_ok=True)
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Report gespeichert unter {options["report"]}'))
@@ -0,0 +1,56 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recommender import precompute
+from recommender.groups import groups_table
+from recommender.ml import MODEL_PATH, load_model_artifact
+from recommender.models import PrecomputedRecommendation
+
+
+class Command(BaseCommand):
+    help = ('Berechnet die Empfehlungen aller Gruppen aus groups.csv parallel und speichert sie samt Fingerabdruck '
+            'der Mitglieder-Favoriten in PrecomputedRecommendation (z. B. nächtlich per Cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=getattr(settings, 'RECOMMENDER_MODEL_PATH', MODEL_PATH),
+                            help='Pfad zum Modell-Artefakt (Standard: das ausgelieferte Modell)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Anzahl Prozesse (1 = im aktuellen Prozess)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Gruppen pro Aufgabe im Process-Pool')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers und --chunk-size müssen positiv sein')
+        started = time.perf_counter()
+        model_version = load_model_artifact(options['model'])['version']
+
+        groups = [(row['group_id'], row['members'].split(",")) for row in groups_table.rows() if row['members']]
+        chunks = [groups[i:i + options['chunk_size']] for i in range(0, len(groups), options['chunk_size'])]
+
+        if options['workers'] == 1 or len(chunks) <= 1:
+            precompute.init_worker(options['model'])
+            results = [precompute.recommend_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(options['workers'], len(chunks)), initializer=precompute.init_worker,
+                                     initargs=(options['model'],)) as executor:
+                results = list(executor.map(precompute.recommend_chunk, chunks))
+        computed_s = time.perf_counter() - started
+
+        with transaction.atomic():
+            PrecomputedRecommendation.objects.all().delete()
+            PrecomputedRecommendation.objects.bulk_create(
+                (PrecomputedRecommendation(group_id=group_id, label=label, recommended_cuisine=cuisine,
+                                           probabilities=probabilities, model_version=model_version,
+                                           fingerprint=fingerprint)
+                 for chunk in results for group_id, fingerprint, label, cuisine, probabilities in chunk),
+                batch_size=1000,
+            )
+
+        self.stdout.write(f'{len(groups)} Gruppen mit Modell {model_version} in {computed_s:.2f} s berechnet, '
+                          f'insgesamt {time.perf_counter() - started:.2f} s.')
+        self.stdout.write(self.style.SUCCESS(f'Vorberechnete Empfehlungen gespeichert (Modell {model_version}).'))
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.evaluation import ground_truth_labels
+from recommender.features import feature_matrix_from_stats, user_ranks
+from recommender.groups import groups_table
+from recommender.ml import (
+    MODEL_PATH, compute_model_metrics, fit_model, generate_synthetic_group_data_weighted, is_at_least_as_good,
+    load_model_artifact, p, save_model_artifact,
+)
+from recommender.vocabulary import VOCABULARY_SOURCES, load_cuisine_vocabulary
+
+
+def real_group_data(cuisines):
+    """
+    Features (wie im recommend-Endpoint) und Labels (Küche mit dem besten Durchschnittsrang) der Gruppen aus groups.csv,
+    mit den Spalten des Vokabulars cuisines.
+    """
+    member_lists = [row['members'].split(",") for row in groups_table.rows() if row['members']]
+    if not member_lists:
+        return np.empty((0, len(cuisines))), np.empty(0, dtype=np.int64)
+    rank_sum, frequency = user_ranks.rank_stats(member_lists, cuisines)
+    return feature_matrix_from_stats(rank_sum, frequency), ground_truth_labels(rank_sum, frequency)
+
+
+class Command(BaseCommand):
+    help = ('Trainiert ein neues Modell und ersetzt das ausgelieferte Artefakt nur, wenn es auf demselben Testset '
+            'mindestens so gut ist wie das aktuelle; laufende Server übernehmen es per Hot-Swap')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--num-groups', type=int, default=1000, help='Anzahl synthetischer Gruppen')
+        parser.add_argument('--n-estimators', type=int, default=100, help='Anzahl Bäume im Random Forest')
+        parser.add_argument('--seed', type=int, default=42, help='Seed für Datengenerierung und Training')
+        parser.add_argument('--source', choices=['synthetic', 'groups'], default='synthetic',
+                            help="'groups': zusätzlich die echten Gruppen aus groups.csv als Trainingsdaten verwenden")
+        parser.add_argument('--model', default=MODEL_PATH, help='Pfad des ausgelieferten Modell-Artefakts')
+        parser.add_argument('--force', action='store_true', help='Ohne Vergleich mit dem aktuellen Modell übernehmen')
+        parser.add_argument('--vocabulary', choices=VOCABULARY_SOURCES, default='restaurants',
+                            help="Küchen-Vokabular: aus der Restaurant-Tabelle oder die bisherigen 8 Küchen ('default')")
+        parser.add_argument('--min-restaurants', type=int, default=1,
+                            help='Küchenstile, die in weniger Restaurants vorkommen, fallen aus dem Vokabular')
+        parser.add_argument('--max-cuisines', type=int, help='Höchstens so viele (häufigste) Küchen ins Vokabular')
+
+    def handle(self, *args, **options):
+        cuisines, vocabulary_source = load_cuisine_vocabulary(
+            options['vocabulary'], options['min_restaurants'], options['max_cuisines'])
+        self.stdout.write(f'Vokabular: {len(cuisines)} Küchen ({vocabulary_source})')
+        X, y = generate_synthetic_group_data_weighted(num_groups=options['num_groups'], random_state=options['seed'], p=p,
+                                                      num_cuisines=len(cuisines))
+        if options['source'] == 'groups':
+            X_real, y_real = real_group_data(cuisines)
+            X, y = np.concatenate([X, X_real]), np.concatenate([y, y_real])
+            self.stdout.write(f'{len(y_real)} echte Gruppen zu den Trainingsdaten hinzugefügt.')
+        model, metrics, X_test, y_test = fit_model(
+            X, y, n_estimators=options['n_estimators'], random_state=options['seed']
+        )
+        self.stdout.write('Kandidat:  Accuracy {accuracy:.4f}, NDCG {ndcg:.4f}'.format(**metrics))
+
+        if os.path.exists(options['model']) and not options['force']:
+            current = load_model_artifact(options['model'])
+            if current['schema']['cuisines'] == cuisines:
+                # Beide Modelle auf demselben (neuen) Testset vergleichen
+                current_metrics = compute_model_metrics(current['model'], X_test, y_test)
+            else:
+                # Anderes Vokabular: gemeinsames Testset nicht möglich, Metriken aus dem jeweiligen Training vergleichen
+                self.stdout.write(f'Vokabular geändert ({len(current["schema"]["cuisines"])} -> {len(cuisines)} Küchen); '
+                                  'vergleiche die beim Training gespeicherten Metriken.')
+                current_metrics = current['metrics']
+            self.stdout.write('Aktuell ({version}): Accuracy {accuracy:.4f}, NDCG {ndcg:.4f}'.format(
+                version=current['version'], **current_metrics))
+            if not is_at_least_as_good(metrics, current_metrics):
+                raise CommandError('Kandidat ist schlechter als das aktuelle Modell; Artefakt bleibt unverändert.')
+
+        training_params = {
+            'num_groups': options['num_groups'],
+            'n_estimators': options['n_estimators'],
+            'seed': options['seed'],
+            'source': options['source'],
+            'vocabulary': vocabulary_source,
+        }
+        version = save_model_artifact(model, metrics, X_test, y_test, path=options['model'], training_params=training_params,
+                                      cuisines=cuisines)
+        self.stdout.write(self.style.SUCCESS(
+            f'Modell-Artefakt {version} gespeichert unter {options["model"]}; laufende Server übernehmen es automatisch.'))
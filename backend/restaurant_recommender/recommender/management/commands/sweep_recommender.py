@@ -0,0 +1,85 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender import sweep
+from recommender.ml import MODEL_DIR, generate_synthetic_favorites
+
+
+class Command(BaseCommand):
+    help = ('Trainiert und bewertet ein Gitter aus (p, n_estimators, max_depth) parallel und gibt Accuracy, NDCG, '
+            'Modellgröße und Einzel-Latenz pro Konfiguration aus')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--p', type=float, nargs='+', default=[1.0, 2.0, 3.0], help='Exponenten der Frequency-Gewichtung')
+        parser.add_argument('--n-estimators', type=int, nargs='+', default=[25, 50, 100], help='Anzahl Bäume')
+        parser.add_argument('--max-depth', type=sweep.parse_max_depth, nargs='+', default=[8, 16, None],
+                            help="Maximale Baumtiefe ('none' = unbegrenzt)")
+        parser.add_argument('--num-groups', type=int, default=20000, help='Anzahl synthetischer Gruppen')
+        parser.add_argument('--seed', type=int, default=42, help='Seed für Datengenerierung und Training')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Anzahl Prozesse')
+        parser.add_argument('--cache-dir', default=os.path.join(MODEL_DIR, 'sweep'),
+                            help='Verzeichnis für die Ergebnisse fertiger Gitterpunkte')
+        parser.add_argument('--report', help='Pfad für einen JSON-Report aller Gitterpunkte')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers muss positiv sein')
+        os.makedirs(options['cache_dir'], exist_ok=True)
+        num_groups, seed = options['num_groups'], options['seed']
+
+        points = [
+            {'p': p, 'n_estimators': n_estimators, 'max_depth': max_depth}
+            for p, n_estimators, max_depth in itertools.product(options['p'], options['n_estimators'], options['max_depth'])
+        ]
+        results = {}
+        missing = []
+        for point in points:
+            key = sweep.grid_key(point, num_groups, seed)
+            cached = sweep.load_cached(options['cache_dir'], key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing.append((key, point))
+        self.stdout.write(f'{len(points)} Gitterpunkte, davon {len(points) - len(missing)} aus dem Cache.')
+
+        if missing:
+            started = time.perf_counter()
+            favorites, num_users = generate_synthetic_favorites(num_groups=num_groups, random_state=seed)
+            dataset = sweep.SharedArrays.create(favorites=favorites, num_users=num_users)
+            try:
+                with ProcessPoolExecutor(max_workers=min(options['workers'], len(missing)),
+                                         initializer=sweep.init_worker, initargs=(dataset.spec(),)) as executor:
+                    futures = {executor.submit(sweep.evaluate_point, point, seed): key for key, point in missing}
+                    for future in as_completed(futures):
+                        key = futures[future]
+                        results[key] = future.result()
+                        sweep.store_cached(options['cache_dir'], key, results[key])
+                        self.stdout.write(f'  fertig: {self._describe(results[key])} ({results[key]["train_s"]:.1f} s)')
+            finally:
+                dataset.unlink()
+            self.stdout.write(f'{len(missing)} Gitterpunkte in {time.perf_counter() - started:.1f} s trainiert.')
+
+        rows = [results[sweep.grid_key(point, num_groups, seed)] for point in points]
+        self.stdout.write(f'{"p":>5} {"Bäume":>6} {"Tiefe":>6} {"Accuracy":>9} {"NDCG":>7} {"Größe [MB]":>11} {"Knoten":>9} '
+                          f'{"predict p50 [ms]":>17}')
+        for row in rows:
+            depth = 'none' if row['max_depth'] is None else row['max_depth']
+            self.stdout.write(f'{row["p"]:>5g} {row["n_estimators"]:>6} {depth:>6} {row["accuracy"]:9.4f} {row["ndcg"]:7.4f} '
+                              f'{row["model_bytes"] / 1e6:11.2f} {row["total_nodes"]:9} {row["predict_ms_p50"]:17.3f}')
+        self.stdout.write('Hinweis: Die Latenz wird parallel zum Training anderer Gitterpunkte gemessen; '
+                          'für exakte Werte mit --workers 1 laufen lassen.')
+
+        if options['report']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['report'])), exist_ok=True)
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump({'num_groups': num_groups, 'seed': seed, 'results': rows}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Report gespeichert unter {options["report"]}'))
+
+    @staticmethod
+    def _describe(row):
+        return f'p={row["p"]:g}, n_estimators={row["n_estimators"]}, max_depth={row["max_depth"]}'
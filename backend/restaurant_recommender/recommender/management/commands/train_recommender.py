@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from recommender.ml import MODEL_PATH, save_model_artifact, train_model
+from recommender.vocabulary import VOCABULARY_SOURCES, load_cuisine_vocabulary
+
+
+class Command(BaseCommand):
+    help = 'Trainiert das Random-Forest-Empfehlungsmodell und speichert es als versioniertes Artefakt'
+    # Die System-Checks laden die URLs und damit das Modell, das dieser Befehl erst erzeugt
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--num-groups', type=int, default=1000, help='Anzahl synthetischer Gruppen')
+        parser.add_argument('--n-estimators', type=int, default=100, help='Anzahl Bäume im Random Forest')
+        parser.add_argument('--seed', type=int, default=42, help='Seed für Datengenerierung und Training')
+        parser.add_argument('--output', default=MODEL_PATH, help='Zielpfad des Modell-Artefakts')
+        parser.add_argument('--vocabulary', choices=VOCABULARY_SOURCES, default='restaurants',
+                            help="Küchen-Vokabular: aus der Restaurant-Tabelle oder die bisherigen 8 Küchen ('default')")
+        parser.add_argument('--min-restaurants', type=int, default=1,
+                            help='Küchenstile, die in weniger Restaurants vorkommen, fallen aus dem Vokabular')
+        parser.add_argument('--max-cuisines', type=int, help='Höchstens so viele (häufigste) Küchen ins Vokabular')
+
+    def handle(self, *args, **options):
+        cuisines, vocabulary_source = load_cuisine_vocabulary(
+            options['vocabulary'], options['min_restaurants'], options['max_cuisines'])
+        if vocabulary_source != options['vocabulary']:
+            self.stdout.write(self.style.WARNING('Keine Restaurantdaten gefunden; verwende die Standard-Küchenliste.'))
+        self.stdout.write(f'Vokabular: {len(cuisines)} Küchen ({vocabulary_source})')
+        training_params = {
+            'num_groups': options['num_groups'],
+            'n_estimators': options['n_estimators'],
+            'seed': options['seed'],
+            'vocabulary': vocabulary_source,
+        }
+        model, metrics, X_test, y_test = train_model(
+            num_groups=options['num_groups'],
+            n_estimators=options['n_estimators'],
+            random_state=options['seed'],
+            cuisines=cuisines,
+        )
+        version = save_model_artifact(
+            model, metrics, X_test, y_test, path=options['output'], training_params=training_params, cuisines=cuisines
+        )
+
+        self.stdout.write("Trained Random Forest Model on Synthetic Group Data")
+        self.stdout.write("Accuracy: {:.4f}".format(metrics['accuracy']))
+        self.stdout.write("Precision: {:.4f}".format(metrics['precision']))
+        self.stdout.write("Recall: {:.4f}".format(metrics['recall']))
+        self.stdout.write("F1 Score: {:.4f}".format(metrics['f1']))
+        self.stdout.write("NDCG: {:.4f}".format(metrics['ndcg']))
+        self.stdout.write(self.style.SUCCESS(f'Modell-Artefakt {version} gespeichert unter {options["output"]}'))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_id', models.CharField(max_length=50, unique=True)),
+                ('label', models.IntegerField()),
+                ('recommended_cuisine', models.CharField(max_length=100)),
+                ('probabilities', models.JSONField()),
+                ('model_version', models.CharField(max_length=40)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
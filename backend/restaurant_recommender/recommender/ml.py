@@ -0,0 +1,329 @@
+"""
+Trainings- und Persistenzlogik für das Random-Forest-Empfehlungsmodell.
+
+Das Modell wird nicht mehr beim Import von recommender.py trainiert, sondern einmalig
+über ``python manage.py train_recommender`` erzeugt und als versioniertes Artefakt
+(inklusive Metriken und Feature-Schema) abgelegt. Der Webprozess lädt dieses Artefakt
+nur noch beim Start.
+"""
+
+import datetime
+import json
+import os
+
+import joblib
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, ndcg_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import label_binarize
+
+from .rank_matrix import aggregate_pairs
+
+# Standard-Vokabular (alle in Kleinbuchstaben), falls keine Restaurantdaten vorliegen; trainierte Modelle
+# bringen ihr Vokabular im Artefakt mit (siehe vocabulary.py)
+CUISINES = ["italian", "chinese", "mexican", "indian", "japanese", "french", "mediterranean", "thai"]
+NUM_CUISINES = len(CUISINES)
+
+# Wir definieren einen maximalen Sequenz-Länge (Anzahl Positionen, die ein Nutzer angeben kann)
+MAX_SEQ_LENGTH = 5
+# Default-Wert, wenn eine Küche von keinem Nutzer genannt wurde
+DEFAULT_RANK = MAX_SEQ_LENGTH + 1  # z.B. 6
+p = 2  # Exponent für Frequency-Gewichtung
+# Gruppengröße der synthetischen Trainingsgruppen
+MIN_GROUP_SIZE = 2
+MAX_GROUP_SIZE = 5
+# Anzahl Gruppen pro Zufallsgenerator des synthetischen Generators (bestimmt die Daten eines Seeds;
+# eine Änderung ändert alle synthetischen Datensätze)
+SYNTH_SEED_BLOCK_SIZE = 65536
+# Standardgröße der Blöcke, die iter_synthetic_group_batches liefert (ohne Einfluss auf die Daten)
+SYNTH_BLOCK_SIZE = 65536
+# Bis zu dieser Vokabulargröße werden Favoriten über einen Zufallsschlüssel pro Küche gezogen
+# (bisheriges Verfahren, reproduzierbar); darüber per Verwerfungsmethode ohne (Gruppen × Küchen)-Arrays.
+DENSE_SAMPLING_MAX_CUISINES = 64
+
+# Version des Artefakt-Formats; wird erhöht, wenn sich der Aufbau des gespeicherten Dicts ändert.
+ARTIFACT_FORMAT = 1
+# Standardablage des trainierten Modells (innerhalb des recommender-Ordners)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts')
+MODEL_PATH = os.path.join(MODEL_DIR, 'rf_model.joblib')
+
+
+##############################################
+# Synthetische Gruppendaten
+##############################################
+
+def _sample_distinct(rng, shape, num_cuisines):
+    """
+    Zieht pro Nutzer MAX_SEQ_LENGTH verschiedene Küchen-Indizes in zufälliger Reihenfolge, ohne wie beim
+    Zufallsschlüssel-Verfahren einen Wert pro Küche zu erzeugen. Zeilen mit Doppelten werden neu gezogen
+    (Verwerfungsmethode); bei großem Vokabular ist das selten.
+    """
+    picked = rng.integers(0, num_cuisines, size=(*shape, MAX_SEQ_LENGTH))
+    redraw = np.ones(shape, dtype=bool)
+    while True:
+        ordered = np.sort(picked[redraw], axis=-1)
+        duplicates = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not duplicates.any():
+            return picked
+        rows = tuple(index[duplicates] for index in np.nonzero(redraw))
+        picked[rows] = rng.integers(0, num_cuisines, size=(len(rows[0]), MAX_SEQ_LENGTH))
+        redraw = np.zeros(shape, dtype=bool)
+        redraw[rows] = True
+
+
+def _synthetic_favorites_block(random_state, block_index, num_groups, num_cuisines=NUM_CUISINES):
+    """
+    Erzeugt die Favoritenlisten eines Blocks synthetischer Gruppen als Integer-Arrays.
+    Jeder Block hat einen eigenen, aus (random_state, block_index) abgeleiteten Generator,
+    sodass das Ergebnis nicht davon abhängt, wie viele Blöcke zuvor erzeugt wurden.
+    Liefert:
+      - favorites: (num_groups, MAX_GROUP_SIZE, MAX_SEQ_LENGTH) int16 mit Küchen-Indizes in Rangfolge, -1 = leer
+      - num_users: (num_groups,) Anzahl Nutzer pro Gruppe
+    """
+    rng = np.random.Generator(np.random.PCG64(np.random.SeedSequence(random_state, spawn_key=(block_index,))))
+    num_users = rng.integers(MIN_GROUP_SIZE, MAX_GROUP_SIZE + 1, size=num_groups)
+    seq_len = rng.integers(1, MAX_SEQ_LENGTH + 1, size=(num_groups, MAX_GROUP_SIZE))
+    if num_cuisines <= DENSE_SAMPLING_MAX_CUISINES:
+        # Ziehen ohne Zurücklegen: Die Küchen mit den kleinsten Zufallsschlüsseln bilden (sortiert) die Favoritenliste.
+        keys = rng.random((num_groups, MAX_GROUP_SIZE, num_cuisines))
+        if num_cuisines > MAX_SEQ_LENGTH:
+            picked = np.argpartition(keys, MAX_SEQ_LENGTH - 1, axis=2)[:, :, :MAX_SEQ_LENGTH]
+            order = np.argsort(np.take_along_axis(keys, picked, axis=2), axis=2)
+            picked = np.take_along_axis(picked, order, axis=2)
+        else:
+            picked = np.argsort(keys, axis=2)[:, :, :MAX_SEQ_LENGTH]
+    else:
+        picked = _sample_distinct(rng, (num_groups, MAX_GROUP_SIZE), num_cuisines)
+    valid = (np.arange(MAX_GROUP_SIZE) < num_users[:, None])[:, :, None] & \
+            (np.arange(picked.shape[2]) < seq_len[:, :, None])
+    favorites = np.where(valid, picked, -1).astype(np.int16)
+    return favorites, num_users
+
+
+def group_scores_from_favorites(favorites, num_users, p=p, num_cuisines=NUM_CUISINES):
+    """
+    Berechnet für alle Gruppen gleichzeitig den Feature-Vektor (gewichteter Score pro Küche) und das Label.
+    Für jede Küche: avg_rank (1-basiert) und frequency über alle Mitglieder; dann
+        score = avg_rank * ((total_users / frequency) ** p), bzw. DEFAULT_RANK bei frequency = 0.
+    Das Label ist der Index der Küche mit minimalem Score.
+    """
+    num_groups = favorites.shape[0]
+    valid = favorites >= 0
+    positions = np.broadcast_to(np.arange(1, favorites.shape[2] + 1), favorites.shape)[valid]
+    group_index = np.broadcast_to(np.arange(num_groups)[:, None, None], favorites.shape)[valid]
+    rows, columns, rank_sum, frequency = aggregate_pairs(group_index, favorites[valid], positions, num_groups, num_cuisines)
+    score = (rank_sum / frequency) * ((num_users[rows] / frequency) ** p)
+    X = np.full((num_groups, num_cuisines), float(DEFAULT_RANK))
+    X[rows, columns] = score
+    y = np.argmin(X, axis=1)
+    return X, y
+
+
+def _iter_synthetic_favorites(num_groups, random_state, num_cuisines, block_size):
+    """
+    Favoritenlisten (favorites, num_users) in Blöcken zu block_size Gruppen (der letzte ggf. kleiner).
+    Erzeugt werden sie in Seed-Blöcken zu SYNTH_SEED_BLOCK_SIZE Gruppen, die je nach block_size zerteilt
+    oder zusammengesetzt werden; die Daten hängen daher nur von num_groups und random_state ab.
+    """
+    if block_size < 1:
+        raise ValueError('block_size muss positiv sein')
+    rest = None
+    for block_index, start in enumerate(range(0, num_groups, SYNTH_SEED_BLOCK_SIZE)):
+        favorites, num_users = _synthetic_favorites_block(
+            random_state, block_index, min(SYNTH_SEED_BLOCK_SIZE, num_groups - start), num_cuisines)
+        if rest is not None:
+            favorites, num_users = np.concatenate([rest[0], favorites]), np.concatenate([rest[1], num_users])
+        complete = len(num_users) - len(num_users) % block_size
+        for offset in range(0, complete, block_size):
+            yield favorites[offset:offset + block_size], num_users[offset:offset + block_size]
+        rest = (favorites[complete:], num_users[complete:])
+    if rest is not None and len(rest[1]):
+        yield rest
+
+
+def generate_synthetic_favorites(num_groups=1000, random_state=42, num_cuisines=NUM_CUISINES):
+    """
+    Favoritenlisten aller synthetischen Gruppen (unabhängig von p), blockweise wie in iter_synthetic_group_batches erzeugt.
+    group_scores_from_favorites(favorites, num_users, p) liefert daraus für jedes p denselben Datensatz wie
+    generate_synthetic_group_data_weighted.
+    """
+    blocks = list(_iter_synthetic_favorites(num_groups, random_state, num_cuisines, SYNTH_SEED_BLOCK_SIZE))
+    if not blocks:
+        return np.empty((0, MAX_GROUP_SIZE, MAX_SEQ_LENGTH), dtype=np.int16), np.empty(0, dtype=np.int64)
+    return np.concatenate([favorites for favorites, _ in blocks]), np.concatenate([num_users for _, num_users in blocks])
+
+
+def iter_synthetic_group_batches(num_groups=1000, random_state=42, p=p, num_cuisines=NUM_CUISINES,
+                                 block_size=SYNTH_BLOCK_SIZE):
+    """
+    Liefert die synthetischen Gruppendaten blockweise als (X, y) mit höchstens block_size Zeilen.
+    Damit lassen sich Datensätze erzeugen, die nicht vollständig in den Arbeitsspeicher passen.
+    Aneinandergehängt ergeben die Blöcke für jedes block_size denselben Datensatz.
+    """
+    for favorites, num_users in _iter_synthetic_favorites(num_groups, random_state, num_cuisines, block_size):
+        yield group_scores_from_favorites(favorites, num_users, p=p, num_cuisines=num_cuisines)
+
+
+def generate_synthetic_group_data_weighted(num_groups=1000, random_state=42, p=2, num_cuisines=NUM_CUISINES):
+    """
+    Generiere synthetische Gruppendaten, die denselben Feature-Transformationsprozess verwenden wie im Endpunkt.
+    Für jede Gruppe:
+      - Simuliere 2 bis 5 Nutzer, denen zufällig eine geordnete Favoritenliste von Küchen zugewiesen wird.
+      - Für jede Küche wird der Durchschnitt der Rangpositionen berechnet (1-basierend); falls nicht genannt, DEFAULT_RANK.
+      - Der gewichtete Score für eine Küche wird berechnet als:
+            score = avg_rank * ((total_users / frequency) ** p)
+        (Falls frequency=0, wird DEFAULT_RANK genutzt.)
+      - Das Label ist der Index (0-basiert) der Küche mit dem minimalen Score.
+    Alle Gruppen eines Blocks werden mit Array-Operationen erzeugt; bei gleichem random_state ist das Ergebnis identisch.
+    """
+    batches = list(iter_synthetic_group_batches(num_groups=num_groups, random_state=random_state, p=p,
+                                                num_cuisines=num_cuisines))
+    if not batches:
+        return np.empty((0, num_cuisines)), np.empty(0, dtype=np.int64)
+    X = np.concatenate([X_batch for X_batch, _ in batches])
+    y = np.concatenate([y_batch for _, y_batch in batches])
+    return X, y
+
+
+def write_synthetic_group_data(X_path, y_path, num_groups, random_state=42, p=p, num_cuisines=NUM_CUISINES,
+                               block_size=SYNTH_BLOCK_SIZE):
+    """
+    Schreibt synthetische Gruppendaten blockweise in .npy-Dateien (per memmap), ohne den
+    gesamten Datensatz im Arbeitsspeicher zu halten. Die Dateien lassen sich mit
+    np.load(..., mmap_mode='r') wieder einblenden.
+    """
+    X_out = np.lib.format.open_memmap(X_path, mode='w+', dtype=np.float64, shape=(num_groups, num_cuisines))
+    y_out = np.lib.format.open_memmap(y_path, mode='w+', dtype=np.int64, shape=(num_groups,))
+    start = 0
+    for X_batch, y_batch in iter_synthetic_group_batches(num_groups=num_groups, random_state=random_state, p=p,
+                                                         num_cuisines=num_cuisines, block_size=block_size):
+        X_out[start:start + len(y_batch)] = X_batch
+        y_out[start:start + len(y_batch)] = y_batch
+        start += len(y_batch)
+    X_out.flush()
+    y_out.flush()
+    del X_out, y_out
+
+
+##############################################
+# Training und Evaluation
+##############################################
+
+def compute_model_metrics(model, X_test, y_test):
+    """
+    Berechnet Accuracy, Precision, Recall, F1 (jeweils macro) und NDCG des Modells auf dem Testset.
+    Liefert ein JSON-serialisierbares Dict.
+    """
+    y_pred = model.predict(X_test)
+    # Für NDCG: Binarisiere Labels (eine Spalte pro Küche des Vokabulars)
+    y_test_bin = label_binarize(y_test, classes=range(X_test.shape[1]))
+    # Küchen, die im Training nie als Label vorkamen, erhalten Wahrscheinlichkeit 0
+    probabilities = np.zeros(y_test_bin.shape)
+    probabilities[:, model.classes_.astype(int)] = model.predict_proba(X_test)
+    return {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, average='macro', zero_division=0)),
+        'recall': float(recall_score(y_test, y_pred, average='macro', zero_division=0)),
+        'f1': float(f1_score(y_test, y_pred, average='macro', zero_division=0)),
+        'ndcg': float(ndcg_score(y_test_bin, probabilities)),
+        'test_size': int(len(y_test)),
+    }
+
+
+def fit_model(X, y, n_estimators=100, max_depth=None, random_state=42):
+    """
+    Trainiert den Random Forest auf einem Trainingssplit von (X, y) und evaluiert ihn auf dem Testsplit.
+    Liefert (model, metrics, X_test, y_test).
+    """
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=random_state)
+    model.fit(X_train, y_train)
+    metrics = compute_model_metrics(model, X_test, y_test)
+    return model, metrics, X_test, y_test
+
+
+def is_at_least_as_good(candidate_metrics, current_metrics, keys=('accuracy', 'ndcg')):
+    """True, wenn das Kandidatenmodell in allen genannten Metriken mindestens so gut ist wie das aktuelle."""
+    return all(candidate_metrics[key] >= current_metrics[key] for key in keys)
+
+
+def train_model(num_groups=1000, n_estimators=100, random_state=42, cuisines=CUISINES):
+    """
+    Generiert synthetische Trainingsdaten für das Küchen-Vokabular cuisines, trainiert den Random Forest
+    und evaluiert ihn auf einem Testsplit. Liefert (model, metrics, X_test, y_test).
+    """
+    X_synth, y_synth = generate_synthetic_group_data_weighted(num_groups=num_groups, random_state=random_state, p=p,
+                                                              num_cuisines=len(cuisines))
+    return fit_model(X_synth, y_synth, n_estimators=n_estimators, random_state=random_state)
+
+
+##############################################
+# Persistenz des Modell-Artefakts
+##############################################
+
+def feature_schema(cuisines=CUISINES):
+    """
+    Beschreibt die Feature-Konstruktion, mit der ein Modell trainiert wurde. Das Küchen-Vokabular
+    (eine Feature-Spalte und ein Label pro Küche, in dieser Reihenfolge) ist Teil des Schemas.
+    """
+    return {'cuisines': list(cuisines), 'max_seq_length': MAX_SEQ_LENGTH, 'p': p}
+
+
+def save_model_artifact(model, metrics, X_test, y_test, path=MODEL_PATH, training_params=None, cuisines=CUISINES):
+    """
+    Speichert Modell, Metriken, Feature-Schema (inklusive Küchen-Vokabular) und Testset als versioniertes Artefakt.
+    Das Artefakt wird unkomprimiert geschrieben, damit die numpy-Arrays beim Laden per mmap
+    eingeblendet werden können. Neben der .joblib-Datei wird eine lesbare .json-Datei mit den
+    Metadaten abgelegt. Liefert die Version des Artefakts.
+    """
+    if len(cuisines) != model.n_features_in_:
+        raise ValueError(f'Vokabular mit {len(cuisines)} Küchen passt nicht zum Modell ({model.n_features_in_} Features)')
+    version = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    artifact = {
+        'format': ARTIFACT_FORMAT,
+        'version': version,
+        'schema': feature_schema(cuisines),
+        'metrics': metrics,
+        'training_params': training_params or {},
+        'model': model,
+        'X_test': np.ascontiguousarray(X_test),
+        'y_test': np.ascontiguousarray(y_test),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Erst in eine temporäre Datei schreiben und dann umbenennen, damit laufende Worker
+    # niemals ein halb geschriebenes Artefakt laden.
+    tmp_path = path + '.tmp'
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+
+    metadata = {key: artifact[key] for key in ('format', 'version', 'schema', 'metrics', 'training_params')}
+    with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as jsonfile:
+        json.dump(metadata, jsonfile, indent=2)
+    return version
+
+
+def load_model_artifact(path=MODEL_PATH, mmap=True):
+    """
+    Lädt ein gespeichertes Modell-Artefakt (numpy-Arrays nach Möglichkeit per mmap).
+    Wirft ImproperlyConfigured, wenn Format oder Feature-Schema nicht zum aktuellen Code passen;
+    das Küchen-Vokabular kommt aus dem Artefakt (schema['cuisines']) und muss zur Feature-Anzahl des Modells passen.
+    """
+    artifact = joblib.load(path, mmap_mode='r' if mmap else None)
+    if not isinstance(artifact, dict) or artifact.get('format') != ARTIFACT_FORMAT:
+        raise ImproperlyConfigured(
+            f'Modell-Artefakt {path} hat ein unbekanntes Format. '
+            'Bitte mit "python manage.py train_recommender" neu trainieren.'
+        )
+    schema = artifact.get('schema') or {}
+    cuisines = schema.get('cuisines')
+    expected = {key: value for key, value in feature_schema().items() if key != 'cuisines'}
+    if ({key: schema.get(key) for key in expected} != expected or not isinstance(cuisines, list)
+            or len(cuisines) != getattr(artifact.get('model'), 'n_features_in_', None)):
+        raise ImproperlyConfigured(
+            f'Feature-Schema des Modell-Artefakts {path} passt nicht zum Code '
+            f'(Artefakt: {artifact.get("schema")}, erwartet: {expected} und ein Küchen-Vokabular pro Feature). '
+            'Bitte mit "python manage.py train_recommender" neu trainieren.'
+        )
+    return artifact
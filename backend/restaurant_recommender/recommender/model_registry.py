@@ -0,0 +1,160 @@
+"""
+Registry für das ausgelieferte Empfehlungsmodell mit Hot-Swap.
+
+Statt eines beim Import gebauten Modul-Globals hält die ModelRegistry eine Referenz auf ein
+unveränderliches ServingModel (Artefakt-Metadaten, sklearn-Modell, FlatForest-Engine). Ein
+Request liest diese Referenz einmal und arbeitet bis zum Ende mit demselben Modell; ein Wechsel
+ersetzt nur die Referenz und blockiert laufende Requests nicht.
+
+Ein Hintergrund-Thread beobachtet das Artefakt (mtime/Größe). Schreibt train_recommender oder
+retrain_recommender ein neues Artefakt, lädt jeder Worker-Prozess es selbstständig nach.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+
+from .forest_engine import FlatForest
+from .ml import CUISINES, load_model_artifact, train_model
+
+
+def artifact_stat(path):
+    """(mtime_ns, Größe) des Artefakts oder None, falls es (noch) nicht existiert."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ServingModel:
+    """Ein geladenes Modell samt Metadaten; wird nach dem Erzeugen nicht mehr verändert."""
+
+    def __init__(self, artifact, file_stat=None):
+        self.version = artifact['version']
+        self.metrics = artifact['metrics']
+        self.training_params = artifact.get('training_params', {})
+        self.model = artifact['model']
+        # Küchen-Vokabular des Modells: Feature-Spalten und Labels in dieser Reihenfolge
+        self.cuisines = list(artifact.get('schema', {}).get('cuisines', CUISINES))
+        # Flache NumPy-Darstellung des Forests für die Inferenz (bitidentisch zu model.predict_proba)
+        self.engine = FlatForest.from_sklearn(self.model)
+        self.file_stat = file_stat
+        self.loaded_at = time.time()
+
+    def predict(self, feature_matrix):
+        """
+        Bewertet alle Zeilen der Feature-Matrix mit einem einzigen predict_proba-Aufruf der FlatForest-Engine.
+        Liefert (labels, probabilities): das vorhergesagte Küchen-Label pro Zeile (wie model.predict)
+        und eine (N × Küchen)-Matrix der Wahrscheinlichkeiten aller Küchen in der Reihenfolge von self.cuisines.
+        """
+        class_probabilities = self.engine.predict_proba(feature_matrix)
+        probabilities = np.zeros((class_probabilities.shape[0], len(self.cuisines)))
+        # Küchen, die im Training nie als Label vorkamen, behalten Wahrscheinlichkeit 0
+        probabilities[:, self.engine.classes_.astype(int)] = class_probabilities
+        labels = self.engine.classes_[np.argmax(class_probabilities, axis=1)].astype(int)
+        return labels, probabilities
+
+
+class ModelRegistry:
+    """Hält das aktuelle ServingModel und tauscht es atomar aus, sobald sich das Artefakt ändert."""
+
+    def __init__(self, path, reload_interval=5.0, train_on_start=False):
+        self.path = path
+        self.reload_interval = reload_interval
+        # Fehlt das Artefakt, beim Start trainieren statt abzubrechen (nur für die Entwicklung)
+        self.train_on_start = train_on_start
+        self._lock = threading.Lock()
+        self._current = None
+        self._watcher = None
+        # Metriken
+        self._swaps = 0
+        self._reload_errors = 0
+        self._last_error = None
+        self._failed_stat = None
+
+    def load(self):
+        """
+        Lädt das mit "python manage.py train_recommender" erzeugte Modell-Artefakt.
+        Passt das Feature-Schema des Artefakts nicht zum Code, bricht der Start mit ImproperlyConfigured ab.
+        Existiert noch kein Artefakt, ebenfalls; nur mit train_on_start wird (wie früher) beim Start trainiert –
+        in jedem Worker-Prozess, daher nur für die Entwicklung gedacht.
+        """
+        stat = artifact_stat(self.path)
+        if stat is not None:
+            serving_model = ServingModel(load_model_artifact(self.path), file_stat=stat)
+            print("Random Forest Modell {} geladen aus {}".format(serving_model.version, self.path))
+        elif not self.train_on_start:
+            raise ImproperlyConfigured(
+                "Kein Modell-Artefakt unter {} gefunden. Bitte zuerst 'python manage.py train_recommender' "
+                "ausführen (oder RECOMMENDER_TRAIN_ON_START für die Entwicklung setzen).".format(self.path))
+        else:
+            print("WARNUNG: Kein Modell-Artefakt unter {} gefunden. Trainiere beim Start; "
+                  "bitte 'python manage.py train_recommender' ausführen.".format(self.path))
+            model, metrics, _, _ = train_model()
+            serving_model = ServingModel({'version': 'untrained', 'metrics': metrics, 'model': model})
+        metrics = serving_model.metrics
+        print("Accuracy: {:.4f}, Precision: {:.4f}, Recall: {:.4f}, F1 Score: {:.4f}, NDCG: {:.4f}".format(
+            metrics['accuracy'], metrics['precision'], metrics['recall'], metrics['f1'], metrics['ndcg']))
+        self.swap(serving_model)
+        return serving_model
+
+    @property
+    def current(self):
+        """Das aktuell ausgelieferte ServingModel. Pro Request einmal lesen und dann weiterverwenden."""
+        if self._watcher is None:
+            self._start_watcher()
+        return self._current
+
+    def swap(self, serving_model):
+        """Ersetzt das ausgelieferte Modell. Laufende Requests behalten ihre Referenz auf das alte Modell."""
+        with self._lock:
+            previous = self._current
+            self._current = serving_model
+            if previous is not None:
+                self._swaps += 1
+
+    def _start_watcher(self):
+        with self._lock:
+            if self._watcher is None and self.reload_interval:
+                self._watcher = threading.Thread(target=self._watch, name='recommender-model-watcher', daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """Lädt das Artefakt neu, wenn es sich seit dem letzten Laden geändert hat. Liefert True bei einem Wechsel."""
+        stat = artifact_stat(self.path)
+        if stat is None or stat == self._current.file_stat or stat == self._failed_stat:
+            return False
+        try:
+            serving_model = ServingModel(load_model_artifact(self.path), file_stat=stat)
+        except Exception as e:  # Fehlerhaftes Artefakt: altes Modell weiter ausliefern
+            with self._lock:
+                self._failed_stat = stat
+                self._reload_errors += 1
+                self._last_error = str(e)
+            print("WARNUNG: Modell-Artefakt {} konnte nicht geladen werden: {}".format(self.path, e))
+            return False
+        self.swap(serving_model)
+        print("Random Forest Modell {} aus {} übernommen".format(serving_model.version, self.path))
+        return True
+
+    def stats(self):
+        """Metriken für den serving_metrics-Endpoint."""
+        serving_model = self._current
+        with self._lock:
+            return {
+                'version': serving_model.version if serving_model else None,
+                'loaded_at': serving_model.loaded_at if serving_model else None,
+                'swaps': self._swaps,
+                'reload_errors': self._reload_errors,
+                'last_error': self._last_error,
+                'reload_interval_s': self.reload_interval,
+            }
@@ -10,4 +10,21 @@ class RestaurantData(models.Model):
     timestamp = models.DateTimeField()
 
     def __str__(self):
-        return f"User {self.user_id} - {self.cuisine}"
\ No newline at end of file
+        return f"User {self.user_id} - {self.cuisine}"
+
+class PrecomputedRecommendation(models.Model):
+    """
+    Vorberechnete Empfehlung einer Gruppe (python manage.py precompute_recommendations).
+    Gültig, solange model_version dem ausgelieferten Modell und fingerprint den aktuellen Favoriten der
+    Mitglieder entspricht (siehe precompute.PrecomputedStore).
+    """
+    group_id = models.CharField(max_length=50, unique=True)
+    label = models.IntegerField()
+    recommended_cuisine = models.CharField(max_length=100)
+    probabilities = models.JSONField()  # Wahrscheinlichkeit pro Küche im Vokabular des Modells
+    model_version = models.CharField(max_length=40)
+    fingerprint = models.CharField(max_length=64)  # SHA-256 der Mitglieder-Favoriten (CuisineRankMatrix.fingerprints)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Gruppe {self.group_id} - {self.recommended_cuisine}"
@@ -0,0 +1,125 @@
+"""
+Vorberechnete Empfehlungen für alle Gruppen (python manage.py precompute_recommendations).
+
+Gruppen werden viel häufiger geöffnet, als sich Mitgliedschaften oder Favoriten ändern. Der
+nächtliche Job bewertet deshalb alle Gruppen aus groups.csv mit einem Process-Pool und schreibt
+die Ergebnisse in die Tabelle PrecomputedRecommendation, zusammen mit der Modellversion und dem
+Fingerabdruck der Mitglieder-Favoriten jeder Gruppe (CuisineRankMatrix.fingerprints, wie im result_cache).
+recommend/ liefert einen Eintrag nur aus, solange beides zur Gruppe passt, und rechnet sonst live. Andere
+Schreibvorgänge (Registrierung, andere Gruppen, Verdichtung) machen die Einträge daher nicht ungültig.
+"""
+
+import logging
+import threading
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, connection
+
+from .features import group_feature_matrix, group_fingerprints
+from .ml import load_model_artifact
+from .model_registry import ServingModel
+from .models import PrecomputedRecommendation
+
+logger = logging.getLogger(__name__)
+
+
+##############################################
+# Berechnung im Process-Pool
+##############################################
+
+# ServingModel pro Worker-Prozess (siehe init_worker)
+_serving_model = None
+
+
+def init_worker(model_path):
+    """Initializer für den Process-Pool: lädt das Modell-Artefakt einmal pro Worker (memory-mapped)."""
+    global _serving_model
+    _serving_model = ServingModel(load_model_artifact(model_path))
+
+
+def recommend_chunk(groups):
+    """
+    Bewertet einen Teil der Gruppen ([(group_id, members), ...]) mit einem Modellaufruf.
+    Liefert [(group_id, fingerprint, label, recommended_cuisine, probabilities), ...].
+    """
+    member_lists = [members for _, members in groups]
+    # Fingerabdruck vor den Features: Ändern sich Favoriten dazwischen, passt der Eintrag nicht und wird nicht ausgeliefert
+    fingerprints = group_fingerprints(member_lists)
+    feature_matrix = group_feature_matrix(member_lists, _serving_model.cuisines)
+    labels, probabilities = _serving_model.predict(feature_matrix)
+    return [
+        (group_id, fingerprint, int(label), _serving_model.cuisines[label], row_probabilities.tolist())
+        for (group_id, _), fingerprint, label, row_probabilities in zip(groups, fingerprints, labels, probabilities)
+    ]
+
+
+##############################################
+# Auslieferung
+##############################################
+
+def table_exists():
+    """Ob die Tabelle von PrecomputedRecommendation angelegt ist (Migration ausgeführt)."""
+    try:
+        return PrecomputedRecommendation._meta.db_table in connection.introspection.table_names()
+    except DatabaseError:
+        return False
+
+
+class PrecomputedStore:
+    """Liest gültige Einträge aus PrecomputedRecommendation und zählt Treffer und Fehlschläge."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._enabled = None  # None: noch nicht geprüft, ob die Tabelle existiert
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    async def _check_enabled(self):
+        """Prüft einmal pro Prozess, ob die Tabelle existiert; sonst bleibt der Lookup abgeschaltet."""
+        if self._enabled is None:
+            enabled = await sync_to_async(table_exists)()
+            if not enabled:
+                logger.warning('Tabelle %s fehlt (migrate nicht ausgeführt); vorberechnete Empfehlungen sind '
+                               'bis zum Neustart abgeschaltet', PrecomputedRecommendation._meta.db_table)
+            self._enabled = enabled
+        return self._enabled
+
+    async def aget(self, group_id, model_version, fingerprint):
+        """
+        (label, probabilities) der vorberechneten Empfehlung, wenn für group_id ein Eintrag mit model_version
+        und dem aktuellen Fingerabdruck der Mitglieder-Favoriten existiert; sonst None. Fehlt die Tabelle
+        (Migration nicht ausgeführt), ebenfalls None, ohne weitere Datenbankabfragen.
+        """
+        if not await self._check_enabled():
+            return None
+        try:
+            row = await PrecomputedRecommendation.objects.filter(
+                group_id=str(group_id), model_version=model_version, fingerprint=fingerprint
+            ).only('label', 'probabilities').afirst()
+        except DatabaseError:
+            with self._lock:
+                self._errors += 1
+            return None
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return row.label, np.asarray(row.probabilities)
+
+    def stats(self):
+        """Metriken für den serving_metrics-Endpoint."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': bool(self._enabled),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'errors': self._errors,
+            }
+
+
+precomputed_recommendations = PrecomputedStore()
@@ -0,0 +1,290 @@
+"""
+Kompakte In-Memory-Darstellung der Lieblingsküchen aller Nutzer.
+
+Statt für jede Empfehlung die komplette users.csv zu lesen und die Favoriten-Strings
+jedes Nutzers neu zu zerlegen, hält CuisineRankMatrix:
+  - einen Index Nutzer-Schlüssel (Spalte key_field oder Funktion Zeile -> Schlüssel) -> Zeile und
+  - eine dünn besetzte Rangmatrix (CSR-ähnlich): pro Nutzer ein Abschnitt aus Küchen-IDs und
+    Rängen (1-basiert) der genannten Küchen. Nicht genannte Küchen belegen keinen Speicher.
+
+Küchen-IDs werden beim Einlesen vergeben und sind unabhängig vom Vokabular eines Modells;
+rank_stats bildet sie erst bei der Abfrage auf die Spalten des übergebenen Vokabulars ab.
+Damit gilt dieselbe Matrix für jedes geladene Modell, und der Aufwand hängt von der Zahl
+genannter Küchen ab, nicht von der Größe des Vokabulars. Gelesen wird die users.csv samt Änderungs-Log
+(accounts.log_table). Das Modul ist bewusst unabhängig von Django.
+"""
+
+import hashlib
+import threading
+
+import numpy as np
+
+from accounts.log_table import LogTable, table_version
+
+# Größter Rang, der in int16 gespeichert werden kann
+MAX_STORED_RANK = 32767
+# Anzahl Vokabulare, deren Spalten-Abbildung zwischengespeichert wird (aktuelles und vorheriges Modell)
+MAX_COLUMN_MAPS = 4
+
+
+def parse_favorites(favorite_cuisines):
+    """Zerlegt den kommaseparierten favorite_cuisines-String in eine kleingeschriebene Liste."""
+    if not favorite_cuisines:
+        return []
+    return [x.strip().lower() for x in favorite_cuisines.split(',') if x.strip()]
+
+
+def aggregate_pairs(rows, columns, ranks, num_rows, num_columns):
+    """
+    Rangsumme und Häufigkeit pro (Zeile, Spalte)-Paar aus den Einzelnennungen (rows[i], columns[i], ranks[i]).
+    Liefert (rows, columns, rank_sum, frequency) nur für genannte Paare, zeilenweise sortiert.
+    Bei dicht belegten Matrizen wird über alle Zellen gezählt, sonst nur über die genannten Paare sortiert.
+    """
+    flat_index = np.asarray(rows, dtype=np.int64) * num_columns + columns
+    if num_rows * num_columns <= 8 * len(flat_index):
+        rank_sum = np.bincount(flat_index, weights=ranks, minlength=num_rows * num_columns)
+        frequency = np.bincount(flat_index, minlength=num_rows * num_columns)
+        pairs = np.flatnonzero(frequency)
+        rank_sum, frequency = rank_sum[pairs], frequency[pairs]
+    else:
+        pairs, pair_index = np.unique(flat_index, return_inverse=True)
+        rank_sum = np.bincount(pair_index, weights=ranks, minlength=len(pairs))
+        frequency = np.bincount(pair_index, minlength=len(pairs))
+    pair_rows, pair_columns = np.divmod(pairs, num_columns)
+    return pair_rows, pair_columns, rank_sum, frequency
+
+
+class CuisineRankMatrix:
+    """
+    Nutzer-Schlüssel (Spalte oder Funktion key_field, wie key bei LogTable) -> Zeilenindex plus dünn besetzte Rangmatrix (Nutzer × Küchen)
+    aus der users.csv.
+
+    Die Matrix wird beim ersten Zugriff geladen und danach über update_user inkrementell gepflegt. Ändern sich
+    Datei oder Log auf anderem Weg (table_version), wird sie beim nächsten Zugriff neu eingelesen.
+    """
+
+    def __init__(self, csv_path, key_field='username'):
+        self.csv_path = csv_path
+        self.key_field = key_field
+        self._key = key_field if callable(key_field) else (lambda row: row.get(key_field) or '')
+        self._lock = threading.Lock()
+        self._index = {}
+        # Küchen-Name <-> ID (nur wachsend, damit gespeicherte IDs gültig bleiben)
+        self._cuisine_ids = {}
+        self._cuisine_names = []
+        # Abschnitt jedes Nutzers in _entry_cuisines/_entry_ranks; update_user hängt einen neuen Abschnitt an
+        self._row_start = np.zeros(0, dtype=np.int64)
+        self._row_length = np.zeros(0, dtype=np.int64)
+        self._entry_cuisines = np.zeros(0, dtype=np.int32)
+        self._entry_ranks = np.zeros(0, dtype=np.int16)
+        # Kanonische Bytes der Favoriten pro Zeile (für fingerprints)
+        self._row_keys = []
+        self._column_maps = {}
+        self._file_stat = None
+        # Wird bei jeder Änderung erhöht; erlaubt abgeleiteten Caches, veraltete Einträge zu erkennen.
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Laden und Pflege
+    # ------------------------------------------------------------------
+
+    def _current_stat(self):
+        version = table_version(self.csv_path)
+        return version if any(version) else None
+
+    def _encode(self, favorite_cuisines):
+        """
+        (Küchen-IDs, Ränge, kanonische Bytes) für einen favorite_cuisines-String.
+        Mehrfachnennungen zählen mit dem ersten Rang.
+        """
+        ranks = {}
+        for pos, cuisine in enumerate(parse_favorites(favorite_cuisines), start=1):
+            ranks.setdefault(cuisine, min(pos, MAX_STORED_RANK))
+        ids = []
+        for cuisine in ranks:
+            if cuisine not in self._cuisine_ids:
+                self._cuisine_ids[cuisine] = len(self._cuisine_names)
+                self._cuisine_names.append(cuisine)
+            ids.append(self._cuisine_ids[cuisine])
+        key = '\x1f'.join(f'{cuisine}\x1e{rank}' for cuisine, rank in ranks.items()).encode('utf-8')
+        return np.array(ids, dtype=np.int32), np.array(list(ranks.values()), dtype=np.int16), key
+
+    def _load(self):
+        index = {}
+        encoded_rows = []
+        self._cuisine_ids, self._cuisine_names, self._column_maps = {}, [], {}
+        stat = self._current_stat()
+        if stat is not None:
+            for row in LogTable(self.csv_path, None, key=self._key).rows():
+                username = self._key(row)
+                encoded = self._encode(row.get('favorite_cuisines', ''))
+                if username in index:
+                    encoded_rows[index[username]] = encoded
+                else:
+                    index[username] = len(encoded_rows)
+                    encoded_rows.append(encoded)
+        lengths = np.array([len(ids) for ids, _, _ in encoded_rows], dtype=np.int64)
+        self._row_length = lengths
+        self._row_start = np.cumsum(lengths) - lengths
+        self._entry_cuisines = np.concatenate([ids for ids, _, _ in encoded_rows] or [np.zeros(0, dtype=np.int32)])
+        self._entry_ranks = np.concatenate([ranks for _, ranks, _ in encoded_rows] or [np.zeros(0, dtype=np.int16)])
+        self._row_keys = [key for _, _, key in encoded_rows]
+        self._index, self._file_stat = index, stat
+        self.version += 1
+
+    def _ensure_current(self):
+        """Muss mit gehaltenem Lock aufgerufen werden."""
+        if self._file_stat is None or self._file_stat != self._current_stat():
+            self._load()
+
+    def table_stat(self):
+        """Aktueller Stand der users.csv samt Log (für update_user direkt vor und nach dem eigenen Schreiben)."""
+        return self._current_stat()
+
+    def update_user(self, username, favorite_cuisines, stat_before=None, stat_after=None):
+        """
+        Übernimmt die neuen favorite_cuisines eines Nutzers, nachdem sie in die users.csv geschrieben wurden.
+        stat_before und stat_after sind table_stat() direkt vor und nach dem Schreiben (unter dem Lock der Tabelle).
+        Nur wenn die Matrix vorher auf dem Stand stat_before war, gilt stat_after als gelesen; sonst hat ein anderer
+        Prozess dazwischen geschrieben, und der nächste Zugriff liest die Datei neu ein.
+        """
+        with self._lock:
+            if self._file_stat is None:
+                self._load()
+                return
+            ids, ranks, key = self._encode(favorite_cuisines)
+            # Neuer Abschnitt am Ende; der alte bleibt bis zum nächsten vollständigen Laden ungenutzt liegen.
+            start = len(self._entry_cuisines)
+            self._entry_cuisines = np.concatenate([self._entry_cuisines, ids])
+            self._entry_ranks = np.concatenate([self._entry_ranks, ranks])
+            row = self._index.get(username)
+            if row is None:
+                self._index[username] = len(self._row_keys)
+                self._row_start = np.append(self._row_start, start)
+                self._row_length = np.append(self._row_length, len(ids))
+                self._row_keys.append(key)
+            else:
+                self._row_start[row] = start
+                self._row_length[row] = len(ids)
+                self._row_keys[row] = key
+            if stat_before is not None and self._file_stat == stat_before:
+                self._file_stat = stat_after
+            self.version += 1
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def _column_map(self, cuisines):
+        """Küchen-ID -> Spalte im Vokabular cuisines (-1 = nicht im Vokabular). Muss mit gehaltenem Lock aufgerufen werden."""
+        key = tuple(cuisines)
+        cached = self._column_maps.get(key)
+        if cached is not None and len(cached) == len(self._cuisine_names):
+            return cached
+        columns = {cuisine: column for column, cuisine in enumerate(cuisines)}
+        column_map = np.array([columns.get(name, -1) for name in self._cuisine_names], dtype=np.int64)
+        if key not in self._column_maps and len(self._column_maps) >= MAX_COLUMN_MAPS:
+            self._column_maps.clear()
+        self._column_maps[key] = column_map
+        return column_map
+
+    def sparse_rank_stats(self, member_lists, cuisines):
+        """
+        Rangsumme und Häufigkeit der genannten (Gruppe, Küche)-Paare für jede Mitgliederliste, mit den
+        Spalten des Vokabulars cuisines. Liefert (rows, columns, rank_sum, frequency), zeilenweise sortiert.
+        Unbekannte Nutzer und Küchen außerhalb des Vokabulars werden ignoriert, doppelte Mitglieder nur einmal gezählt.
+        """
+        with self._lock:
+            self._ensure_current()
+            rows = []
+            segments = []
+            for group_index, members in enumerate(member_lists):
+                for username in dict.fromkeys(members):
+                    row = self._index.get(username)
+                    if row is not None:
+                        rows.append(row)
+                        segments.append(group_index)
+            rows = np.asarray(rows, dtype=np.intp)
+            lengths = self._row_length[rows]
+            # Einträge aller Mitglieder einsammeln: Abschnitt [start, start + length) je Mitglied
+            offsets = np.cumsum(lengths) - lengths
+            entries = np.repeat(self._row_start[rows] - offsets, lengths) + np.arange(lengths.sum())
+            columns = self._column_map(cuisines)[self._entry_cuisines[entries]]
+            ranks = self._entry_ranks[entries]
+        groups = np.repeat(np.asarray(segments, dtype=np.intp), lengths)
+        known = columns >= 0
+        return aggregate_pairs(groups[known], columns[known], ranks[known], len(member_lists), len(cuisines))
+
+    def rank_rows(self, usernames, cuisines):
+        """
+        Dichte Rangzeilen (len(usernames) × Küchen) int16 für wenige Nutzer, z. B. einen Nutzer und seine Freunde;
+        0 bedeutet "nicht genannt" (auch für unbekannte Nutzer).
+        """
+        ranks = np.zeros((len(usernames), len(cuisines)), dtype=np.int16)
+        with self._lock:
+            self._ensure_current()
+            column_map = self._column_map(cuisines)
+            for i, username in enumerate(usernames):
+                row = self._index.get(username)
+                if row is None:
+                    continue
+                start, length = self._row_start[row], self._row_length[row]
+                columns = column_map[self._entry_cuisines[start:start + length]]
+                known = columns >= 0
+                ranks[i, columns[known]] = self._entry_ranks[start:start + length][known]
+        return ranks
+
+    def rank_stats(self, member_lists, cuisines):
+        """
+        Liefert für jede Mitgliederliste Rangsumme und Häufigkeit pro Küche des Vokabulars cuisines:
+          - rank_sum: (N, Küchen) float64, Summe der Ränge aller Mitglieder, die die Küche nennen
+          - frequency: (N, Küchen) int64, Anzahl Mitglieder, die die Küche nennen
+        Dichte Variante von sparse_rank_stats (für Auswertungen über alle Küchen).
+        """
+        rows, columns, pair_rank_sum, pair_frequency = self.sparse_rank_stats(member_lists, cuisines)
+        rank_sum = np.zeros((len(member_lists), len(cuisines)))
+        frequency = np.zeros((len(member_lists), len(cuisines)), dtype=np.int64)
+        rank_sum[rows, columns] = pair_rank_sum
+        frequency[rows, columns] = pair_frequency
+        return rank_sum, frequency
+
+    def fingerprints(self, member_lists):
+        """
+        Kanonischer Fingerabdruck (SHA-256, hex) der Favoriten jeder Mitgliederliste.
+
+        Die Favoriten der (deduplizierten, bekannten) Mitglieder werden als (Küche, Rang)-Folgen sortiert
+        und gehasht. Gruppen mit denselben Favoriten erhalten damit unabhängig von Namen und Reihenfolge
+        denselben Fingerabdruck; gleicher Fingerabdruck bedeutet gleiche Features für jedes Vokabular.
+        """
+        with self._lock:
+            self._ensure_current()
+            member_keys = [
+                sorted(self._row_keys[row] for row in
+                       (self._index.get(username) for username in dict.fromkeys(members)) if row is not None)
+                for members in member_lists
+            ]
+        digests = []
+        for keys in member_keys:
+            digest = hashlib.sha256()
+            for key in keys:
+                digest.update(len(key).to_bytes(4, 'little'))
+                digest.update(key)
+            digests.append(digest.hexdigest())
+        return digests
+
+    def nbytes(self):
+        """Speicherbedarf der Rang-Arrays in Bytes (ohne Index und Fingerabdruck-Schlüssel)."""
+        with self._lock:
+            return sum(array.nbytes for array in
+                       (self._row_start, self._row_length, self._entry_cuisines, self._entry_ranks))
+
+    def keys(self):
+        """Alle bekannten Nutzer-Schlüssel in Zeilenreihenfolge."""
+        with self._lock:
+            self._ensure_current()
+            return list(self._index)
+
+    def __contains__(self, username):
+        with self._lock:
+            self._ensure_current()
+            return username in self._index
@@ -1,43 +1,23 @@
-import csv
 import json
-import os
 import numpy as np
-import pandas as pd
-from math import log2
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, ndcg_score
-from sklearn.preprocessing import label_binarize
-from sklearn.metrics import ndcg_score
 
-# Pfad zur Gruppen-CSV (innerhalb des recommender-Ordners)
-GROUPS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'groups.csv')
-# Pfad zur User-CSV (angenommen, sie liegt in ../accounts/users.csv)
-ACCOUNTS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'accounts', 'users.csv')
+from accounts.log_table import table_version
+from accounts.user_store import user_repository
 
+from .batching import MicroBatcher
+from .features import ACCOUNTS_CSV_PATH, group_feature_matrix, group_feature_vector, group_fingerprints, user_ranks
+from .groups import GROUPS_CSV_PATH, groups_table
+from .invites import load_friends, search_invite_groups
+from .ml import MAX_GROUP_SIZE, MIN_GROUP_SIZE, MODEL_PATH
+from .model_registry import ModelRegistry
+from .precompute import precomputed_recommendations
+from .result_cache import recommendation_cache
+from .single_flight import request_coalescer
 
-# Mögliche Küchen (alle in Kleinbuchstaben)
-CUISINES = ["italian", "chinese", "mexican", "indian", "japanese", "french", "mediterranean", "thai"]
-NUM_CUISINES = len(CUISINES)
-
-# Wir definieren einen maximalen Sequenz-Länge (Anzahl Positionen, die ein Nutzer angeben kann)
-MAX_SEQ_LENGTH = 5
-# Default-Wert, wenn eine Küche von keinem Nutzer genannt wurde
-DEFAULT_RANK = MAX_SEQ_LENGTH + 1  # z.B. 6
-p = 2  # Exponent für Frequency-Gewichtung
-
-
-
-
-def initialize_groups_csv():
-    """Erstellt die Gruppen-CSV inklusive Header, falls sie noch nicht existiert."""
-    if not os.path.exists(GROUPS_CSV_PATH):
-        with open(GROUPS_CSV_PATH, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['group_id', 'group_name', 'created_by', 'members'])
-
-initialize_groups_csv()
 
 @csrf_exempt
 def create_group(request):
@@ -74,25 +54,15 @@ def create_group(request):
     # Entferne Duplikate (beibehaltung der Reihenfolge)
     members = list(dict.fromkeys(members))
     
-    # Erzeuge eine neue group_id (einfacher Auto-Inkrement-Ansatz)
+    # Erzeuge eine neue group_id (einfacher Auto-Inkrement-Ansatz, unter dem Lock der Tabelle)
     try:
-        new_group_id = 1
-        if os.path.exists(GROUPS_CSV_PATH):
-            with open(GROUPS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                group_ids = [int(row['group_id']) for row in reader if row['group_id'].isdigit()]
-                if group_ids:
-                    new_group_id = max(group_ids) + 1
-        else:
-            # Falls die Datei nicht existiert, wird sie neu erstellt.
-            with open(GROUPS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['group_id', 'group_name', 'created_by', 'members'])
-        
-        with open(GROUPS_CSV_PATH, 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
+        created_by_ref, member_refs = user_repository.ref(created_by), user_repository.refs(members)
+        with groups_table.lock:
+            group_ids = [int(key) for key in groups_table.keys() if key.isdigit()]
+            new_group_id = max(group_ids) + 1 if group_ids else 1
             # Speichere die Mitglieder als kommagetrennte Zeichenkette
-            writer.writerow([new_group_id, group_name, created_by, ",".join(members)])
+            groups_table.put({'group_id': str(new_group_id), 'group_name': group_name,
+                              'created_by': created_by_ref, 'members': ",".join(member_refs)})
         
         return JsonResponse({'success': True, 'message': 'Gruppe erstellt', 'group_id': new_group_id})
     except Exception as e:
@@ -122,12 +92,13 @@ def list_groups(request):
     
     groups = []
     try:
-        with open(GROUPS_CSV_PATH, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                members = row['members'].split(",") if row['members'] else []
-                if username in members:
-                    groups.append(row)
+        user_id = user_repository.ref(username)
+        for row in groups_table.rows():
+            members = group_members(row)
+            if user_id in members:
+                row['created_by'] = user_repository.username_for(row['created_by'])
+                row['members'] = ",".join(user_repository.usernames_for(members))
+                groups.append(row)
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der Gruppen: {str(e)}'}, status=500)
     
@@ -158,46 +129,23 @@ def leave_group(request):
     if not group_id or not username:
         return JsonResponse({'success': False, 'message': 'group_id und username sind erforderlich'}, status=400)
     
-    groups = []
-    group_found = False
     try:
-        with open(GROUPS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                groups.append(row)
-        # Suche nach der Gruppe und entferne den Nutzer aus der Mitgliederliste.
-        for row in groups:
-            if row['group_id'] == str(group_id):
-                group_found = True
-                members_list = [m.strip() for m in row['members'].split(',') if m.strip()]
-                if username not in members_list:
-                    return JsonResponse({'success': False, 'message': 'Nutzer nicht in der Gruppe gefunden'}, status=400)
-                # Entferne den Nutzer (egal ob Ersteller oder nicht)
-                members_list.remove(username)
-                row['members'] = ",".join(members_list)
-                break
-        if not group_found:
-            return JsonResponse({'success': False, 'message': 'Gruppe nicht gefunden'}, status=404)
-        
-        # Automatisches Löschen: Wenn nach dem Entfernen kein Mitglied mehr in der Gruppe ist, lösche die Gruppe.
-        new_groups = []
-        group_deleted = False
-        for row in groups:
-            if row['group_id'] == str(group_id):
-                if not row['members'].strip():
-                    group_deleted = True
-                    continue  # Gruppe nicht hinzufügen, da sie gelöscht wird.
-                else:
-                    new_groups.append(row)
+        user_id = user_repository.ref(username)
+        with groups_table.lock:
+            row = groups_table.get(str(group_id))
+            if row is None:
+                return JsonResponse({'success': False, 'message': 'Gruppe nicht gefunden'}, status=404)
+            # Entferne den Nutzer aus der Mitgliederliste (egal ob Ersteller oder nicht).
+            members_list = [m.strip() for m in row['members'].split(',') if m.strip()]
+            if user_id not in members_list:
+                return JsonResponse({'success': False, 'message': 'Nutzer nicht in der Gruppe gefunden'}, status=400)
+            members_list.remove(user_id)
+            # Automatisches Löschen: Wenn nach dem Entfernen kein Mitglied mehr in der Gruppe ist, lösche die Gruppe.
+            group_deleted = not members_list
+            if group_deleted:
+                groups_table.delete(str(group_id))
             else:
-                new_groups.append(row)
-        
-        with open(GROUPS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['group_id', 'group_name', 'created_by', 'members']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in new_groups:
-                writer.writerow(row)
+                groups_table.put(dict(row, members=",".join(members_list)))
         
         if group_deleted:
             return JsonResponse({'success': True, 'message': 'Gruppe wurde gelöscht, da kein Mitglied mehr vorhanden ist'})
@@ -229,32 +177,15 @@ def delete_group(request):
     if not group_id or not username:
         return JsonResponse({'success': False, 'message': 'group_id und username sind erforderlich'}, status=400)
     
-    groups = []
-    group_found = False
     try:
-        with open(GROUPS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                groups.append(row)
-        new_groups = []
-        for row in groups:
-            if row['group_id'] == str(group_id):
-                group_found = True
-                if row['created_by'] != username:
-                    return JsonResponse({'success': False, 'message': 'Nur der Ersteller kann die Gruppe löschen.'}, status=400)
-                # Diese Gruppe wird gelöscht (nicht in new_groups aufgenommen)
-                continue
-            else:
-                new_groups.append(row)
-        if not group_found:
-            return JsonResponse({'success': False, 'message': 'Gruppe nicht gefunden'}, status=404)
-        
-        with open(GROUPS_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['group_id', 'group_name', 'created_by', 'members']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in new_groups:
-                writer.writerow(row)
+        user_id = user_repository.ref(username)
+        with groups_table.lock:
+            row = groups_table.get(str(group_id))
+            if row is None:
+                return JsonResponse({'success': False, 'message': 'Gruppe nicht gefunden'}, status=404)
+            if row['created_by'] != user_id:
+                return JsonResponse({'success': False, 'message': 'Nur der Ersteller kann die Gruppe löschen.'}, status=400)
+            groups_table.delete(str(group_id))
         return JsonResponse({'success': True, 'message': 'Gruppe erfolgreich gelöscht'})
     except Exception as e:
         return JsonResponse({'success': False, 'message': 'Fehler beim Löschen der Gruppe: ' + str(e)}, status=500)
@@ -262,98 +193,198 @@ def delete_group(request):
 ###################################################################################  ML Modell  ############################################################################################################
 
 ##############################################
-# Synthetische Gruppendaten generieren und RF Modell trainieren
+# Trainiertes RF Modell laden
 ##############################################
 
-def generate_synthetic_group_data_weighted(num_groups=1000, random_state=42, p=2):
+# Das ausgelieferte Modell liegt in der Registry und wird ausgetauscht, sobald ein neues Artefakt
+# geschrieben wird (python manage.py retrain_recommender); Pfad und Prüfintervall über settings.
+# Ohne Artefakt wird nur mit RECOMMENDER_TRAIN_ON_START (Standard: DEBUG) beim Start trainiert.
+model_registry = ModelRegistry(
+    getattr(settings, 'RECOMMENDER_MODEL_PATH', MODEL_PATH),
+    reload_interval=getattr(settings, 'RECOMMENDER_MODEL_RELOAD_INTERVAL', 5.0),
+    train_on_start=getattr(settings, 'RECOMMENDER_TRAIN_ON_START', settings.DEBUG),
+)
+model_registry.load()
+
+##############################################
+# Gruppen laden
+##############################################
+
+# Maximale Anzahl Gruppen pro Batch-Request
+MAX_BATCH_GROUPS = 500
+# Einladungsvorschläge: Standard/Maximum für Anzahl Vorschläge und Zeitbudget, Obergrenze der Kandidaten
+DEFAULT_INVITE_SUGGESTIONS = 5
+MAX_INVITE_SUGGESTIONS = 20
+DEFAULT_INVITE_TIME_BUDGET_MS = 200
+MAX_INVITE_TIME_BUDGET_MS = 2000
+MAX_INVITE_CANDIDATES = 20000
+
+
+def load_groups_by_id(group_ids):
     """
-    Generiere synthetische Gruppendaten, die denselben Feature-Transformationsprozess verwenden wie im Endpunkt.
-    Für jede Gruppe:
-      - Simuliere 2 bis 5 Nutzer, denen zufällig eine geordnete Favoritenliste von Küchen zugewiesen wird.
-      - Für jede Küche wird der Durchschnitt der Rangpositionen berechnet (1-basierend); falls nicht genannt, DEFAULT_RANK.
-      - Der gewichtete Score für eine Küche wird berechnet als:
-            score = avg_rank * ((total_users / frequency) ** p)
-        (Falls frequency=0, wird DEFAULT_RANK genutzt.)
-      - Das Label ist der Index (0-basiert) der Küche mit dem minimalen Score.
+    Liefert {group_id (str): row} für die angefragten group_ids (Lookups im Index von groups_table, alle aus
+    demselben Snapshot).
     """
-    np.random.seed(random_state)
-    X = []  # Feature-Vektoren (8-dimensional)
-    y = []  # Labels (0 bis NUM_CUISINES-1)
-    for _ in range(num_groups):
-        num_users = np.random.randint(2, 6)
-        group_favorites = []
-        for _ in range(num_users):
-            seq_len = np.random.randint(1, MAX_SEQ_LENGTH + 1)
-            favorites = np.random.choice(CUISINES, size=seq_len, replace=False).tolist()
-            group_favorites.append(favorites)
-        # Aggregiere Favoriten: Für jede Küche sammle alle Rangpositionen (1-basierend)
-        cuisine_ranks = {cuisine: [] for cuisine in CUISINES}
-        for fav_list in group_favorites:
-            for pos, cuisine in enumerate(fav_list, start=1):
-                cuisine_ranks[cuisine].append(pos)
-        feature_vector = []
-        for cuisine in CUISINES:
-            if cuisine_ranks[cuisine]:
-                avg_rank = np.mean(cuisine_ranks[cuisine])
-                freq = len(cuisine_ranks[cuisine])
-                score = avg_rank * ((num_users / freq) ** p)
-            else:
-                score = DEFAULT_RANK
-            feature_vector.append(score)
-        X.append(feature_vector)
-        best_cuisine = CUISINES[np.argmin(feature_vector)]
-        label = CUISINES.index(best_cuisine)
-        y.append(label)
-    return np.array(X), np.array(y)
-
-# Generiere synthetische Trainingsdaten
-X_synth, y_synth = generate_synthetic_group_data_weighted(num_groups=1000, p=p)
-
-# Aufteilen in Training und Test (optional)
-from sklearn.model_selection import train_test_split
-X_train, X_test, y_train, y_test = train_test_split(X_synth, y_synth, test_size=0.2, random_state=42)
-
-# Trainiere den Random Forest
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-rf_model.fit(X_train, y_train)
-
-# Optionale Evaluation auf dem Testset
-y_pred = rf_model.predict(X_test)
-acc = accuracy_score(y_test, y_pred)
-prec = precision_score(y_test, y_pred, average='macro')
-rec = recall_score(y_test, y_pred, average='macro')
-f1 = f1_score(y_test, y_pred, average='macro')
-# Für NDCG: Binarisiere Labels
-from sklearn.preprocessing import label_binarize
-y_test_bin = label_binarize(y_test, classes=range(NUM_CUISINES))
-ndcg = ndcg_score(y_test_bin, rf_model.predict_proba(X_test))
-print("Trained Random Forest Model on Synthetic Group Data")
-print("Accuracy: {:.4f}".format(acc))
-print("Precision: {:.4f}".format(prec))
-print("Recall: {:.4f}".format(rec))
-print("F1 Score: {:.4f}".format(f1))
-print("NDCG: {:.4f}".format(ndcg))
+    snapshot = groups_table.snapshot()
+    groups = {}
+    for group_id in {str(group_id) for group_id in group_ids}:
+        row = snapshot.get(group_id)
+        if row is not None:
+            groups[group_id] = row
+    return groups
+
+
+def group_members(group):
+    """Mitgliederliste (user_ids) einer Gruppe aus der Gruppen-CSV."""
+    return group['members'].split(",") if group['members'] else []
+
+
+##############################################
+# Inferenz
+##############################################
+
+def predict_cuisines(feature_matrix, serving_model):
+    """
+    Bewertet alle Zeilen der Feature-Matrix mit dem Modell, mit dessen Vokabular sie gebaut wurden
+    (ein predict_proba-Aufruf). Liefert (labels, probabilities) wie ServingModel.predict.
+    """
+    return serving_model.predict(feature_matrix)
+
+
+# Micro-Batching der Einzel-Inferenzen (Zeitfenster und Batchgröße über settings.RECOMMENDER_BATCHING)
+_batching_settings = getattr(settings, 'RECOMMENDER_BATCHING', {})
+inference_batcher = MicroBatcher(
+    predict_cuisines,
+    max_wait=_batching_settings.get('MAX_WAIT_MS', 2) / 1000,
+    max_batch_rows=_batching_settings.get('MAX_BATCH_ROWS', 64),
+)
+
+
+def ranked_cuisines(probabilities, k, cuisines):
+    """Die k wahrscheinlichsten Küchen einer Zeile aus predict_cuisines (Vokabular cuisines), absteigend sortiert."""
+    order = np.argsort(-probabilities, kind='stable')[:k]
+    return [{'cuisine': cuisines[i], 'probability': float(probabilities[i])} for i in order]
+
+
+def parse_k(data):
+    """
+    Liest den optionalen Parameter k (Anzahl gerankter Küchen) aus dem Request.
+    Liefert None, wenn keine Rangliste angefordert wurde; wirft ValueError bei ungültigem Wert.
+    Werte größer als das Vokabular des Modells liefern alle Küchen.
+    """
+    k = data.get('k')
+    if k is None:
+        return None
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise ValueError('k muss eine positive Ganzzahl sein')
+    return k
+
 
 ##############################################
 # Recommendation Endpoint mit Random Forest
 ##############################################
 
+class RecommendationError(Exception):
+    """Fehler bei der Empfehlung einer Gruppe; wird vom View als JsonResponse mit status ausgeliefert."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def load_group_feature_vector(group_id):
+    """
+    Lädt eine Gruppe und bestimmt den Fingerabdruck ihrer Mitglieder-Favoriten.
+    Liegt für den Fingerabdruck bereits eine Empfehlung des aktuellen Modells im recommendation_cache, wird sie
+    (samt ServingModel) mitgeliefert und kein Feature-Vektor berechnet; sonst der Feature-Vektor (1 × Küchen
+    des Vokabulars von serving_model). Liefert (fingerprint, serving_model, cached, feature_vector);
+    wirft RecommendationError.
+    """
+    # Gruppe laden
+    try:
+        group = load_groups_by_id([group_id]).get(str(group_id))
+    except Exception as e:
+        raise RecommendationError(f'Fehler beim Lesen der Gruppen: {str(e)}', 500)
+    if group is None:
+        raise RecommendationError('Gruppe nicht gefunden', 404)
+    
+    members = group_members(group)
+    if not members:
+        raise RecommendationError('Keine Mitglieder in der Gruppe', 400)
+    
+    # Aggregiere Favoriten-Ränge der Gruppenmitglieder aus der Rangmatrix
+    try:
+        fingerprint = group_fingerprints([members])[0]
+        serving_model = model_registry.current
+        cached = recommendation_cache.get(serving_model.version, fingerprint)
+        if cached is not None:
+            return fingerprint, serving_model, (*cached, serving_model), None
+        return fingerprint, serving_model, None, group_feature_vector(members, serving_model.cuisines)
+    except Exception as e:
+        raise RecommendationError(f'Fehler beim Lesen der Nutzerdaten: {str(e)}', 500)
+
+
+async def compute_group_recommendation(group_id):
+    """
+    Empfehlung für eine Gruppe als (label, probabilities, serving_model) – aus dem Cache oder per (gebündelter) Inferenz.
+    Das Ergebnis wird von allen gleichzeitigen Requests für dieselbe Gruppe geteilt und darf nicht verändert werden.
+    """
+    fingerprint, serving_model, cached, feature_vector = await sync_to_async(
+        load_group_feature_vector, thread_sensitive=False)(group_id)
+    if cached is not None:
+        return cached
+    # Vorberechnete Empfehlung, solange Modell und Mitglieder-Favoriten der Gruppe unverändert sind
+    prediction = await precomputed_recommendations.aget(group_id, serving_model.version, fingerprint)
+    if prediction is not None:
+        await sync_to_async(recommendation_cache.set, thread_sensitive=False)(serving_model.version, fingerprint, prediction)
+        return (*prediction, serving_model)
+    # Vorhersage mit dem trainierten Random Forest Modell (einzige Inferenz pro Request;
+    # die Modell-Metriken werden beim Training berechnet und über model_metrics ausgeliefert).
+    # Gleichzeitige Requests werden dabei vom inference_batcher zu einem Modellaufruf gebündelt
+    # (nur Requests, deren Features mit demselben Modell und Vokabular gebaut wurden).
+    labels, probabilities = await inference_batcher.apredict(feature_vector, serving_model)
+    prediction = (int(labels[0]), probabilities[0])
+    await sync_to_async(recommendation_cache.set, thread_sensitive=False)(serving_model.version, fingerprint, prediction)
+    return (*prediction, serving_model)
+
+
+def group_data_version():
+    """Datenstand, von dem eine Gruppenempfehlung abhängt (Teil des Single-Flight-Keys)."""
+    return (table_version(GROUPS_CSV_PATH), table_version(ACCOUNTS_CSV_PATH), user_ranks.version,
+            model_registry.current.version)
+
+
 @csrf_exempt
-def recommend_for_group(request):
+async def recommend_for_group(request):
     """
     Empfehlung für eine Gruppe mithilfe eines Random Forest basierten Recommendation-ML-Modells.
     
+    Erwartet einen POST-Request mit JSON:
+    {
+        "group_id": <group_id>,
+        "k": 3  // optional: zusätzlich die k wahrscheinlichsten Küchen als "ranked_cuisines" zurückgeben
+    }
+    
     Vorgehen:
       1. Lade die Gruppe anhand der group_id aus der Gruppen-CSV.
-      2. Für jedes Gruppenmitglied: Lese die Favoritenliste (als kommaseparierte Liste) aus der Accounts-CSV.
-      3. Für jede Küche in CUISINES: Berechne den durchschnittlichen Rang (1-basierend) aus den Favoritenlisten der Gruppenmitglieder.
+      2. Für jedes Gruppenmitglied: Lese die Favoriten-Ränge aus der Rangmatrix (vorberechnet aus der Accounts-CSV).
+      3. Für jede Küche im Vokabular des Modells: Berechne den durchschnittlichen Rang (1-basierend) aus den Favoritenlisten der Gruppenmitglieder.
          Falls eine Küche nicht genannt wurde, verwende DEFAULT_RANK.
          Wende dieselbe Frequency-Gewichtung an wie im Training:
              score = (avg_rank) * ((total_users / frequency) ** p)
          Falls frequency = 0, setze score = DEFAULT_RANK.
-      4. Der resultierende 8-dimensionale Feature-Vektor wird an das Random Forest Modell übergeben,
+      4. Der resultierende Feature-Vektor (eine Spalte pro Küche) wird an das Random Forest Modell übergeben,
          das ein Label (0-basiert) vorhersagt.
       5. Dieses Label wird in den entsprechenden Küchen-Namen umgewandelt und als Empfehlung zurückgegeben.
+         Mit k werden aus demselben predict_proba-Aufruf auch die nächstbesten Küchen samt Wahrscheinlichkeit
+         geliefert, damit der Client ohne weiteren Request auf Alternativen ausweichen kann.
+    
+    Der View ist asynchron: Unter ASGI laufen gleichzeitige Requests nebeneinander und ihre Inferenz wird
+    gebündelt; unter WSGI führt Django ihn pro Request-Thread aus. Gleichzeitige Requests für dieselbe Gruppe
+    werden per Single-Flight zu einer Berechnung zusammengefasst.
+    Liegt für die Gruppe eine vorberechnete Empfehlung (python manage.py precompute_recommendations) zu den
+    aktuellen Favoriten ihrer Mitglieder vor, wird sie ohne Neuberechnung ausgeliefert.
     """
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Nur POST-Requests erlaubt'}, status=405)
@@ -362,94 +393,209 @@ def recommend_for_group(request):
         group_id = data.get('group_id')
     except Exception:
         return JsonResponse({'success': False, 'message': 'Ungültige JSON-Daten'}, status=400)
+    try:
+        k = parse_k(data)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
     if not group_id:
         return JsonResponse({'success': False, 'message': 'group_id erforderlich'}, status=400)
     
-    # Gruppe laden
-    group = None
+    # Gleichzeitige Requests für dieselbe Gruppe (und denselben Datenstand) teilen sich eine Berechnung.
+    key = ('recommend', str(group_id), group_data_version())
     try:
-        with open(GROUPS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['group_id'] == str(group_id):
-                    group = row
-                    break
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der Gruppen: {str(e)}'}, status=500)
-    if group is None:
-        return JsonResponse({'success': False, 'message': 'Gruppe nicht gefunden'}, status=404)
+        label, probabilities, serving_model = await request_coalescer.ado(key, compute_group_recommendation, group_id)
+    except RecommendationError as e:
+        return JsonResponse({'success': False, 'message': e.message}, status=e.status)
+    response = {'success': True, 'recommended_cuisine': serving_model.cuisines[label],
+                'model_version': serving_model.version}
+    if k is not None:
+        response['ranked_cuisines'] = ranked_cuisines(probabilities, k, serving_model.cuisines)
     
-    members = group['members'].split(",") if group['members'] else []
-    if not members:
-        return JsonResponse({'success': False, 'message': 'Keine Mitglieder in der Gruppe'}, status=400)
+    return JsonResponse(response)
+
+
+@csrf_exempt
+def recommend_batch(request):
+    """
+    Empfehlungen für mehrere Gruppen in einem Request.
+    Erwartet einen POST-Request mit JSON:
+    {
+        "group_ids": [<group_id>, <group_id>, ...],
+        "k": 3  // optional, wie bei recommend/
+    }
+    Die Gruppen-CSV wird dabei nur einmal gelesen, die Feature-Vektoren aller Gruppen
+    zu einer Matrix (N × Küchen) zusammengefasst und mit einem einzigen Modellaufruf bewertet.
+    Liefert pro Gruppe ein Ergebnis (in der Reihenfolge der Anfrage), bei unbekannten Gruppen mit Fehlermeldung:
+    {
+        "success": true,
+        "results": [
+            {"group_id": 5, "success": true, "recommended_cuisine": "italian"},
+            {"group_id": 99, "success": false, "message": "Gruppe nicht gefunden"}
+        ]
+    }
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Nur POST-Requests erlaubt'}, status=405)
+    try:
+        data = json.loads(request.body)
+        group_ids = data.get('group_ids')
+    except Exception:
+        return JsonResponse({'success': False, 'message': 'Ungültige JSON-Daten'}, status=400)
+    try:
+        k = parse_k(data)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    if not isinstance(group_ids, list) or not group_ids:
+        return JsonResponse({'success': False, 'message': 'group_ids (Liste) erforderlich'}, status=400)
+    if len(group_ids) > MAX_BATCH_GROUPS:
+        return JsonResponse({'success': False, 'message': f'Maximal {MAX_BATCH_GROUPS} Gruppen pro Request'}, status=400)
     
-    # Aggregiere Favoriten-Ränge aus den Accounts der Gruppenmitglieder
-    cuisine_ranks = {cuisine: [] for cuisine in CUISINES}
     try:
-        with open(ACCOUNTS_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                username = row.get('username', '')
-                if username in members:
-                    favs = row.get('favorite_cuisines', '')
-                    if favs:
-                        fav_list = [x.strip().lower() for x in favs.split(',') if x.strip()]
-                        for pos, cuisine in enumerate(fav_list, start=1):
-                            if cuisine in CUISINES:
-                                cuisine_ranks[cuisine].append(pos)
+        groups = load_groups_by_id(group_ids)
     except Exception as e:
-        return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der Nutzerdaten: {str(e)}'}, status=500)
-    
-    total_users = len(members)  # Wird hier nicht mehr genutzt
-    feature_vector = []
-    for cuisine in CUISINES:
-        if cuisine_ranks[cuisine]:
-            avg_rank = np.mean(cuisine_ranks[cuisine])
-            freq = len(cuisine_ranks[cuisine])
-            # Neuer Score: Je höher die Frequency, desto niedriger der Score.
-            score = avg_rank / (freq ** p)
-        else:
-            score = DEFAULT_RANK
-        feature_vector.append(score)
-    feature_vector = np.array(feature_vector).reshape(1, -1)
+        return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der Gruppen: {str(e)}'}, status=500)
     
-    # Vorhersage mit dem trainierten Random Forest Modell
-    predicted_label = int(rf_model.predict(feature_vector)[0])
-    recommended_cuisine = CUISINES[predicted_label]
+    results = []
+    members_by_row = []  # (Index in results, Mitglieder) für alle Gruppen, die bewertet werden
+    for group_id in group_ids:
+        group = groups.get(str(group_id))
+        if group is None:
+            results.append({'group_id': group_id, 'success': False, 'message': 'Gruppe nicht gefunden'})
+            continue
+        members = group_members(group)
+        if not members:
+            results.append({'group_id': group_id, 'success': False, 'message': 'Keine Mitglieder in der Gruppe'})
+            continue
+        results.append({'group_id': group_id, 'success': True})
+        members_by_row.append((len(results) - 1, members))
     
-    # Debug-Ausgabe im Terminal
-    print("Empfehlung für Group ID {}:".format(group_id))
-    print("Aggregierte Favoriten-Ränge pro Küche:")
-    for cuisine in CUISINES:
-        avg = np.mean(cuisine_ranks[cuisine]) if cuisine_ranks[cuisine] else DEFAULT_RANK
-        freq = len(cuisine_ranks[cuisine])
-        print("  {}: avg rank {:.1f} (frequency: {})".format(cuisine, avg, freq))
-    print("Feature Vector:", feature_vector)
-    print("Empfohlene Küche:", recommended_cuisine)
-
-
-    #############################################
-    # Vorhersagen auf den Testdaten
-    y_pred = rf_model.predict(X_test)
-
-    # Berechnung der Metriken
-    acc = accuracy_score(y_test, y_pred)
-    prec = precision_score(y_test, y_pred, average='weighted', zero_division=0)
-    rec = recall_score(y_test, y_pred, average='weighted', zero_division=0)
-    f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
-
-    # NDCG berechnen (Label-Binarisierung für Ranking erforderlich)
-    y_test_bin = label_binarize(y_test, classes=range(len(CUISINES)))
-    y_pred_bin = label_binarize(y_pred, classes=range(len(CUISINES)))
-    ndcg = ndcg_score(y_test_bin, y_pred_bin)
-
-    # Ausgabe der Metriken
-    print("Tested Random Forest Model on Synthetic Group Data")
-    print("Accuracy: {:.4f}".format(acc))
-    print("Precision: {:.4f}".format(prec))
-    print("Recall: {:.4f}".format(rec))
-    print("F1 Score: {:.4f}".format(f1))
-    print("NDCG: {:.4f}".format(ndcg))
-#####################################################
+    # Ein Modell für den ganzen Request, auch wenn währenddessen ein neues übernommen wird
+    serving_model = model_registry.current
+    if members_by_row:
+        model_version = serving_model.version
+        try:
+            fingerprints = group_fingerprints([members for _, members in members_by_row])
+            predictions = recommendation_cache.get_many(model_version, fingerprints)
+            # Nur Gruppen mit noch unbekanntem Fingerabdruck werden bewertet (jeder Fingerabdruck einmal).
+            missing = {}
+            for (_, members), fingerprint in zip(members_by_row, fingerprints):
+                if fingerprint not in predictions:
+                    missing.setdefault(fingerprint, members)
+            if missing:
+                feature_matrix = group_feature_matrix(list(missing.values()), serving_model.cuisines)
+        except Exception as e:
+            return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der Nutzerdaten: {str(e)}'}, status=500)
+        if missing:
+            labels, probabilities = serving_model.predict(feature_matrix)
+            computed = {fingerprint: (int(label), row_probabilities)
+                        for fingerprint, label, row_probabilities in zip(missing, labels, probabilities)}
+            recommendation_cache.set_many(model_version, computed)
+            predictions.update(computed)
+        for (result_index, _), fingerprint in zip(members_by_row, fingerprints):
+            label, row_probabilities = predictions[fingerprint]
+            results[result_index]['recommended_cuisine'] = serving_model.cuisines[label]
+            if k is not None:
+                results[result_index]['ranked_cuisines'] = ranked_cuisines(row_probabilities, k, serving_model.cuisines)
     
-    return JsonResponse({'success': True, 'recommended_cuisine': recommended_cuisine})
\ No newline at end of file
+    return JsonResponse({'success': True, 'model_version': serving_model.version, 'results': results})
+
+
+def parse_bounded_int(data, name, default, minimum, maximum):
+    """Liest einen optionalen Ganzzahl-Parameter mit Standardwert; wirft ValueError außerhalb [minimum, maximum]."""
+    value = data.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= maximum:
+        raise ValueError(f'{name} muss eine Ganzzahl zwischen {minimum} und {maximum} sein')
+    return value
+
+
+@csrf_exempt
+def suggest_invites(request):
+    """
+    Schlägt vor, welche Freunde ein Nutzer einladen sollte, damit die Gruppe den stärksten Küchen-Konsens hat.
+    Erwartet einen POST-Request mit JSON:
+    {
+        "username": "user1",
+        "k": 5,                  // optional: Anzahl Vorschläge
+        "max_group_size": 5,     // optional: Gruppengröße inklusive des Nutzers (2 bis 5)
+        "time_budget_ms": 200    // optional: Zeitbudget der Suche
+    }
+    Kandidaten sind alle Teilmengen der Freunde (friends.csv) bis zur Gruppengröße bzw. bei zu vielen
+    Teilmengen eine Stichprobe; sie werden blockweise mit einem Modellaufruf pro Block bewertet (siehe invites).
+    Der Konsens ist die Wahrscheinlichkeit der empfohlenen Küche. Ist das Zeitbudget erschöpft, werden die
+    besten bis dahin bewerteten Gruppen geliefert ("complete": false):
+    {
+        "success": true,
+        "model_version": "...",
+        "suggestions": [{"invite": ["friend1", "friend2"], "recommended_cuisine": "italian", "consensus": 0.93}],
+        "search": {"friends": 12, "candidates": 793, "evaluated": 793, "complete": true, "sampled": false, "elapsed_ms": 8.1}
+    }
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Nur POST-Requests erlaubt'}, status=405)
+    try:
+        data = json.loads(request.body)
+        username = data.get('username')
+    except Exception:
+        return JsonResponse({'success': False, 'message': 'Ungültige JSON-Daten'}, status=400)
+    try:
+        k = parse_bounded_int(data, 'k', DEFAULT_INVITE_SUGGESTIONS, 1, MAX_INVITE_SUGGESTIONS)
+        max_group_size = parse_bounded_int(data, 'max_group_size', MAX_GROUP_SIZE, MIN_GROUP_SIZE, MAX_GROUP_SIZE)
+        time_budget_ms = parse_bounded_int(data, 'time_budget_ms', DEFAULT_INVITE_TIME_BUDGET_MS, 1,
+                                           MAX_INVITE_TIME_BUDGET_MS)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    if not username:
+        return JsonResponse({'success': False, 'message': 'username erforderlich'}, status=400)
+
+    serving_model = model_registry.current
+    try:
+        user_id = user_repository.ref(username)
+        if user_id not in user_ranks:
+            return JsonResponse({'success': False, 'message': 'Nutzer nicht gefunden'}, status=404)
+        result = search_invite_groups(user_id, load_friends(user_id), serving_model, top_k=k,
+                                      max_group_size=max_group_size, time_budget=time_budget_ms / 1000,
+                                      max_candidates=MAX_INVITE_CANDIDATES)
+        for suggestion in result['suggestions']:
+            suggestion['invite'] = user_repository.usernames_for(suggestion['invite'])
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': f'Fehler beim Lesen der Nutzerdaten: {str(e)}'}, status=500)
+    return JsonResponse({'success': True, 'model_version': serving_model.version, **result})
+
+
+@csrf_exempt
+def model_metrics(request):
+    """
+    Liefert die beim Training berechneten Metriken des aktuell geladenen Modells (read-only).
+    Erwartet einen GET-Request.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
+    serving_model = model_registry.current
+    return JsonResponse({
+        'success': True,
+        'model_version': serving_model.version,
+        'metrics': serving_model.metrics,
+        'training_params': serving_model.training_params,
+        'cuisines': serving_model.cuisines,
+    })
+
+
+@csrf_exempt
+def serving_metrics(request):
+    """
+    Laufzeit-Metriken der Empfehlungs-Inferenz (Micro-Batching: Queue-Tiefe, Batchgrößen, Wartezeiten;
+    Ergebnis-Cache: Hits, Misses, Trefferquote; Single-Flight: zusammengefasste Requests;
+    Modell: Version, Anzahl Hot-Swaps, Ladefehler; vorberechnete Empfehlungen: Hits, Misses).
+    Erwartet einen GET-Request.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': 'Nur GET-Requests erlaubt'}, status=405)
+    return JsonResponse({
+        'success': True,
+        'model_version': model_registry.current.version,
+        'model': model_registry.stats(),
+        'batching': inference_batcher.stats(),
+        'cache': recommendation_cache.stats(),
+        'single_flight': request_coalescer.stats(),
+        'precomputed': precomputed_recommendations.stats(),
+    })
@@ -0,0 +1,73 @@
+"""
+Cache für Empfehlungsergebnisse.
+
+Eine Empfehlung hängt nur von den favorite_cuisines der Gruppenmitglieder und vom Modell ab.
+Der Cache-Key besteht deshalb aus der Modellversion und dem kanonischen Fingerabdruck der
+Mitglieder-Favoriten (CuisineRankMatrix.fingerprints); mehrfach angelegte Gruppen mit denselben
+Mitgliedern teilen sich einen Eintrag. Ändern sich Favoriten oder Mitglieder, ergibt sich ein neuer
+Key; der Cache wird daher bei Schreibvorgängen nicht geleert, veraltete Einträge werden nur nicht
+mehr abgefragt und verdrängt.
+
+Gespeichert wird im Django-Cache-Alias settings.RECOMMENDER_CACHE_ALIAS. Die Größe wird über
+MAX_ENTRIES des Backends begrenzt; LocMemCache verdrängt dabei die am längsten nicht genutzten
+Einträge (LRU).
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class RecommendationCache:
+    """Cache (Fingerabdruck, Modellversion) -> (Label, Wahrscheinlichkeiten) mit Hit/Miss-Zählern."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def cache(self):
+        # caches[...] ist pro Thread; deshalb bei jedem Zugriff neu auflösen.
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(model_version, fingerprint):
+        return f'recommendation:{model_version}:{fingerprint}'
+
+    def get_many(self, model_version, fingerprints):
+        """Liefert {fingerprint: (label, probabilities)} für alle Treffer und zählt Hits/Misses."""
+        keys = {self.make_key(model_version, fingerprint): fingerprint for fingerprint in set(fingerprints)}
+        found = self.cache.get_many(list(keys))
+        results = {keys[key]: value for key, value in found.items()}
+        hits = sum(1 for fingerprint in fingerprints if fingerprint in results)
+        with self._lock:
+            self._hits += hits
+            self._misses += len(fingerprints) - hits
+        return results
+
+    def get(self, model_version, fingerprint):
+        return self.get_many(model_version, [fingerprint]).get(fingerprint)
+
+    def set_many(self, model_version, values):
+        """Speichert {fingerprint: (label, probabilities)} mit dem TIMEOUT des Cache-Backends."""
+        self.cache.set_many({self.make_key(model_version, fingerprint): value for fingerprint, value in values.items()})
+
+    def set(self, model_version, fingerprint, value):
+        self.set_many(model_version, {fingerprint: value})
+
+    def stats(self):
+        """Metriken für den serving_metrics-Endpoint."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'alias': self.alias,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+            }
+
+
+recommendation_cache = RecommendationCache(getattr(settings, 'RECOMMENDER_CACHE_ALIAS', 'recommendations'))
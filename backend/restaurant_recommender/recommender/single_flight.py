@@ -0,0 +1,92 @@
+"""
+Single-Flight: gleichzeitige identische Berechnungen nur einmal ausführen.
+
+Öffnen alle Mitglieder einer Gruppe gleichzeitig die Gruppenansicht, kommt recommend/
+mehrfach mit denselben Parametern an. Der erste Request
+(Leader) führt die Berechnung aus; alle weiteren Requests mit demselben Key warten auf sein
+Ergebnis. Wirft die Berechnung eine Exception, erhalten alle Wartenden dieselbe Exception.
+
+Der Key muss die Datenversion enthalten (z. B. table_version der CSV samt Log), damit ein Request nach
+einer Änderung nicht an eine Berechnung auf dem alten Stand angehängt wird.
+
+Die Übergabe läuft wie beim MicroBatcher über concurrent.futures.Future, sodass Threads
+(do) und Coroutines (ado) auf dieselbe laufende Berechnung warten können.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Fasst gleichzeitige Aufrufe mit gleichem Key zu einer Berechnung zusammen."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future
+        # Metriken
+        self._calls = 0
+        self._executions = 0
+
+    def _join(self, key):
+        """Liefert (future, is_leader). Der Leader muss das Future erfüllen und _finish aufrufen."""
+        with self._lock:
+            self._calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._executions += 1
+            return future, True
+
+    def _finish(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def do(self, key, fn, *args, **kwargs):
+        """Führt fn(*args, **kwargs) aus oder wartet (blockierend) auf die laufende Berechnung mit demselben Key."""
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    async def ado(self, key, coroutine_fn, *args, **kwargs):
+        """Wie do, für Coroutines: await coroutine_fn(*args, **kwargs) oder auf die laufende Berechnung warten."""
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coroutine_fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    def stats(self):
+        """Metriken für den serving_metrics-Endpoint."""
+        with self._lock:
+            return {
+                'calls': self._calls,
+                'executions': self._executions,
+                'coalesced': self._calls - self._executions,
+                'in_flight': len(self._in_flight),
+            }
+
+
+# Prozessweite Instanz für den Gruppen-Endpoint recommend/
+request_coalescer = SingleFlight()
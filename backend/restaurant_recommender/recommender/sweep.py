@@ -0,0 +1,172 @@
+"""
+Hyperparameter-Sweep über (p, n_estimators, max_depth) (python manage.py sweep_recommender).
+
+Die synthetischen Favoritenlisten hängen nicht von p ab. Sie werden einmal erzeugt und über
+multiprocessing.shared_memory an alle Worker-Prozesse verteilt; jeder Worker berechnet daraus
+die Features für sein p, trainiert und bewertet den Forest und misst Modellgröße und Latenz.
+
+Fertige Gitterpunkte werden als JSON im Cache-Verzeichnis abgelegt, sodass ein erneuter Lauf
+nur noch fehlende Kombinationen trainiert.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import sklearn
+
+from .forest_engine import FlatForest
+from .ml import fit_model, group_scores_from_favorites
+
+# Erhöhen, wenn sich Training oder Messung so ändern, dass gecachte Ergebnisse ungültig werden
+SWEEP_FORMAT = 1
+
+# Anzahl Messungen für die Einzel-Latenz
+LATENCY_REPEATS = 200
+
+
+def parse_max_depth(value):
+    """max_depth-Argument (sweep_recommender, compact_recommender): positive Ganzzahl oder 'none' für unbegrenzte Tiefe."""
+    if value.lower() == 'none':
+        return None
+    depth = int(value)
+    if depth < 1:
+        raise ValueError('max_depth muss positiv sein')
+    return depth
+
+
+##############################################
+# Gemeinsamer Datensatz im Shared Memory
+##############################################
+
+class SharedArrays:
+    """
+    Legt mehrere NumPy-Arrays in einem SharedMemory-Block ab.
+    spec() beschreibt Name und Layout (Offsets, Shapes, dtypes); attach(spec) blendet die Arrays
+    in einem anderen Prozess ohne Kopie ein.
+    """
+
+    # Ausrichtung der einzelnen Arrays im Block (Bytes)
+    ALIGNMENT = 64
+
+    def __init__(self, shm, layout):
+        self.shm = shm
+        self.layout = layout
+        self.arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+            for name, start, shape, dtype in layout
+        }
+
+    @classmethod
+    def create(cls, **arrays):
+        layout = []
+        offset = 0
+        for name, array in arrays.items():
+            offset = -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
+            layout.append((name, offset, array.shape, array.dtype.str))
+            offset += array.nbytes
+        shared = cls(shared_memory.SharedMemory(create=True, size=max(offset, 1)), layout)
+        for name, array in arrays.items():
+            shared.arrays[name][...] = array
+        return shared
+
+    def spec(self):
+        return {'name': self.shm.name, 'layout': self.layout}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(shared_memory.SharedMemory(name=spec['name']), spec['layout'])
+
+    def close(self):
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self):
+        """Gibt den Block frei; nur im erzeugenden Prozess aufrufen."""
+        self.close()
+        self.shm.unlink()
+
+
+# Datensatz pro Worker-Prozess (siehe init_worker)
+_dataset = None
+
+
+def init_worker(spec):
+    """Initializer für den Process-Pool: blendet den gemeinsamen Datensatz ein."""
+    global _dataset
+    _dataset = SharedArrays.attach(spec)
+
+
+##############################################
+# Gitterpunkte
+##############################################
+
+def grid_key(point, num_groups, seed):
+    """Dateiname (ohne Endung) eines Gitterpunkts im Cache-Verzeichnis."""
+    description = json.dumps({
+        'format': SWEEP_FORMAT,
+        'sklearn': sklearn.__version__,
+        'num_groups': num_groups,
+        'seed': seed,
+        **point,
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()[:16]
+
+
+def load_cached(cache_dir, key):
+    path = os.path.join(cache_dir, key + '.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def store_cached(cache_dir, key, result):
+    """Schreibt ein Ergebnis atomar (tmp + os.replace), damit abgebrochene Läufe keine halben Dateien hinterlassen."""
+    path = os.path.join(cache_dir, key + '.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def single_row_latency_ms(engine, X, repeats=LATENCY_REPEATS):
+    """p50 der Latenz von engine.predict für eine einzelne Zeile in Millisekunden."""
+    engine.predict(X[:1])  # Warm-up
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        engine.predict(row)
+        timings[i] = time.perf_counter() - start
+    return float(np.percentile(timings, 50) * 1000)
+
+
+def evaluate_point(point, seed):
+    """
+    Trainiert und bewertet einen Gitterpunkt {'p', 'n_estimators', 'max_depth'} auf dem gemeinsamen Datensatz.
+    Die Latenz wird mit der FlatForest-Engine gemessen, die auch der recommend-Endpoint verwendet.
+    """
+    started = time.perf_counter()
+    favorites = _dataset.arrays['favorites']
+    num_users = _dataset.arrays['num_users']
+    X, y = group_scores_from_favorites(favorites, num_users, p=point['p'])
+    model, metrics, X_test, _ = fit_model(
+        X, y, n_estimators=point['n_estimators'], max_depth=point['max_depth'], random_state=seed
+    )
+    engine = FlatForest.from_sklearn(model)
+    return {
+        **point,
+        'accuracy': metrics['accuracy'],
+        'f1': metrics['f1'],
+        'ndcg': metrics['ndcg'],
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        'total_nodes': int(len(engine.feature)),
+        'max_depth_reached': engine.max_depth,
+        'predict_ms_p50': single_row_latency_ms(engine, X_test),
+        'train_s': time.perf_counter() - started,
+    }
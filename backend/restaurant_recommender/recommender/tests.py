@@ -1,3 +1,278 @@
-from django.test import TestCase
+import asyncio
+import csv
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from accounts.log_table import LogTable
+
+from . import compaction, ml
+from .batching import MicroBatcher
+from .forest_engine import FlatForest
+from .rank_matrix import CuisineRankMatrix
+from .result_cache import RecommendationCache
+from .single_flight import SingleFlight
+
+
+class SyntheticDataTests(SimpleTestCase):
+    """Der synthetische Generator liefert für einen Seed immer denselben Datensatz."""
+
+    def test_same_seed_same_dataset_for_every_block_size(self):
+        # Kleine Seed-Blöcke, damit mehrere Generatoren zusammengesetzt und zerteilt werden
+        with mock.patch.object(ml, 'SYNTH_SEED_BLOCK_SIZE', 1000):
+            X, y = ml.generate_synthetic_group_data_weighted(num_groups=2500, random_state=7)
+            for block_size in (1, 7, 999, 1000, 1024, 2500, 65536):
+                batches = list(ml.iter_synthetic_group_batches(num_groups=2500, random_state=7, block_size=block_size))
+                self.assertTrue(all(len(y_batch) <= block_size for _, y_batch in batches))
+                np.testing.assert_array_equal(np.concatenate([X_batch for X_batch, _ in batches]), X)
+                np.testing.assert_array_equal(np.concatenate([y_batch for _, y_batch in batches]), y)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                X_path, y_path = os.path.join(tmp, 'X.npy'), os.path.join(tmp, 'y.npy')
+                ml.write_synthetic_group_data(X_path, y_path, num_groups=2500, random_state=7, block_size=333)
+                np.testing.assert_array_equal(np.load(X_path), X)
+                np.testing.assert_array_equal(np.load(y_path), y)
+
+            X_again, _ = ml.generate_synthetic_group_data_weighted(num_groups=2500, random_state=7)
+            np.testing.assert_array_equal(X_again, X)
+            X_other, _ = ml.generate_synthetic_group_data_weighted(num_groups=2500, random_state=8)
+            self.assertFalse(np.array_equal(X_other, X))
+
+
+class CompactionTests(SimpleTestCase):
+    """Die RSS-Messung im Kindprozess darf compact_recommender nicht blockieren."""
+
+    def test_rss_delta_of_unloadable_artifact_is_none(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.monotonic()
+            self.assertIsNone(compaction.rss_delta_bytes(os.path.join(tmp, 'fehlt.joblib'), timeout=60))
+            self.assertLess(time.monotonic() - started, 60)
+
+
+class FlatForestTests(SimpleTestCase):
+    """Die FlatForest-Engine muss exakt wie der RandomForestClassifier aus dem Artefakt bewerten."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._tmp = tempfile.TemporaryDirectory()
+        X, y = ml.generate_synthetic_group_data_weighted(num_groups=2000, random_state=3)
+        model, metrics, X_test, y_test = ml.fit_model(X, y, n_estimators=25, random_state=3)
+        path = os.path.join(cls._tmp.name, 'rf_model.joblib')
+        ml.save_model_artifact(model, metrics, X_test, y_test, path=path)
+        cls.model = ml.load_model_artifact(path)['model']
+        cls.engine = FlatForest.from_sklearn(cls.model)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+        super().tearDownClass()
+
+    def assert_same_predictions(self, X):
+        np.testing.assert_allclose(self.engine.predict_proba(X), self.model.predict_proba(X), rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(self.engine.predict(X), self.model.predict(X))
+
+    def test_predict_proba_matches_sklearn_on_random_inputs(self):
+        rng = np.random.default_rng(0)
+        self.assert_same_predictions(rng.uniform(0, 4 * ml.DEFAULT_RANK, size=(500, ml.NUM_CUISINES)))
+        self.assert_same_predictions(rng.uniform(0, 4 * ml.DEFAULT_RANK, size=ml.NUM_CUISINES).reshape(1, -1))
+
+    def test_float32_cast_at_split_thresholds(self):
+        # float64-Werte knapp neben den Schwellwerten landen erst nach dem Cast auf float32 auf einer Seite;
+        # sklearn castet ebenfalls, beide Engines müssen also denselben Ast wählen.
+        rng = np.random.default_rng(1)
+        inner = ~self.engine.is_leaf
+        thresholds, features = self.engine.threshold[inner], self.engine.feature[inner]
+        picked = rng.choice(len(thresholds), size=400)
+        X = rng.uniform(0, 4 * ml.DEFAULT_RANK, size=(400, ml.NUM_CUISINES))
+        offsets = rng.choice([-1e-9, 0.0, 1e-9], size=400)
+        X[np.arange(400), features[picked]] = thresholds[picked] + offsets
+        self.assert_same_predictions(X)
+        self.assert_same_predictions(X.astype(np.float32))
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Gleichzeitige Aufrufe mit gleichem Key teilen sich eine Berechnung, auch wenn sie fehlschlägt."""
+
+    def wait_for_calls(self, flight, calls):
+        deadline = time.monotonic() + 5
+        while flight.stats()['calls'] < calls:
+            self.assertLess(time.monotonic(), deadline, 'Aufrufe haben sich nicht angehängt')
+            time.sleep(0.001)
+
+    def test_exception_reaches_every_waiter_and_is_not_cached(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        error = ValueError('kaputt')
+
+        def failing():
+            release.wait(5)
+            raise error
+
+        raised = []
+
+        def call():
+            try:
+                flight.do('key', failing)
+            except ValueError as e:
+                raised.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_calls(flight, 8)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(raised), 8)
+        self.assertTrue(all(e is error for e in raised))
+        self.assertEqual(flight.stats()['executions'], 1)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+        # Der Fehler wird nicht gespeichert: der nächste Aufruf rechnet neu
+        self.assertEqual(flight.do('key', lambda: 42), 42)
+        self.assertEqual(flight.stats()['executions'], 2)
+
+    def test_exception_reaches_every_coroutine(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError('kaputt')
+
+        async def main():
+            return await asyncio.gather(*(flight.ado('key', failing) for _ in range(5)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(flight.stats()['executions'], 1)
+        self.assertEqual(asyncio.run(flight.ado('key', asyncio.sleep, 0, 'neu')), 'neu')
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """Jeder Aufrufer erhält genau die Ergebniszeilen seiner eigenen Anfrage."""
+
+    @staticmethod
+    def predict_fn(X, context):
+        # Erstes Ergebnis: die Zeile selbst, zweites: Zeilensumme plus Kontext
+        return X.copy(), X.sum(axis=1) + context
+
+    def test_results_are_routed_to_their_callers(self):
+        batcher = MicroBatcher(self.predict_fn, max_wait=0.005, max_batch_rows=16)
+        barrier = threading.Barrier(40)
+        results, expected = {}, {}
+
+        def call(i):
+            rows = np.arange(i % 3 + 1)[:, None] * 1000.0 + i + np.zeros((1, 4))
+            context = i % 2  # Anfragen mit anderem Kontext landen nicht im selben Batch
+            expected[i] = (rows, rows.sum(axis=1) + context)
+            barrier.wait(5)
+            results[i] = batcher.predict(rows, context)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(40):
+            np.testing.assert_array_equal(results[i][0], expected[i][0])
+            np.testing.assert_array_equal(results[i][1], expected[i][1])
+        stats = batcher.stats()
+        self.assertEqual(stats['requests'], 40)
+        self.assertLessEqual(stats['max_batch_rows_seen'], 16)
+
+    def test_lone_request_is_not_delayed(self):
+        batcher = MicroBatcher(self.predict_fn, max_wait=1.0)
+        started = time.perf_counter()
+        rows, sums = batcher.predict(np.ones((1, 4)), 0)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        np.testing.assert_array_equal(sums, [4.0])
+        self.assertEqual(batcher.stats()['immediate_batches'], 1)
+
+    def test_exception_reaches_every_caller_of_the_batch(self):
+        def failing(X, context):
+            raise ValueError('kaputt')
+
+        batcher = MicroBatcher(failing)
+        with self.assertRaises(ValueError):
+            batcher.predict(np.ones((1, 4)))
+        with self.assertRaises(ValueError):
+            asyncio.run(batcher.apredict(np.ones((2, 4))))
+
+
+class UsersFixture:
+    """Temporäre users.csv mit Rangmatrix und Tabelle zum Schreiben."""
+
+    FIELDNAMES = ['user_id', 'username', 'favorite_cuisines']
+    CUISINES = ['italian', 'thai']
+    USERS = [['id0', 'anna', 'Italian'], ['id1', 'ben', 'Thai']]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'users.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(self.FIELDNAMES)
+            writer.writerows(self.USERS)
+        self.matrix = CuisineRankMatrix(self.path, key_field='user_id')
+        self.table = LogTable(self.path, self.FIELDNAMES, key='user_id')
+
+    def write(self, user_id, favorite_cuisines):
+        """Schreibt wie accounts.views und meldet die Änderung an die Matrix."""
+        with self.table.lock:
+            stat_before = self.matrix.table_stat()
+            self.table.update(user_id, favorite_cuisines=favorite_cuisines)
+            stat_after = self.matrix.table_stat()
+        self.matrix.update_user(user_id, favorite_cuisines, stat_before, stat_after)
+
+
+class RankMatrixTests(UsersFixture, SimpleTestCase):
+    """update_user übernimmt eigene Schreibvorgänge inkrementell, ohne fremde als gelesen zu markieren."""
+
+    def test_own_write_does_not_reload(self):
+        self.assertEqual(self.matrix.rank_rows(['id0'], self.CUISINES).tolist(), [[1, 0]])
+        self.write('id0', 'Thai,Italian')
+        version = self.matrix.version
+        self.assertEqual(self.matrix.rank_rows(['id0', 'id1'], self.CUISINES).tolist(), [[2, 1], [0, 1]])
+        self.assertEqual(self.matrix.version, version)
+
+    def test_unseen_foreign_write_is_reloaded(self):
+        self.matrix.keys()
+        # Ein anderer Prozess schreibt, bevor dieser Prozess seine eigene Änderung meldet
+        LogTable(self.path, self.FIELDNAMES, key='user_id').update('id1', favorite_cuisines='Italian')
+        self.write('id0', 'Thai')
+        self.assertEqual(self.matrix.rank_rows(['id0', 'id1'], self.CUISINES).tolist(), [[0, 1], [1, 0]])
+
+
+class ResultCacheTests(UsersFixture, SimpleTestCase):
+    """Der Ergebnis-Cache ist nach dem Fingerabdruck der Mitglieder-Favoriten geschlüsselt und wird nie geleert."""
+
+    USERS = UsersFixture.USERS + [['id2', 'carl', 'Thai']]
+
+    def setUp(self):
+        super().setUp()
+        self.cache = RecommendationCache('recommendations')
+        self.cache.cache.clear()
+
+    def lookup(self, members=('id0', 'id1')):
+        return self.cache.get('v1', self.matrix.fingerprints([list(members)])[0])
+
+    def test_hits_and_misses(self):
+        self.assertIsNone(self.lookup())
+        self.cache.set('v1', self.matrix.fingerprints([['id0', 'id1']])[0], (0, [1.0, 0.0]))
+        self.assertEqual(self.lookup(), (0, [1.0, 0.0]))
+        # Gleiche Favoriten in anderer Reihenfolge und mit doppeltem Mitglied: derselbe Eintrag
+        self.assertEqual(self.lookup(('id1', 'id0', 'id1')), (0, [1.0, 0.0]))
+        # Schreibvorgang eines Nicht-Mitglieds: weiterhin ein Treffer
+        self.write('id2', 'Italian')
+        self.assertEqual(self.lookup(), (0, [1.0, 0.0]))
+        # Geänderte Favoriten eines Mitglieds ergeben einen neuen Fingerabdruck
+        self.write('id0', 'Thai')
+        self.assertIsNone(self.lookup())
+        self.assertIsNone(self.cache.get('v2', self.matrix.fingerprints([['id2']])[0]))
+        self.assertEqual({name: self.cache.stats()[name] for name in ('hits', 'misses')}, {'hits': 3, 'misses': 3})
@@ -1,10 +1,14 @@
 from django.urls import path
-from .recommender import create_group, list_groups, recommend_for_group, leave_group, delete_group  
+from .recommender import create_group, list_groups, recommend_for_group, leave_group, delete_group, model_metrics, recommend_batch, serving_metrics, suggest_invites
 
 urlpatterns = [
     path('create_group/', create_group, name='create_group'),
     path('list_groups/', list_groups, name='list_groups'),
     path('recommend/', recommend_for_group, name='recommend_for_group'),
+    path('recommend_batch/', recommend_batch, name='recommend_batch'),
     path('leave_group/', leave_group, name='leave_group'),
     path('delete_group/', delete_group, name='delete_group'),
+    path('model_metrics/', model_metrics, name='model_metrics'),
+    path('serving_metrics/', serving_metrics, name='serving_metrics'),
+    path('suggest_invites/', suggest_invites, name='suggest_invites'),
 ]
@@ -0,0 +1,78 @@
+"""
+Küchen-Vokabular des Empfehlungsmodells.
+
+Statt der fest verdrahteten CUISINES-Liste wird das Vokabular aus der Restaurant-Tabelle
+(dataviewer.Restaurant.cuisine_style) gebildet: alle Küchenstile, die in mindestens
+min_restaurants Restaurants vorkommen, nach Häufigkeit sortiert. Das Vokabular wird beim
+Training im Feature-Schema des Modell-Artefakts gespeichert; ausgeliefert wird immer mit dem
+Vokabular des geladenen Artefakts, nicht mit dem aktuellen Stand der Tabelle.
+"""
+
+import ast
+from collections import Counter
+
+from .ml import CUISINES
+
+# Mögliche Quellen des Vokabulars (siehe load_cuisine_vocabulary)
+VOCABULARY_SOURCES = ('restaurants', 'default')
+# Einträge in cuisine_style, die keine Küche, sondern eine Ernährungsoption beschreiben
+NON_CUISINE_STYLES = {'vegetarian friendly', 'vegan options', 'gluten free options'}
+
+
+def parse_cuisine_style(raw):
+    """
+    Zerlegt ein cuisine_style-Feld ("['Dutch', 'European', 'Asian']" wie im Kaggle-Export oder
+    kommasepariert) in eine Liste kleingeschriebener Küchenstile. Leere Werte und 'nan' ergeben [].
+    """
+    if not raw or raw.strip().lower() in ('', 'nan', 'none'):
+        return []
+    raw = raw.strip()
+    styles = None
+    if raw.startswith('['):
+        try:
+            styles = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            styles = None
+    if not isinstance(styles, (list, tuple)):
+        styles = raw.strip('[]').split(',')
+    cleaned = (str(style).strip().strip('\'"').strip().lower() for style in styles)
+    return [style for style in cleaned if style]
+
+
+def build_cuisine_vocabulary(cuisine_styles, min_restaurants=1, max_cuisines=None):
+    """
+    Vokabular aus einer Folge von cuisine_style-Feldern (eines pro Restaurant).
+    Küchenstile werden pro Restaurant einmal gezählt und nach Häufigkeit (absteigend, bei
+    Gleichstand alphabetisch) sortiert; seltenere als min_restaurants fallen weg.
+    """
+    counts = Counter()
+    for raw in cuisine_styles:
+        counts.update(set(parse_cuisine_style(raw)) - NON_CUISINE_STYLES)
+    vocabulary = sorted((style for style, count in counts.items() if count >= min_restaurants),
+                        key=lambda style: (-counts[style], style))
+    return vocabulary[:max_cuisines] if max_cuisines else vocabulary
+
+
+def load_cuisine_vocabulary(source='restaurants', min_restaurants=1, max_cuisines=None):
+    """
+    Küchen-Vokabular für das Training. Liefert (cuisines, source):
+      - source='restaurants': aus der Restaurant-Tabelle; ist sie leer oder nicht vorhanden,
+        wird die bisherige CUISINES-Liste verwendet und source='default' geliefert
+      - source='default': die bisherige CUISINES-Liste
+    """
+    if source == 'restaurants':
+        from django.db import DatabaseError
+
+        from dataviewer.models import Restaurant
+
+        try:
+            cuisine_styles = Restaurant.objects.values_list('cuisine_style', flat=True).iterator()
+            vocabulary = build_cuisine_vocabulary(cuisine_styles, min_restaurants=min_restaurants,
+                                                  max_cuisines=max_cuisines)
+        except DatabaseError:
+            vocabulary = []
+        if vocabulary:
+            return vocabulary, 'restaurants'
+    elif source != 'default':
+        raise ValueError(f'Unbekannte Vokabular-Quelle: {source}')
+    return list(CUISINES), 'default'
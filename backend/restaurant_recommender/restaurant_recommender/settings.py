@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'dataviewer',
     'rest_framework',
     'recommender', 
+    'accounts',
 ]
 
 MIDDLEWARE = [
@@ -126,6 +127,48 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),  # Hier den Pfad zu deinem statischen Ordner hinzufügen
 ]
 
+# Micro-Batching der Recommender-Inferenz: gleichzeitige Empfehlungs-Requests werden bis zu
+# MAX_WAIT_MS gesammelt (oder bis MAX_BATCH_ROWS Zeilen erreicht sind) und gemeinsam bewertet.
+RECOMMENDER_BATCHING = {
+    'MAX_WAIT_MS': 2,
+    'MAX_BATCH_ROWS': 64,
+}
+
+# Passwort-Hashing beim Login: höchstens MAX_WORKERS Prüfungen gleichzeitig, höchstens MAX_QUEUE wartend;
+# darüber hinaus antwortet login mit 503 und Retry-After.
+ACCOUNTS_PASSWORD_HASHING = {
+    'MAX_WORKERS': 2,
+    'MAX_QUEUE': 32,
+}
+
+# Ausgeliefertes Modell-Artefakt, z. B. das Ergebnis von compact_recommender (Standard: recommender/artifacts/rf_model.joblib)
+# RECOMMENDER_MODEL_PATH = os.path.join(BASE_DIR, 'recommender', 'artifacts', 'rf_model_compact.joblib')
+
+# Fehlt das Modell-Artefakt, beim Start in jedem Worker trainieren statt mit ImproperlyConfigured abzubrechen
+# (nur für die Entwicklung; Standard: DEBUG). Produktiv vorher python manage.py train_recommender ausführen.
+RECOMMENDER_TRAIN_ON_START = DEBUG
+
+# Sekunden zwischen zwei Prüfungen, ob ein neues Modell-Artefakt geschrieben wurde (Hot-Swap; 0 = aus)
+RECOMMENDER_MODEL_RELOAD_INTERVAL = 5
+
+# Cache für Empfehlungsergebnisse (recommender/result_cache.py). LocMemCache verdrängt bei mehr als
+# MAX_ENTRIES Einträgen die am längsten nicht genutzten (LRU).
+RECOMMENDER_CACHE_ALIAS = 'recommendations'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RECOMMENDER_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recommendations',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 